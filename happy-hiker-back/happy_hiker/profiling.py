@@ -0,0 +1,229 @@
+"""Opt-in request profiling: Server-Timing headers and Prometheus /metrics.
+
+With PROFILING_ENABLED, a PROFILING_SAMPLE_RATE fraction of requests is
+profiled: SQL statements are counted and timed through the connections'
+execute wrappers, DRF serializer ``.data`` evaluation plus response rendering
+is timed as "serialize", and the whole view as "view". Sampled requests get a
+Server-Timing header and feed per-route histograms that /metrics exposes in
+the Prometheus text format. Unsampled requests pay for one random() call.
+
+Histograms are per process, so with several workers each scrape sees one
+worker's share of the samples.
+"""
+
+import contextvars
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotFound
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.view_seconds = 0.0
+        self._serializing = False
+
+    def record_query(self, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - began
+
+    def server_timing(self):
+        return ", ".join(
+            [
+                f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+                f"serialize;dur={self.serialize_seconds * 1000:.1f}",
+                f"view;dur={self.view_seconds * 1000:.1f}",
+            ]
+        )
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Per (route, method) histograms of the sampled requests."""
+
+    HISTOGRAMS = [
+        ("request_duration_seconds", "Time in the view", SECONDS_BUCKETS),
+        ("db_duration_seconds", "Time in SQL", SECONDS_BUCKETS),
+        ("db_queries", "SQL statements", QUERY_BUCKETS),
+        ("serialize_duration_seconds", "Time serializing", SECONDS_BUCKETS),
+    ]
+
+    def __init__(self, prefix="happyhiker"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.responses = {}
+
+    def observe(self, route, method, status, profile):
+        values = [
+            profile.view_seconds,
+            profile.db_seconds,
+            profile.queries,
+            profile.serialize_seconds,
+        ]
+        with self.lock:
+            histograms = self.histograms.get((route, method))
+            if histograms is None:
+                histograms = [Histogram(buckets) for _, _, buckets in self.HISTOGRAMS]
+                self.histograms[(route, method)] = histograms
+            for histogram, value in zip(histograms, values):
+                histogram.observe(value)
+            key = (route, method, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self):
+        """The Prometheus text exposition format, version 0.0.4."""
+        lines = []
+        with self.lock:
+            name = f"{self.prefix}_sampled_responses_total"
+            lines += [
+                f"# HELP {name} Profiled responses by status",
+                f"# TYPE {name} counter",
+            ]
+            for (route, method, status), count in sorted(self.responses.items()):
+                lines.append(
+                    f'{name}{{route="{_label(route)}",method="{method}",'
+                    f'status="{status}"}} {count}'
+                )
+            for n, (metric, help_text, _) in enumerate(self.HISTOGRAMS):
+                name = f"{self.prefix}_{metric}"
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (route, method), histograms in sorted(self.histograms.items()):
+                    histogram = histograms[n]
+                    labels = f'route="{_label(route)}",method="{method}"'
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines += [
+                        f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}',
+                        f"{name}_sum{{{labels}}} {histogram.sum}",
+                        f"{name}_count{{{labels}}} {histogram.count}",
+                    ]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+_instrumented = False
+_instrument_lock = threading.Lock()
+
+
+def instrument_serializers():
+    """Time BaseSerializer.data, which every DRF serializer's .data goes through."""
+    global _instrumented
+    from rest_framework.serializers import BaseSerializer
+
+    with _instrument_lock:
+        if _instrumented:
+            return
+        data = BaseSerializer.data
+
+        def timed_data(serializer):
+            profile = _current.get()
+            # only the outermost serializer, so nested .data calls count once
+            if profile is None or profile._serializing:
+                return data.fget(serializer)
+            profile._serializing = True
+            began = time.perf_counter()
+            try:
+                return data.fget(serializer)
+            finally:
+                profile.serialize_seconds += time.perf_counter() - began
+                profile._serializing = False
+
+        BaseSerializer.data = property(timed_data)
+        _instrumented = True
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        began = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(profile.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        profile.view_seconds = time.perf_counter() - began
+
+        match = request.resolver_match
+        # unmatched paths share one label so 404 probes can't grow the registry
+        route = match.route if match is not None else "<unmatched>"
+        REGISTRY.observe(route, request.method, response.status_code, profile)
+        response["Server-Timing"] = profile.server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; count that as serializing
+        profile = _current.get()
+        if profile is not None:
+            began = time.perf_counter()
+
+            def rendered(response):
+                profile.serialize_seconds += time.perf_counter() - began
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics(request):
+    if not settings.PROFILING_ENABLED:
+        return HttpResponseNotFound()
+    token = settings.PROFILING_METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    return HttpResponse(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,27 +1,45 @@
 import os
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
+# "development" (the default) or "production"; production turns off DEBUG,
+# requires a real secret key and pools database connections. Every setting
+# below it can still be overridden on its own through the environment.
+DJANGO_ENV = os.getenv("DJANGO_ENV", "development")
+PRODUCTION = DJANGO_ENV == "production"
+
+
+def env_flag(name, default):
+    return os.getenv(name, "1" if default else "0").lower() in ("1", "true")
+
+
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-hgm&nxn1+ugr*^9=!rtkhb*g7p3yij*gr8mo&uamvq69k35vl8"
+SECRET_KEY = os.getenv(
+    "DJANGO_SECRET_KEY",
+    "django-insecure-hgm&nxn1+ugr*^9=!rtkhb*g7p3yij*gr8mo&uamvq69k35vl8",
+)
+if PRODUCTION and SECRET_KEY.startswith("django-insecure-"):
+    raise ImproperlyConfigured("Set DJANGO_SECRET_KEY when DJANGO_ENV=production")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_flag("DJANGO_DEBUG", not PRODUCTION)
 
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "*").split(",")
 
 
 # Application definition
 
 INSTALLED_APPS = [
+    # first, so runserver serves the ASGI app (HTTP and the nav WebSocket)
+    "daphne",
     "corsheaders",
     "django.contrib.admin",
     "django.contrib.auth",
@@ -34,10 +52,14 @@ INSTALLED_APPS = [
     "user_profile",
     "django_extensions",
     "django.contrib.gis",
+    "django.contrib.postgres",
 
 ]
 
 MIDDLEWARE = [
+    # outermost, so its timings cover the rest of the stack; a no-op unless
+    # PROFILING_ENABLED
+    "happy_hiker.profiling.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -76,6 +98,7 @@ TEMPLATES = [
     },
 ]
 
+ASGI_APPLICATION = "happy_hiker.asgi.application"
 WSGI_APPLICATION = "happy_hiker.wsgi.application"
 
 
@@ -84,15 +107,36 @@ WSGI_APPLICATION = "happy_hiker.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "django.contrib.gis.db.backends.postgis",
         "NAME": os.environ.get("DATABASE_NAME"),
         "USER": os.environ.get("DATABASE_USER"),
         "PASSWORD": os.environ.get("DATABASE_PASSWORD"),
         "HOST": os.environ.get("DATABASE_HOST"),
         "PORT": os.getenv("DATABASE_PORT", "5432"),
+        # reused connections are pinged before each request's first query
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# A psycopg 3 pool per worker process (safe under ASGI, unlike CONN_MAX_AGE),
+# otherwise one persistent connection per worker thread for CONN_MAX_AGE s.
+if env_flag("DATABASE_POOL", PRODUCTION):
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", 10)),
+            # a connection handed out by the pool is checked first
+            "check": ConnectionPool.check_connection,
+        }
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(
+        os.getenv("DATABASE_CONN_MAX_AGE", 60 if PRODUCTION else 0)
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -139,12 +183,54 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
-DEBUG = True
+# directory of DEM GeoTIFF tiles (EPSG:4326, e.g. SRTM 1 arc-second) and how
+# many of them stay open at once
+DEM_TILE_DIR = os.getenv("DEM_TILE_DIR", BASE_DIR / "dem")
+DEM_TILE_CACHE_SIZE = int(os.getenv("DEM_TILE_CACHE_SIZE", 8))
+
+CACHES = {
+    "default": {
+        # point at a shared backend (e.g. django.core.cache.backends.redis.RedisCache)
+        # in production so every worker sees the same cached responses
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+# cache alias and lifetime (seconds) of serialized /api/trails/ responses
+TRAIL_CATALOG_CACHE = os.getenv("TRAIL_CATALOG_CACHE", "default")
+TRAIL_CATALOG_CACHE_TIMEOUT = int(os.getenv("TRAIL_CATALOG_CACHE_TIMEOUT", 3600))
+# how long a /api/trails/trending/ ranking is served before it is re-read
+TRENDING_CACHE_TIMEOUT = int(os.getenv("TRENDING_CACHE_TIMEOUT", 60))
+
+# rendered vector tiles of the trail map, see trail_nav.tiles
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", BASE_DIR / "tile_cache")
+
+# per-request SQL / serializer timings as Server-Timing headers and /metrics,
+# see happy_hiker.profiling; sample a small fraction in production
+PROFILING_ENABLED = env_flag("PROFILING_ENABLED", False)
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 1.0))
+# when set, /metrics requires "Authorization: Bearer <token>"
+PROFILING_METRICS_TOKEN = os.getenv("PROFILING_METRICS_TOKEN", "")
 
 # settings.py
 
 AUTH0_DOMAIN = "dev-schhypz7stw633yu.us.auth0.com"
 AUTH0_AUDIENCE = "http://happyhiker/api"
+# seconds before the signing keys are refetched (unknown kids refetch sooner)
+AUTH0_JWKS_TTL = int(os.getenv("AUTH0_JWKS_TTL", 3600))
+# how many verified tokens to remember until they expire
+AUTH0_TOKEN_CACHE_SIZE = int(os.getenv("AUTH0_TOKEN_CACHE_SIZE", 10000))
+# how many Auth0 sub -> account / hiker / profile ids to remember
+AUTH0_IDENTITY_CACHE_SIZE = int(os.getenv("AUTH0_IDENTITY_CACHE_SIZE", 10000))
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "user_profile.authentication.Auth0JWTAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+    ],
+}
 
 # AUTH0_DOMAIN = config("AUTH0_DOMAIN")
 # AUTH0_CLIENT_ID = config("AUTH0_CLIENT_ID")
@@ -3,10 +3,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .profiling import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("trail_nav.urls")),
-    path("user/", include("user_profile.urls"))
+    path("user/", include("user_profile.urls")),
+    path("metrics", metrics, name="metrics"),
 ]
 
 if settings.DEBUG:
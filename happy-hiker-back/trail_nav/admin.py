@@ -1,7 +1,22 @@
 from django.contrib import admin
-from .models import Trail, TrailImage, NavigationSession, GPSLog
+from .models import (
+    Trail,
+    TrailImage,
+    NavigationSession,
+    GPSLog,
+    SessionTrack,
+    TrailSource,
+    TrailSegment,
+    Prompt,
+    PromptTrigger,
+)
 
 admin.site.register(Trail)
 admin.site.register(TrailImage)
 admin.site.register(NavigationSession)
 admin.site.register(GPSLog)
+admin.site.register(SessionTrack)
+admin.site.register(TrailSource)
+admin.site.register(TrailSegment)
+admin.site.register(Prompt)
+admin.site.register(PromptTrigger)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TrailNavConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trail_nav'
+
+    def ready(self):
+        from . import signals  # noqa: F401
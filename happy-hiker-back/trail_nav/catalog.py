@@ -0,0 +1,118 @@
+"""Conditional GET and a response cache for the trail catalog endpoints.
+
+The catalog only changes through Trail / TrailImage / TrailSegment writes,
+which bump the CatalogVersion row (signals for single saves, import_trails and
+link_trailheads for bulk writes).
+Each response carries an ETag derived from that version and the request URI:
+a matching If-None-Match costs one primary key lookup and returns 304. Full
+responses are cached as serialized data in the TRAIL_CATALOG_CACHE backend,
+under keys that include the version, so a bump orphans every old entry.
+Per-user values (a hiker's favourites) are layered on after the cache.
+
+The same version keys the process-wide indexes built from the catalog (route
+graph, similar trails, trail lines, prompt zones), so a bulk write in another
+process reaches them too.
+"""
+
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework.response import Response
+
+from .models import CatalogVersion, new_catalog_version
+
+CATALOG_ROW_ID = 1
+# how stale recent_catalog_version() may be, for paths that run on every fix
+CATALOG_RECHECK_SECONDS = 10
+
+_recent = None  # (checked_at, version)
+
+
+def get_catalog_version():
+    version, _ = CatalogVersion.objects.get_or_create(pk=CATALOG_ROW_ID)
+    return version
+
+
+def recent_catalog_version():
+    """The version string, re-read at most every CATALOG_RECHECK_SECONDS.
+
+    Bumps from this process are seen at once, bumps from another process
+    (an import) within the interval.
+    """
+    global _recent
+    recent = _recent
+    now = time.monotonic()
+    if recent is None or now - recent[0] >= CATALOG_RECHECK_SECONDS:
+        recent = _recent = (now, get_catalog_version().version)
+    return recent[1]
+
+
+def bump_catalog_version():
+    global _recent
+    updated = CatalogVersion.objects.filter(pk=CATALOG_ROW_ID).update(
+        version=new_catalog_version(), updated_at=timezone.now()
+    )
+    if not updated:
+        get_catalog_version()
+    _recent = None
+
+
+def catalog_cached(method=None, *, personalize=None):
+    """Wrap a viewset action so its GET responses are conditional and cached.
+
+    The cached data may only depend on the URI, not on the user. For
+    authenticated requests ``personalize`` names a view method called as
+    ``personalize(request, data)`` after the cache; it fills in per-user values
+    and returns a short tag for them (or None), which joins the ETag so a 304
+    still means the client's copy is right for this user.
+    """
+    if method is None:
+        return functools.partial(catalog_cached, personalize=personalize)
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        version = get_catalog_version()
+        # absolute, since pagination links embed the host
+        uri = request.build_absolute_uri()
+        digest = hashlib.sha256(uri.encode()).hexdigest()[:32]
+        etag = f"{version.version}-{digest}"
+        client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+        personal = personalize is not None and request.user.is_authenticated
+
+        if not personal and quote_etag(etag) in client_etags:
+            response = Response(status=304)
+        else:
+            cache = caches[settings.TRAIL_CATALOG_CACHE]
+            key = f"trail-catalog:{version.version}:{digest}"
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response.data, settings.TRAIL_CATALOG_CACHE_TIMEOUT)
+            if personal:
+                tag = getattr(self, personalize)(request, response.data)
+                if tag:
+                    etag = f"{etag}-{tag}"
+                if quote_etag(etag) in client_etags:
+                    response = Response(status=304)
+
+        response["ETag"] = quote_etag(etag)
+        response["Last-Modified"] = http_date(version.updated_at.timestamp())
+        # clients may keep a copy but must revalidate it every time
+        patch_cache_control(response, no_cache=True)
+        if personal:
+            patch_cache_control(response, private=True)
+            patch_vary_headers(response, ["Authorization", "Cookie"])
+        return response
+
+    return wrapper
@@ -0,0 +1,299 @@
+"""Live navigation over one WebSocket instead of the nav/* POST endpoints.
+
+The client authenticates once, then streams fixes. Each fix is folded into
+the session's running stats in memory (trail_nav.stats) and answered with a
+stats push; GPSLog rows and the stats columns are written in one bulk insert
+plus one UPDATE every FLUSH_INTERVAL_SECONDS (or FLUSH_MAX_FIXES), and on
+stop / disconnect.
+
+Client -> server messages, all JSON with a "type":
+    auth    {"token": "<Auth0 access token>"}  (unless the scope has a user)
+    start   {"trail": <id>}    stops any active session, like nav/start/
+    fix     {"latitude", "longitude", "timestamp"?, "seq"?}
+    pause / resume / stop
+
+Server -> client: "status" (the session), "stats", "prompts" (geofenced
+prompts a fix just triggered, see trail_nav.prompts), "route" (an off_route or
+back_on_route event, see trail_nav.deviation), "error".
+While a connection owns a session, fixes should only arrive through it: the
+in-memory stats are written back over whatever the HTTP endpoints stored.
+"""
+
+import asyncio
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from jose.exceptions import JOSEError
+from rest_framework.exceptions import AuthenticationFailed
+
+from user_profile.authentication import Auth0JWTAuthentication
+from user_profile.jwks import UnknownKeyError, get_verifier
+
+from .deviation import ROUTE_FIELDS, RouteTracker
+from .models import GPSLog, NavigationSession, Trail
+from .prompts import PromptScheduler, write_triggers
+from .serializers import GPSPointSerializer, NavigationStatsSerializer
+from .stats import STATS_FIELDS, apply_fix, is_late, recompute_session_stats
+from .views import end_session, start_session
+
+FLUSH_INTERVAL_SECONDS = 1.0
+FLUSH_MAX_FIXES = 500
+CLOSE_UNAUTHENTICATED = 4401
+
+
+class NavigationConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user")
+        self.user = user if user is not None and user.is_authenticated else None
+        self.session = None
+        self.prompts = None
+        self.route = None
+        self.last_seq = None
+        self.pending = []
+        self.flush_lock = asyncio.Lock()
+        self.flusher = None
+        await self.accept()
+        if self.user is not None:
+            await self.attach_active_session()
+
+    async def disconnect(self, code):
+        if self.flusher is not None:
+            self.flusher.cancel()
+        await self.flush()
+
+    async def receive_json(self, content, **kwargs):
+        kind = content.get("type") if isinstance(content, dict) else None
+        if self.user is None:
+            if kind != "auth":
+                await self.close(code=CLOSE_UNAUTHENTICATED)
+                return
+            await self.authenticate(content.get("token"))
+            return
+
+        handler = {
+            "start": self.start,
+            "fix": self.fix,
+            "pause": self.pause,
+            "resume": self.resume,
+            "stop": self.stop,
+        }.get(kind)
+        if handler is None:
+            await self.send_error(f"Unknown message type {kind!r}")
+            return
+        if kind != "start" and self.session is None:
+            await self.send_error("No active navigation session")
+            return
+        await handler(content)
+
+    async def send_error(self, error):
+        await self.send_json({"type": "error", "error": error})
+
+    async def send_status(self):
+        session = self.session
+        await self.send_json(
+            {
+                "type": "status",
+                "session": session.id,
+                "trail": session.trail_id,
+                "status": session.status,
+                "is_active": session.is_active,
+            }
+        )
+
+    async def send_stats(self, seq=None):
+        data = NavigationStatsSerializer(self.session).data
+        await self.send_json({"type": "stats", "seq": seq, "stats": data})
+
+    # authentication and session ownership
+
+    async def authenticate(self, token):
+        if not isinstance(token, str) or not token:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        try:
+            self.user = await database_sync_to_async(self.user_for_token)(token)
+        except (JOSEError, UnknownKeyError, AuthenticationFailed):
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        await self.attach_active_session()
+
+    @staticmethod
+    def user_for_token(token):
+        payload = get_verifier().verify(token)
+        return Auth0JWTAuthentication().get_user(payload)
+
+    async def attach_active_session(self):
+        session, prompts, route, last_seq = await database_sync_to_async(
+            self.load_active_session
+        )()
+        if session is None:
+            await self.send_json({"type": "status", "session": None})
+            return
+        self.session, self.prompts, self.route = session, prompts, route
+        self.last_seq = last_seq
+        self.start_flusher()
+        await self.send_status()
+        await self.send_stats()
+
+    def load_active_session(self):
+        session = NavigationSession.objects.filter(
+            user=self.user, is_active=True
+        ).first()
+        if session is None:
+            return None, None, None, None
+        last_seq = session.gps_logs.aggregate(last=Max("client_seq"))["last"]
+        return session, self.prompt_scheduler(session), RouteTracker(session), last_seq
+
+    @staticmethod
+    def prompt_scheduler(session):
+        # loaded up front so matching fixes never touches the database
+        prompts = PromptScheduler(session)
+        prompts.load_fired()
+        return prompts
+
+    def start_flusher(self):
+        if self.flusher is None:
+            self.flusher = asyncio.ensure_future(self.flush_periodically())
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            await self.flush()
+
+    # message handlers
+
+    async def start(self, content):
+        await self.flush()
+        try:
+            self.session, self.prompts, self.route = await database_sync_to_async(
+                self.create_session
+            )(content.get("trail"))
+        except (Trail.DoesNotExist, ValueError, TypeError):
+            await self.send_error("Trail not found")
+            return
+        self.last_seq = None
+        self.start_flusher()
+        await self.send_status()
+
+    def create_session(self, trail_id):
+        trail = Trail.objects.get(id=trail_id, removed_at__isnull=True)
+        session = start_session(self.user, trail)
+        return session, self.prompt_scheduler(session), RouteTracker(session)
+
+    async def fix(self, content):
+        point = GPSPointSerializer(data=content)
+        if not point.is_valid():
+            await self.send_error(point.errors)
+            return
+        point = point.validated_data
+
+        # live fixes arrive in order, so anything at or below the last seq is a
+        # resend after a reconnect
+        seq = point.get("seq")
+        if seq is not None:
+            if self.last_seq is not None and seq <= self.last_seq:
+                await self.send_stats(seq)
+                return
+            self.last_seq = seq
+
+        log = GPSLog(
+            session_id=self.session.id,
+            latitude=point["latitude"],
+            longitude=point["longitude"],
+            timestamp=point.get("timestamp", timezone.now()),
+            client_seq=seq,
+        )
+        self.pending.append(log)
+        if is_late(self.session, log.timestamp):
+            # older than fixes already folded in: store it, then replay the track
+            await self.flush()
+            stats = await database_sync_to_async(self.replayed_stats)(self.session.id)
+            for field, value in stats.items():
+                setattr(self.session, field, value)
+        else:
+            apply_fix(self.session, log.latitude, log.longitude, log.timestamp)
+        event = self.route.update(log.latitude, log.longitude, log.timestamp)
+        await self.send_stats(seq)
+        if event:
+            await self.send_json({"type": "route", "seq": seq, "event": event})
+        triggered = self.prompts.check(log.latitude, log.longitude, log.timestamp)
+        if triggered:
+            for prompt in triggered:
+                prompt["triggered_at"] = prompt["triggered_at"].isoformat()
+            await self.send_json({"type": "prompts", "prompts": triggered})
+        if len(self.pending) >= FLUSH_MAX_FIXES:
+            await self.flush()
+
+    async def pause(self, content):
+        await self.set_status("paused")
+
+    async def resume(self, content):
+        await self.set_status("started")
+
+    async def stop(self, content):
+        await self.flush()
+        session = await database_sync_to_async(self.end_locked_session)(self.session.id)
+        if self.flusher is not None:
+            self.flusher.cancel()
+            self.flusher = None
+        self.session = session
+        if session is None:
+            await self.send_error("Navigation session is no longer active")
+            return
+        await self.send_status()
+        await self.send_stats()
+        self.session = None
+
+    @staticmethod
+    def end_locked_session(session_id):
+        # locked and re-checked like nav/stop/, so a session already stopped
+        # over HTTP is not rolled up a second time
+        with transaction.atomic():
+            try:
+                session = (
+                    NavigationSession.objects.select_for_update(of=("self",))
+                    .select_related("trail")
+                    .get(id=session_id, is_active=True)
+                )
+            except NavigationSession.DoesNotExist:
+                return None
+            end_session(session)
+        return session
+
+    async def set_status(self, status):
+        self.session.status = status
+        await self.flush(extra_fields=["status"])
+        await self.send_status()
+
+    # coalesced writes
+
+    async def flush(self, extra_fields=()):
+        async with self.flush_lock:
+            session = self.session
+            if session is None or (
+                not self.pending and not self.prompts.new_triggers and not extra_fields
+            ):
+                return
+            logs, self.pending = self.pending, []
+            triggers = self.prompts.pop_triggers()
+            # snapshot now: fixes keep arriving while the write runs in a thread
+            fields = {
+                field: getattr(session, field) for field in STATS_FIELDS + ROUTE_FIELDS
+            }
+            fields.update({field: getattr(session, field) for field in extra_fields})
+            await database_sync_to_async(self.write)(session.id, logs, fields, triggers)
+
+    @staticmethod
+    def replayed_stats(session_id):
+        session = NavigationSession.objects.get(id=session_id)
+        recompute_session_stats(session)
+        return {field: getattr(session, field) for field in STATS_FIELDS}
+
+    @staticmethod
+    def write(session_id, logs, fields, triggers):
+        GPSLog.objects.bulk_create(logs, ignore_conflicts=True)
+        NavigationSession.objects.filter(id=session_id).update(**fields)
+        write_triggers(session_id, triggers)
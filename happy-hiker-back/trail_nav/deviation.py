@@ -0,0 +1,236 @@
+"""Off-trail detection: distance from each fix to the trail line, and progress.
+
+A trail's path is projected once to local metres (equirectangular around its
+first vertex, plenty for one trail) and cached per process. Each session keeps
+a cursor on the segment it was last matched to; a new fix first searches a
+small window around it, which is where a hiker almost always is. Only when the
+window's best match is off the trail does a grid of segment buckets answer the
+global nearest-segment query; that ring search stops as soon as no closer
+segment can exist, or at SEARCH_RADIUS_M. Either way the cost of a fix does
+not grow with the trail's length.
+"""
+
+import math
+import threading
+from array import array
+from collections import OrderedDict, defaultdict
+
+from .geo import EARTH_RADIUS_KM
+
+# further than this from the line is off route...
+OFF_ROUTE_M = 40.0
+# ...and closer than this is back on it; the gap stops GPS noise from flapping
+ON_ROUTE_M = 25.0
+WINDOW_BEHIND = 10
+WINDOW_AHEAD = 40
+GRID_CELL_M = 100.0
+# beyond this the trail is only searched near the cursor: the exact distance
+# of a hiker who is that far out matters less than keeping the fix cheap
+SEARCH_RADIUS_M = 500.0
+LINE_CACHE_SIZE = 256
+ROUTE_FIELDS = [
+    "route_cursor",
+    "route_distance_m",
+    "route_progress_m",
+    "off_route",
+    "route_events",
+]
+
+METRES_PER_DEG = EARTH_RADIUS_KM * 1000 * math.pi / 180
+
+
+class TrailLine:
+    """A trail path in local metres with cumulative length per vertex."""
+
+    def __init__(self, coords):
+        # coords: [(lng, lat), ...] as stored in the LineString
+        self.lat0 = coords[0][1]
+        self.kx = math.cos(math.radians(self.lat0)) * METRES_PER_DEG
+        self.xs = array("d", (lng * self.kx for lng, _ in coords))
+        self.ys = array("d", (lat * METRES_PER_DEG for _, lat in coords))
+        self.cumulative = array("d", [0.0])
+        for i in range(1, len(coords)):
+            step = math.hypot(self.xs[i] - self.xs[i - 1], self.ys[i] - self.ys[i - 1])
+            self.cumulative.append(self.cumulative[-1] + step)
+        self.segment_count = len(coords) - 1
+        self._grid = None
+
+    @property
+    def length_m(self):
+        return self.cumulative[-1]
+
+    def project(self, lat, lng):
+        return lng * self.kx, lat * METRES_PER_DEG
+
+    def _segment(self, i, x, y):
+        """(squared distance, t) from the point to segment i."""
+        ax, ay = self.xs[i], self.ys[i]
+        dx, dy = self.xs[i + 1] - ax, self.ys[i + 1] - ay
+        length = dx * dx + dy * dy
+        t = 0.0 if length == 0 else ((x - ax) * dx + (y - ay) * dy) / length
+        t = max(0.0, min(1.0, t))
+        px, py = x - ax - t * dx, y - ay - t * dy
+        return px * px + py * py, t
+
+    def _best_in(self, indices, x, y, best):
+        for i in indices:
+            d2, t = self._segment(i, x, y)
+            if d2 < best[0]:
+                best = (d2, i, t)
+        return best
+
+    def _cell(self, x, y):
+        return math.floor(x / GRID_CELL_M), math.floor(y / GRID_CELL_M)
+
+    def grid(self):
+        if self._grid is None:
+            grid = defaultdict(list)
+            for i in range(self.segment_count):
+                i0, j0 = self._cell(
+                    min(self.xs[i], self.xs[i + 1]), min(self.ys[i], self.ys[i + 1])
+                )
+                i1, j1 = self._cell(
+                    max(self.xs[i], self.xs[i + 1]), max(self.ys[i], self.ys[i + 1])
+                )
+                for ci in range(i0, i1 + 1):
+                    for cj in range(j0, j1 + 1):
+                        grid[(ci, cj)].append(i)
+            cells = list(grid)
+            self._grid_bounds = (
+                min(ci for ci, _ in cells),
+                min(cj for _, cj in cells),
+                max(ci for ci, _ in cells),
+                max(cj for _, cj in cells),
+            )
+            self._grid = grid
+        return self._grid
+
+    def nearest(self, x, y, best=(math.inf, 0, 0.0)):
+        """Global nearest segment by expanding rings of grid cells."""
+        grid = self.grid()
+        i0, j0, i1, j1 = self._grid_bounds
+        ci, cj = self._cell(x, y)
+        # rings before the first one that touches the grid are empty
+        first = max(i0 - ci, ci - i1, j0 - cj, cj - j1, 0)
+        last = max(abs(ci - i0), abs(ci - i1), abs(cj - j0), abs(cj - j1))
+        last = min(last, math.ceil(SEARCH_RADIUS_M / GRID_CELL_M) + 1)
+        seen = set()
+        for ring in range(first, last + 1):
+            # no unvisited segment can be closer than (ring - 1) cells
+            if ring > 0 and best[0] <= ((ring - 1) * GRID_CELL_M) ** 2:
+                break
+            for a in range(max(ci - ring, i0), min(ci + ring, i1) + 1):
+                if abs(a - ci) == ring:
+                    column = range(max(cj - ring, j0), min(cj + ring, j1) + 1)
+                else:
+                    column = [b for b in (cj - ring, cj + ring) if j0 <= b <= j1]
+                for b in column:
+                    for i in grid.get((a, b), ()):
+                        if i not in seen:
+                            seen.add(i)
+                            d2, t = self._segment(i, x, y)
+                            if d2 < best[0]:
+                                best = (d2, i, t)
+        return best
+
+    def locate(self, lat, lng, cursor=0):
+        """(distance_m, segment index, progress_m) for a fix, starting at cursor."""
+        x, y = self.project(lat, lng)
+        cursor = min(max(cursor, 0), self.segment_count - 1)
+        window = range(
+            max(cursor - WINDOW_BEHIND, 0),
+            min(cursor + WINDOW_AHEAD, self.segment_count - 1) + 1,
+        )
+        best = self._best_in(window, x, y, (math.inf, cursor, 0.0))
+        if best[0] > ON_ROUTE_M * ON_ROUTE_M:
+            # not clearly on the line near the cursor: the hiker skipped
+            # ahead, turned back, or left the trail
+            best = self.nearest(x, y, best)
+        d2, i, t = best
+        progress = self.cumulative[i] + t * (
+            self.cumulative[i + 1] - self.cumulative[i]
+        )
+        return math.sqrt(d2), i, progress
+
+
+_lines = OrderedDict()
+_lines_version = None
+_lines_lock = threading.Lock()
+
+
+def get_trail_line(trail_id):
+    """The cached TrailLine for a trail, or None if it has no usable path."""
+    from .catalog import recent_catalog_version
+
+    global _lines_version
+    version = recent_catalog_version()
+    with _lines_lock:
+        if _lines_version != version:
+            # an import moved paths without signals
+            _lines.clear()
+            _lines_version = version
+        if trail_id in _lines:
+            _lines.move_to_end(trail_id)
+            return _lines[trail_id]
+    from .models import Trail
+
+    path = Trail.objects.filter(id=trail_id).values_list("path", flat=True).first()
+    # trails without a path are cached too, so their fixes skip the query
+    line = TrailLine(path.coords) if path is not None and len(path) >= 2 else None
+    with _lines_lock:
+        _lines[trail_id] = line
+        while len(_lines) > LINE_CACHE_SIZE:
+            _lines.popitem(last=False)
+    return line
+
+
+def invalidate_trail_line(trail_id=None, **kwargs):
+    """Forget one trail's line, or every line when no id is given."""
+    with _lines_lock:
+        if trail_id is None:
+            _lines.clear()
+        else:
+            _lines.pop(trail_id, None)
+
+
+class RouteTracker:
+    """Advances a session's on-route state per fix.
+
+    Call update() for each fix in time order, then save the session's
+    ROUTE_FIELDS. Sessions on a trail without a path are left untouched.
+    """
+
+    def __init__(self, session, line=None):
+        self.session = session
+        self.line = line if line is not None else get_trail_line(session.trail_id)
+
+    def update(self, latitude, longitude, timestamp):
+        """The off_route / back_on_route event this fix caused, if any."""
+        if self.line is None:
+            return None
+        session = self.session
+        distance, cursor, progress = self.line.locate(
+            latitude, longitude, session.route_cursor
+        )
+        session.route_cursor = cursor
+        session.route_distance_m = distance
+        if not session.off_route and distance > OFF_ROUTE_M:
+            session.off_route, kind = True, "off_route"
+        elif session.off_route and distance < ON_ROUTE_M:
+            session.off_route, kind = False, "back_on_route"
+        else:
+            kind = None
+        # progress holds where the hiker left the trail until they rejoin it
+        if not session.off_route:
+            session.route_progress_m = progress
+        if kind is None:
+            return None
+        event = {
+            "event": kind,
+            "at": timestamp.isoformat(),
+            "distance_m": round(distance, 1),
+            "progress_m": round(progress, 1),
+        }
+        # a new list, so a snapshot taken before this fix keeps its own
+        session.route_events = [*session.route_events, event]
+        return event
@@ -0,0 +1,257 @@
+"""Elevation sampling from local DEM GeoTIFF tiles.
+
+Each tile's band is converted once to a ``.npy`` sidecar and opened with
+``numpy.load(mmap_mode="r")``, so a lookup only pages in the rows it touches
+and every worker process shares the OS page cache instead of holding its own
+copy. Open tiles are kept in a small LRU; a whole polyline is sampled in one
+vectorized call, grouped by tile, with bilinear interpolation.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .geo import EARTH_RADIUS_KM
+
+
+class NoElevationData(Exception):
+    pass
+
+
+def raster_bounds(geotransform, width, height):
+    """(west, south, east, north) of a north-up raster."""
+    origin_x, scale_x, _, origin_y, _, scale_y = geotransform
+    xs = (origin_x, origin_x + width * scale_x)
+    ys = (origin_y, origin_y + height * scale_y)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+class DEMTile:
+    """One north-up raster: ``data[row, col]`` with a GDAL style geotransform."""
+
+    def __init__(self, data, geotransform, nodata=None):
+        self.data = data
+        self.origin_x, self.scale_x, _, self.origin_y, _, self.scale_y = geotransform
+        self.nodata = nodata
+
+    @classmethod
+    def open(cls, path):
+        from django.contrib.gis.gdal import GDALRaster
+
+        path = Path(path)
+        raster = GDALRaster(str(path))
+        band = raster.bands[0]
+        sidecar = path.with_suffix(".npy")
+        if not sidecar.exists() or sidecar.stat().st_mtime < path.stat().st_mtime:
+            # a private temp file per writer: workers opening the same tile at
+            # once each write their own, and the last rename wins
+            fd, tmp = tempfile.mkstemp(dir=sidecar.parent, suffix=".npy.tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, band.data())
+                os.replace(tmp, sidecar)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        return cls(
+            np.load(sidecar, mmap_mode="r"), raster.geotransform, band.nodata_value
+        )
+
+    def sample(self, lats, lngs):
+        """Bilinear elevation at each point (pixel values sit at pixel centres)."""
+        rows, cols = self.data.shape
+        x = np.clip((lngs - self.origin_x) / self.scale_x - 0.5, 0, cols - 1)
+        y = np.clip((lats - self.origin_y) / self.scale_y - 0.5, 0, rows - 1)
+        x0 = np.minimum(np.floor(x).astype(np.intp), max(cols - 2, 0))
+        y0 = np.minimum(np.floor(y).astype(np.intp), max(rows - 2, 0))
+        x1 = np.minimum(x0 + 1, cols - 1)
+        y1 = np.minimum(y0 + 1, rows - 1)
+        fx, fy = x - x0, y - y0
+
+        corners = [
+            self.data[y0, x0],
+            self.data[y0, x1],
+            self.data[y1, x0],
+            self.data[y1, x1],
+        ]
+        corners = [np.asarray(c, dtype=np.float64) for c in corners]
+        if self.nodata is not None:
+            for c in corners:
+                c[c == self.nodata] = np.nan
+        top = corners[0] * (1 - fx) + corners[1] * fx
+        bottom = corners[2] * (1 - fx) + corners[3] * fx
+        return top * (1 - fy) + bottom * fy
+
+
+class DEMStore:
+    """The tiles in one directory, opened lazily and kept in an LRU."""
+
+    def __init__(self, directory, cache_size=8, opener=DEMTile.open, recheck_seconds=5):
+        self.directory = Path(directory)
+        self.cache_size = cache_size
+        self.opener = opener
+        # how often the directory is looked at for added, removed or replaced
+        # tiles; None never looks again once indexed
+        self.recheck_seconds = recheck_seconds
+        self._index = None
+        self._checked_at = None
+        self._directory_mtime = None
+        self._headers = {}  # path -> (mtime_ns, bounds)
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index(self):
+        """(bounds, path) for every tile; only headers are read.
+
+        Tiles dropped into (or removed from) the directory are picked up within
+        recheck_seconds, without a restart. Only new or modified files have
+        their headers read again.
+        """
+        if self._index is not None:
+            if self.recheck_seconds is None:
+                return self._index
+            now = time.monotonic()
+            if now - self._checked_at < self.recheck_seconds:
+                return self._index
+            self._checked_at = now
+            if self._stat_directory() == self._directory_mtime:
+                return self._index
+        self._rescan()
+        return self._index
+
+    def _stat_directory(self):
+        try:
+            return self.directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _rescan(self):
+        from django.contrib.gis.gdal import GDALRaster
+
+        # stamped before listing, so a change during the scan triggers another
+        self._directory_mtime = self._stat_directory()
+        self._checked_at = time.monotonic()
+        headers, index = {}, []
+        for path in sorted(self.directory.glob("*.tif")):
+            mtime = path.stat().st_mtime_ns
+            known = self._headers.get(path)
+            if known is not None and known[0] == mtime:
+                bounds = known[1]
+            else:
+                raster = GDALRaster(str(path))
+                bounds = raster_bounds(raster.geotransform, raster.width, raster.height)
+            headers[path] = (mtime, bounds)
+            index.append((bounds, path))
+        # replaced or deleted tiles must not be served from the LRU
+        changed = [
+            path
+            for path, (mtime, _) in self._headers.items()
+            if path not in headers or headers[path][0] != mtime
+        ]
+        with self._lock:
+            for path in changed:
+                self._tiles.pop(path, None)
+        self._headers = headers
+        self._index = index
+
+    def tile(self, path):
+        with self._lock:
+            tile = self._tiles.get(path)
+            if tile is not None:
+                self._tiles.move_to_end(path)
+                return tile
+        tile = self.opener(path)
+        with self._lock:
+            self._tiles[path] = tile
+            self._tiles.move_to_end(path)
+            while len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def sample(self, lats, lngs):
+        """Elevation in metres for each point; NaN where no tile has data."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        elevations = np.full(lats.shape, np.nan)
+        pending = np.ones(lats.shape, dtype=bool)
+        for (west, south, east, north), path in self.index():
+            mask = (
+                pending
+                & (lngs >= west)
+                & (lngs <= east)
+                & (lats >= south)
+                & (lats <= north)
+            )
+            if not mask.any():
+                continue
+            elevations[mask] = self.tile(path).sample(lats[mask], lngs[mask])
+            pending &= ~mask
+            if not pending.any():
+                break
+        return elevations
+
+
+def cumulative_distance_m(lats, lngs):
+    """Haversine distance along the polyline, 0 at the first point."""
+    lat = np.radians(lats)
+    lng = np.radians(lngs)
+    a = (
+        np.sin(np.diff(lat) / 2) ** 2
+        + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lng) / 2) ** 2
+    )
+    steps = 2 * EARTH_RADIUS_KM * 1000 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return np.concatenate([[0.0], np.cumsum(steps)])
+
+
+def resample(lats, lngs, samples):
+    """``samples`` points evenly spaced by distance along the polyline."""
+    distance = cumulative_distance_m(lats, lngs)
+    if len(lats) < 2 or distance[-1] == 0:
+        return np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+    stations = np.linspace(0, distance[-1], samples)
+    return np.interp(stations, distance, lats), np.interp(stations, distance, lngs)
+
+
+def elevation_profile(store, lats, lngs, samples=None):
+    """Sample a polyline and total up its climb and descent.
+
+    Raises NoElevationData when any sampled point falls outside the DEM.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if samples:
+        lats, lngs = resample(lats, lngs, samples)
+    elevations = store.sample(lats, lngs)
+    if np.isnan(elevations).any():
+        raise NoElevationData("Part of the route has no elevation data")
+    diffs = np.diff(elevations)
+    return {
+        "distance_m": cumulative_distance_m(lats, lngs),
+        "elevation_m": elevations,
+        "latitude": lats,
+        "longitude": lngs,
+        "gain_m": float(diffs[diffs > 0].sum()),
+        "loss_m": float(-diffs[diffs < 0].sum()),
+    }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_dem_store():
+    """The process-wide store for settings.DEM_TILE_DIR."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DEMStore(
+                    settings.DEM_TILE_DIR, cache_size=settings.DEM_TILE_CACHE_SIZE
+                )
+    return _store
@@ -0,0 +1,87 @@
+import heapq
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two lat/long points in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def parse_float_list(value, count):
+    """Parse a comma separated query param like "37.7,-119.5" into floats."""
+    parts = value.split(",")
+    if len(parts) != count:
+        raise ValueError(f"expected {count} comma separated numbers")
+    return [float(part) for part in parts]
+
+
+def _project(points):
+    """Equirectangular projection to metres, accurate enough over one hike."""
+    lat0 = math.radians(sum(p[0] for p in points) / len(points))
+    kx = math.cos(lat0) * EARTH_RADIUS_KM * 1000 * math.pi / 180
+    ky = EARTH_RADIUS_KM * 1000 * math.pi / 180
+    return [(p[1] * kx, p[0] * ky) for p in points]
+
+
+def _segment_distance(p, a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(p[0] - a[0], p[1] - a[1])
+    t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def simplify_track(points, tolerance_m=0.0, max_points=None):
+    """Douglas-Peucker simplification of (lat, long, ...) tuples.
+
+    Segments are split in order of largest deviation first, so the result is
+    the best shape for either budget: stop once every dropped point is within
+    ``tolerance_m`` metres of the kept line, or once ``max_points`` are kept.
+    """
+    n = len(points)
+    if n <= 2 or (max_points is not None and max_points >= n and not tolerance_m):
+        return list(points)
+    xy = _project(points)
+
+    def farthest(i, j):
+        best, best_k = -1.0, None
+        for k in range(i + 1, j):
+            d = _segment_distance(xy[k], xy[i], xy[j])
+            if d > best:
+                best, best_k = d, k
+        return best, best_k
+
+    keep = {0, n - 1}
+    heap = []
+    dist, k = farthest(0, n - 1)
+    if k is not None:
+        heap.append((-dist, 0, n - 1, k))
+    budget = max(2, max_points) if max_points is not None else n
+    while heap and len(keep) < budget:
+        neg_dist, i, j, k = heapq.heappop(heap)
+        if -neg_dist <= tolerance_m:
+            break
+        keep.add(k)
+        for a, b in ((i, k), (k, j)):
+            dist, mid = farthest(a, b)
+            if mid is not None:
+                heapq.heappush(heap, (-dist, a, b, mid))
+    return [points[i] for i in sorted(keep)]
+
+
+def track_length_m(points):
+    """Total haversine length of a sequence of (lat, long, ...) tuples, in metres."""
+    total = 0.0
+    for prev, point in zip(points, points[1:]):
+        total += haversine_km(prev[0], prev[1], point[0], point[1])
+    return total * 1000
@@ -0,0 +1,41 @@
+import statistics
+import time
+
+
+class Rollback(Exception):
+    """Raised inside transaction.atomic() to throw away seeded benchmark data."""
+
+
+def time_call(fn, repeat=20, warmup=2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def format_summary(label, samples):
+    stats = summarize(samples)
+    return (
+        f"{label:<40} median {stats['median_ms']:>9.3f} ms"
+        f"  p95 {stats['p95_ms']:>9.3f} ms  ({stats['runs']} runs)"
+    )
@@ -0,0 +1,70 @@
+import random
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from trail_nav.elevation import DEMStore, DEMTile, raster_bounds
+from ._bench import format_summary, time_call
+
+
+class Command(BaseCommand):
+    help = "Benchmark DEM profile sampling: vectorized batch vs per-point lookups"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=5000)
+        parser.add_argument(
+            "--tile-size", type=int, default=3601, help="SRTM1 is 3601x3601"
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        size = options["tile_size"]
+        pixel = 1 / (size - 1)
+        geotransform = [-120 - pixel / 2, pixel, 0, 38 + pixel / 2, 0, -pixel]
+
+        with tempfile.TemporaryDirectory() as directory:
+            # a memory-mapped .npy tile, as DEMTile.open leaves behind
+            sidecar = Path(directory) / "bench.npy"
+            np.save(sidecar, rng.uniform(500, 3000, (size, size)).astype(np.int16))
+
+            def opener(path):
+                return DEMTile(np.load(sidecar, mmap_mode="r"), geotransform)
+
+            store = DEMStore(directory, opener=opener, recheck_seconds=None)
+            store._index = [(raster_bounds(geotransform, size, size), sidecar)]
+
+            walk = random.Random(options["seed"])
+            lat, lng = 37.5, -119.5
+            lats, lngs = [], []
+            for _ in range(options["points"]):
+                lat += walk.uniform(-1e-4, 1e-4)
+                lng += walk.uniform(-1e-4, 1e-4)
+                lats.append(lat)
+                lngs.append(lng)
+
+            def per_point():
+                return [store.sample([a], [b])[0] for a, b in zip(lats, lngs)]
+
+            def vectorized():
+                return store.sample(lats, lngs)
+
+            self.stdout.write(
+                f"🏔️  {options['points']} points on a {size}x{size} memory-mapped tile"
+            )
+            self.stdout.write(
+                format_summary(
+                    "per-point lookups",
+                    time_call(per_point, repeat=max(3, options["repeat"] // 4)),
+                )
+            )
+            self.stdout.write(
+                format_summary(
+                    "vectorized batch", time_call(vectorized, options["repeat"])
+                )
+            )
+
+        self.stdout.write(self.style.SUCCESS("🎉 Benchmark complete."))
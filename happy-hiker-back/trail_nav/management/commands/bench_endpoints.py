@@ -0,0 +1,379 @@
+import json
+import random
+import subprocess
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, OuterRef, Subquery
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from trail_nav.models import GPSLog, NavigationSession, Trail, TrailImage
+from user_profile.models import Favorite, Profile, User as ProfileUser
+from ._bench import summarize, time_call
+from .bench_trail_catalog import BENCH_CACHES
+from .bench_trail_spatial import seed_trails
+
+SCALES = {
+    "small": {
+        "trails": 1_000,
+        "images_per_trail": 2,
+        "users": 20,
+        "sessions_per_user": 5,
+        "points_per_session": 100,
+    },
+    "medium": {
+        "trails": 20_000,
+        "images_per_trail": 3,
+        "users": 200,
+        "sessions_per_user": 20,
+        "points_per_session": 300,
+    },
+    "large": {
+        "trails": 200_000,
+        "images_per_trail": 3,
+        "users": 1_000,
+        "sessions_per_user": 50,
+        "points_per_session": 200,
+    },
+}
+ENDPOINTS = ["trails_list", "nav_update", "nav_history", "user_register"]
+# SQL statements per request once warm; must not grow with the data
+QUERY_BUDGETS = {
+    "trails_list": 4,  # catalog version, the page, its images, the favorites
+    "nav_update": 3,  # lock the session, insert the fix, update the stats
+    "nav_history": 1,
+    "user_register": 1,
+}
+# p95 of the sequential micro-benchmark on a developer machine
+LATENCY_BUDGETS_MS = {
+    "trails_list": 100.0,
+    "nav_update": 50.0,
+    "nav_history": 50.0,
+    "user_register": 25.0,
+}
+FAVORITES_PER_USER = 10
+BATCH_SIZE = 10_000
+
+
+def _bulk(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def seed(counts, rng, prefix="bench"):
+    """Synthetic trails, images, hikers and their sessions; returns the hikers.
+
+    Every hiker gets a profile, a few favorite trails, ``sessions_per_user``
+    stopped sessions with GPS points and one active session to post fixes to.
+    Rows go in with bulk_create, so no signals fire.
+    """
+    seed_trails(counts["trails"], rng)
+    trail_ids = list(Trail.objects.values_list("id", flat=True))
+    _bulk(
+        TrailImage,
+        (
+            TrailImage(trail_id=pk, image=f"https://example.com/{pk}/{n}.jpg")
+            for pk in trail_ids[-counts["trails"] :]
+            for n in range(counts["images_per_trail"])
+        ),
+    )
+
+    # accounts are named after the Auth0 sub, as authentication creates them
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(username=f"auth0|{prefix}-{i}") for i in range(counts["users"])
+    )
+    hikers = ProfileUser.objects.bulk_create(
+        ProfileUser(
+            auth0_id=user.username,
+            name=f"Bench Hiker {i}",
+            email=f"{prefix}-{i}@example.com",
+            account=user,
+        )
+        for i, user in enumerate(users)
+    )
+    profiles = Profile.objects.bulk_create(Profile(user=hiker) for hiker in hikers)
+    favorites = [
+        Favorite(user_profile=profile, trail_id=pk)
+        for profile in profiles
+        for pk in rng.sample(trail_ids, min(FAVORITES_PER_USER, len(trail_ids)))
+    ]
+    _bulk(Favorite, favorites)
+    counts = (
+        Favorite.objects.filter(trail=OuterRef("pk"))
+        .values("trail")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Trail.objects.filter(pk__in={favorite.trail_id for favorite in favorites}).update(
+        favorite_count=Subquery(counts)
+    )
+
+    start = timezone.now() - timedelta(days=counts["sessions_per_user"])
+    points = counts["points_per_session"]
+    sessions = []
+    for user in users:
+        for n in range(counts["sessions_per_user"]):
+            sessions.append(
+                NavigationSession(
+                    trail_id=rng.choice(trail_ids),
+                    user=user,
+                    is_active=False,
+                    status="stopped",
+                    point_count=points,
+                    distance_m=points * 1.1,
+                    moving_seconds=points,
+                    last_fix_at=start + timedelta(days=n, seconds=points),
+                )
+            )
+        sessions.append(NavigationSession(trail_id=rng.choice(trail_ids), user=user))
+    _bulk(NavigationSession, sessions)
+    stopped = NavigationSession.objects.filter(
+        user__in=users, is_active=False
+    ).values_list("id", flat=True)
+    _bulk(
+        GPSLog,
+        (
+            GPSLog(
+                session_id=session_id,
+                latitude=37.7 + i * 1e-5,
+                longitude=-119.5,
+                timestamp=start + timedelta(seconds=i),
+                client_seq=i,
+            )
+            for session_id in stopped.iterator()
+            for i in range(points)
+        ),
+    )
+    return users
+
+
+def request(client, endpoint, hiker, tick):
+    """One request to ``endpoint`` as seeded hiker number ``hiker``."""
+    if endpoint == "trails_list":
+        return client.get("/api/trails/", {"page_size": 50})
+    if endpoint == "nav_update":
+        return client.post(
+            "/api/nav/update/",
+            {"latitude": 37.7 + tick * 1e-5, "longitude": -119.5 + hiker * 1e-3},
+            format="json",
+        )
+    if endpoint == "nav_history":
+        return client.get("/api/nav/history/")
+    if endpoint == "user_register":
+        # a returning login, the common case
+        return client.post(
+            "/user/register/",
+            {
+                "auth0_id": f"auth0|bench-{hiker}",
+                "name": f"Bench Hiker {hiker}",
+                "email": f"bench-{hiker}@example.com",
+            },
+            format="json",
+        )
+    raise ValueError(f"Unknown endpoint {endpoint!r}")
+
+
+def count_queries(queries):
+    # savepoints only appear when a test case wraps the request in a transaction
+    return sum(
+        1
+        for query in queries
+        if not query["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database at several scales, benchmark the hot endpoints "
+        "sequentially and under concurrent load, and check query and p95 budgets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", nargs="+", choices=list(SCALES), default=["small", "medium"]
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=200, help="per load worker")
+        parser.add_argument(
+            "--json", dest="json_path", help="write results here ('-' for stdout)"
+        )
+        parser.add_argument(
+            "--keepdb", action="store_true", help="reuse the benchmark database"
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        results = {
+            "commit": git_commit(),
+            "database": connection.vendor,
+            "started_at": timezone.now().isoformat(),
+            "scales": {},
+        }
+        failures = []
+        old_name = connection.settings_dict["NAME"]
+        # the load workers use their own connections, so seed data has to be
+        # committed; a test database keeps it away from real data
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            with override_settings(
+                CACHES=BENCH_CACHES,
+                TRAIL_CATALOG_CACHE="bench-off",
+                ALLOWED_HOSTS=["testserver"],
+            ):
+                for scale in options["scale"]:
+                    call_command("flush", interactive=False, verbosity=0)
+                    rng = random.Random(options["seed"])
+                    counts = SCALES[scale]
+                    self.stdout.write(f"🌱 Seeding {scale}: {counts}")
+                    users = seed(counts, rng)
+                    result = {"counts": counts}
+                    result["endpoints"] = self.micro(users, options["repeat"])
+                    result["load"] = self.load(
+                        users, options["concurrency"], options["requests"]
+                    )
+                    results["scales"][scale] = result
+                    failures += [f"{scale} {failure}" for failure in self.check(result)]
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+
+        results["failures"] = failures
+        if options["json_path"] == "-":
+            self.stdout.write(json.dumps(results, indent=2))
+        elif options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"📝 Results written to {options['json_path']}")
+        if failures:
+            raise CommandError("Budgets exceeded:\n  " + "\n  ".join(failures))
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (benchmark database dropped).")
+        )
+
+    def micro(self, users, repeat):
+        client = APIClient()
+        client.force_authenticate(users[0])
+        endpoints = {}
+        for endpoint in ENDPOINTS:
+            ticks = iter(range(10**9))
+            samples = time_call(
+                lambda: request(client, endpoint, 0, next(ticks)), repeat
+            )
+            with CaptureQueriesContext(connection) as queries:
+                response = request(client, endpoint, 0, next(ticks))
+            endpoints[endpoint] = {
+                **summarize(samples),
+                "status": response.status_code,
+                "queries": count_queries(queries.captured_queries),
+            }
+            stats = endpoints[endpoint]
+            self.stdout.write(
+                f"⏱️  {endpoint:<16} median {stats['median_ms']:>8.3f} ms"
+                f"  p95 {stats['p95_ms']:>8.3f} ms  {stats['queries']} queries"
+            )
+        return endpoints
+
+    def load(self, users, concurrency, per_worker):
+        """Workers each replay the endpoint mix as their own hiker."""
+        latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        errors = []
+        lock = threading.Lock()
+
+        def worker(hiker):
+            client = APIClient()
+            client.force_authenticate(users[hiker])
+            mine = {endpoint: [] for endpoint in ENDPOINTS}
+            try:
+                for tick in range(per_worker):
+                    endpoint = ENDPOINTS[tick % len(ENDPOINTS)]
+                    began = time.perf_counter()
+                    response = request(client, endpoint, hiker, tick)
+                    mine[endpoint].append((time.perf_counter() - began) * 1000)
+                    if response.status_code >= 400:
+                        with lock:
+                            errors.append(f"{endpoint} {response.status_code}")
+            finally:
+                connection.close()
+                with lock:
+                    for endpoint, samples in mine.items():
+                        latencies[endpoint] += samples
+
+        workers = [
+            threading.Thread(target=worker, args=(i % len(users),))
+            for i in range(concurrency)
+        ]
+        began = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        total = sum(len(samples) for samples in latencies.values())
+        result = {
+            "concurrency": concurrency,
+            "requests": total,
+            "errors": len(errors),
+            "seconds": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 1),
+            "endpoints": {
+                endpoint: summarize(samples)
+                for endpoint, samples in latencies.items()
+                if samples
+            },
+        }
+        self.stdout.write(
+            f"🚦 {concurrency} workers: {total} requests in {elapsed:.2f} s"
+            f" ({result['throughput_rps']} req/s, {len(errors)} errors)"
+        )
+        for endpoint, stats in result["endpoints"].items():
+            self.stdout.write(
+                f"   {endpoint:<16} median {stats['median_ms']:>8.3f} ms"
+                f"  p95 {stats['p95_ms']:>8.3f} ms"
+            )
+        return result
+
+    def check(self, result):
+        failures = []
+        for endpoint, stats in result["endpoints"].items():
+            if stats["status"] >= 400:
+                failures.append(f"{endpoint}: HTTP {stats['status']}")
+            if stats["queries"] > QUERY_BUDGETS[endpoint]:
+                failures.append(
+                    f"{endpoint}: {stats['queries']} queries"
+                    f" > budget {QUERY_BUDGETS[endpoint]}"
+                )
+            if stats["p95_ms"] > LATENCY_BUDGETS_MS[endpoint]:
+                failures.append(
+                    f"{endpoint}: p95 {stats['p95_ms']} ms"
+                    f" > budget {LATENCY_BUDGETS_MS[endpoint]} ms"
+                )
+        if result["load"]["errors"]:
+            failures.append(f"load: {result['load']['errors']} failed requests")
+        return failures
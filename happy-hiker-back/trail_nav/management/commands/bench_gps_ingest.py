@@ -0,0 +1,97 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from trail_nav.models import GPSLog, NavigationSession, Trail
+from ._bench import Rollback
+
+
+def fake_track(count, start_seq=0):
+    now = timezone.now()
+    return [
+        {
+            "latitude": 37.7456 + i * 1e-5,
+            "longitude": -119.5936 + i * 1e-5,
+            "timestamp": (now + timedelta(seconds=i)).isoformat(),
+            "seq": start_seq + i,
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Compare single-point and batched /api/nav/update/ ingestion throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--points", type=int, default=3600, help="one hiker-hour at 1 Hz"
+        )
+        parser.add_argument("--batch-size", type=int, default=60)
+
+    def handle(self, *args, **options):
+        total = options["points"]
+        batch_size = options["batch_size"]
+
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create(username="bench-hiker")
+                trail = Trail.objects.create(
+                    name="Bench Trail", lat=37.7456, long=-119.5936
+                )
+                client = APIClient()
+                client.force_authenticate(user)
+
+                def run(label, send):
+                    NavigationSession.objects.filter(user=user).update(is_active=False)
+                    session = NavigationSession.objects.create(trail=trail, user=user)
+                    start = time.perf_counter()
+                    requests = send()
+                    elapsed = time.perf_counter() - start
+                    stored = GPSLog.objects.filter(session=session).count()
+                    self.stdout.write(
+                        f"{label:<28} {stored:>7} points  {requests:>5} requests"
+                        f"  {elapsed:8.3f} s  {stored / elapsed:10.0f} points/s"
+                    )
+
+                def single():
+                    for point in fake_track(total):
+                        client.post("/api/nav/update/", point, format="json")
+                    return total
+
+                def batched():
+                    track = fake_track(total)
+                    for i in range(0, total, batch_size):
+                        client.post(
+                            "/api/nav/update/",
+                            {"points": track[i : i + batch_size]},
+                            format="json",
+                        )
+                    return -(-total // batch_size)
+
+                def batched_with_retries():
+                    # every batch is uploaded twice, as a flaky connection would
+                    track = fake_track(total)
+                    for i in range(0, total, batch_size):
+                        for _ in range(2):
+                            client.post(
+                                "/api/nav/update/",
+                                {"points": track[i : i + batch_size]},
+                                format="json",
+                            )
+                    return 2 * -(-total // batch_size)
+
+                run("single point per request", single)
+                run(f"batches of {batch_size}", batched)
+                run(f"batches of {batch_size}, retried", batched_with_retries)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
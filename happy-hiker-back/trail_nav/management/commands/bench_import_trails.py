@@ -0,0 +1,89 @@
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ._bench import Rollback
+from .import_trails import fixture_name
+
+
+def write_fixtures(directory, park_codes, items_per_park, page_size, rng):
+    """Synthetic NPS pages shaped like /thingstodo and /places responses."""
+    for park in park_codes:
+        for endpoint in ["thingstodo", "places"]:
+            items = [
+                {
+                    "id": f"{park}-{endpoint}-{i}",
+                    "title": f"{park} {endpoint} Trail {i}",
+                    "shortDescription": f"A {rng.randint(1, 12)} mile hike, {rng.randint(200, 4000)} feet of elevation.",
+                    "listingDescription": "Trailhead with a hiking loop.",
+                    "latitude": str(rng.uniform(30, 45)),
+                    "longitude": str(rng.uniform(-120, -75)),
+                    "images": [
+                        {
+                            "url": f"https://example.com/{park}/{endpoint}/{i}/{n}.jpg",
+                            "caption": "",
+                        }
+                        for n in range(rng.randint(0, 4))
+                    ],
+                }
+                for i in range(items_per_park)
+            ]
+            for start in range(0, len(items), page_size):
+                page = {
+                    "total": str(len(items)),
+                    "data": items[start : start + page_size],
+                }
+                (Path(directory) / fixture_name(endpoint, park, start)).write_text(
+                    json.dumps(page)
+                )
+
+
+class Command(BaseCommand):
+    help = "Benchmark import_trails offline by replaying synthetic fixture pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--parks", type=int, default=20)
+        parser.add_argument("--items-per-park", type=int, default=500)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument(
+            "--runs", type=int, default=2, help="repeat runs show re-import cost"
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        park_codes = [f"P{i:03d}" for i in range(options["parks"])]
+        with tempfile.TemporaryDirectory() as directory:
+            write_fixtures(
+                directory,
+                park_codes,
+                options["items_per_park"],
+                options["page_size"],
+                rng,
+            )
+            try:
+                with transaction.atomic():
+                    for run in range(1, options["runs"] + 1):
+                        start = time.perf_counter()
+                        call_command(
+                            "import_trails",
+                            *park_codes,
+                            fixtures=directory,
+                            page_size=options["page_size"],
+                            stdout=self.stdout,
+                        )
+                        self.stdout.write(
+                            f"run {run}: {time.perf_counter() - start:.2f}s total"
+                        )
+                    raise Rollback
+            except Rollback:
+                pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (imported data rolled back).")
+        )
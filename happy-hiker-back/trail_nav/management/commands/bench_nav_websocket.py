@@ -0,0 +1,115 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from trail_nav.models import NavigationSession, Trail
+from trail_nav.websocket_urls import websocket_urlpatterns
+from ._bench import summarize, time_call
+
+
+def fix(hiker, tick, now):
+    return {
+        "latitude": 37.7456 + tick * 1e-5 + hiker * 1e-3,
+        "longitude": -119.5936 + tick * 1e-5,
+        "timestamp": (now + timedelta(seconds=tick)).isoformat(),
+        "seq": tick,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Estimate how many 1 Hz hikers one worker sustains: HTTP nav/update "
+        "per fix vs the coalescing WebSocket"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hikers", type=int, default=200)
+        parser.add_argument("--ticks", type=int, default=20, help="fixes per hiker")
+        parser.add_argument("--http-requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        hikers = options["hikers"]
+        ticks = options["ticks"]
+        User = get_user_model()
+        # the consumer writes from worker threads, so the seed data is committed
+        # and deleted afterwards rather than rolled back
+        users = User.objects.bulk_create(
+            User(username=f"bench-ws-{i}") for i in range(hikers)
+        )
+        trail = Trail.objects.create(name="Bench WS Trail", lat=37.7456, long=-119.5936)
+        try:
+            self.bench_http(users[0], trail, options["http_requests"])
+            self.bench_websocket(users, trail, ticks)
+        finally:
+            NavigationSession.objects.filter(trail=trail).delete()
+            trail.delete()
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data removed).")
+        )
+
+    def bench_http(self, user, trail, count):
+        client = APIClient()
+        client.force_authenticate(user)
+        client.post("/api/nav/start/", {"trail": trail.id}, format="json")
+        now = timezone.now()
+        ticks = iter(range(count + 10))
+        samples = time_call(
+            lambda: client.post(
+                "/api/nav/update/", fix(0, next(ticks), now), format="json"
+            ),
+            repeat=count,
+        )
+        median_ms = summarize(samples)["median_ms"]
+        self.stdout.write(
+            f"🌐 HTTP nav/update/: median {median_ms:.3f} ms per fix "
+            f"-> ~{1000 / median_ms:,.0f} hikers at 1 Hz per worker"
+        )
+
+    def bench_websocket(self, users, trail, ticks):
+        application = URLRouter(websocket_urlpatterns)
+        now = timezone.now()
+
+        async def run():
+            communicators = []
+            for user in users:
+                communicator = WebsocketCommunicator(application, "/ws/nav/")
+                communicator.scope["user"] = user
+                await communicator.connect()
+                await communicator.receive_json_from()
+                await communicator.send_json_to({"type": "start", "trail": trail.id})
+                await communicator.receive_json_from()
+                communicators.append(communicator)
+
+            tick_seconds = []
+            for tick in range(ticks):
+                started = time.perf_counter()
+                for hiker, communicator in enumerate(communicators):
+                    await communicator.send_json_to(
+                        {"type": "fix", **fix(hiker, tick, now)}
+                    )
+                await asyncio.gather(
+                    *(c.receive_json_from(timeout=30) for c in communicators)
+                )
+                tick_seconds.append(time.perf_counter() - started)
+
+            for communicator in communicators:
+                await communicator.disconnect(timeout=30)
+            return tick_seconds
+
+        tick_seconds = async_to_sync(run)()
+        per_tick_ms = summarize([s * 1000 for s in tick_seconds])["median_ms"]
+        self.stdout.write(
+            f"🔌 WebSocket: {len(users)} hikers, median {per_tick_ms:.1f} ms "
+            f"per round of fixes ({per_tick_ms / len(users):.3f} ms per fix) "
+            f"-> ~{len(users) * 1000 / per_tick_ms:,.0f} hikers at 1 Hz per worker"
+        )
@@ -0,0 +1,70 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from trail_nav.prompts import PromptIndex, PromptZone
+from ._bench import format_summary, time_call
+
+
+def synthetic_zones(count, rng):
+    """Circles and short corridors scattered over roughly one national park."""
+    zones = []
+    for i in range(count):
+        lat, lng = rng.uniform(37.5, 38.2), rng.uniform(-119.9, -119.2)
+        if rng.random() < 0.7:
+            path = [(lat, lng)]
+        else:
+            path = [(lat, lng)]
+            for _ in range(rng.randint(2, 20)):
+                lat += rng.uniform(-0.001, 0.001)
+                lng += rng.uniform(-0.001, 0.001)
+                path.append((lat, lng))
+        zones.append(PromptZone(i + 1, rng.uniform(20, 300), path=path))
+    return zones
+
+
+class Command(BaseCommand):
+    help = "Benchmark geofenced prompt matching per GPS fix: grid index vs linear scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--zones", type=int, nargs="+", default=[1_000, 5_000, 20_000]
+        )
+        parser.add_argument("--fixes", type=int, default=10_000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        fixes = [
+            (rng.uniform(37.5, 38.2), rng.uniform(-119.9, -119.2))
+            for _ in range(options["fixes"])
+        ]
+
+        for count in options["zones"]:
+            zones = synthetic_zones(count, rng)
+            index = PromptIndex(zones)
+            self.stdout.write(f"🧘 {count} prompt zones")
+
+            def grid():
+                for lat, lng in fixes:
+                    index.match(lat, lng)
+
+            def linear():
+                for lat, lng in fixes[:100]:
+                    [zone for zone in zones if zone.contains(lat, lng)]
+
+            # both report milliseconds per batch; scale to microseconds per fix
+            for label, fn, per_run in [
+                ("grid index", grid, len(fixes)),
+                ("linear scan", linear, 100),
+            ]:
+                samples = [
+                    ms * 1000 / per_run for ms in time_call(fn, repeat=5, warmup=1)
+                ]
+                self.stdout.write(
+                    format_summary(f"{label} (µs per fix)", samples).replace(
+                        " ms", " µs"
+                    )
+                )
+
+        self.stdout.write(self.style.SUCCESS("🎉 Benchmark complete."))
@@ -0,0 +1,85 @@
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from trail_nav.deviation import TrailLine
+from ._bench import format_summary, time_call
+
+
+def synthetic_trail(vertices, rng):
+    """A winding path with ~10 m between vertices, like a densely traced GPX."""
+    lat, lng, heading = 44.5, -110.5, 0.0
+    coords = [(lng, lat)]
+    for _ in range(vertices - 1):
+        heading += rng.gauss(0, 0.3)
+        lat += math.cos(heading) * 0.00009
+        lng += math.sin(heading) * 0.00013
+        coords.append((lng, lat))
+    return coords
+
+
+def synthetic_hike(coords, fixes, rng):
+    """Noisy fixes walking the trail, with a detour every few hundred fixes."""
+    step = max(len(coords) // fixes, 1)
+    hike = []
+    for n, k in enumerate(range(0, len(coords), step)):
+        lng, lat = coords[k]
+        noise = 0.0008 if n % 400 >= 360 else 0.00004
+        hike.append(
+            (lat + rng.uniform(-noise, noise), lng + rng.uniform(-noise, noise))
+        )
+    return hike
+
+
+class Command(BaseCommand):
+    help = "Benchmark off-route detection per GPS fix: session cursor vs full scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vertices", type=int, nargs="+", default=[50_000, 200_000]
+        )
+        parser.add_argument("--fixes", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        for vertices in options["vertices"]:
+            coords = synthetic_trail(vertices, rng)
+            hike = synthetic_hike(coords, options["fixes"], rng)
+            began = time.perf_counter()
+            line = TrailLine(coords)
+            line.grid()
+            self.stdout.write(
+                f"🥾 {vertices} vertices, {line.length_m / 1000:.0f} km, "
+                f"{len(hike)} fixes (line + grid built in "
+                f"{(time.perf_counter() - began) * 1000:.0f} ms)"
+            )
+
+            def cursor():
+                position = 0
+                for lat, lng in hike:
+                    _, position, _ = line.locate(lat, lng, position)
+
+            def full_scan():
+                for lat, lng in hike[:20]:
+                    x, y = line.project(lat, lng)
+                    line._best_in(range(line.segment_count), x, y, (math.inf, 0, 0.0))
+
+            # both report milliseconds per batch; scale to microseconds per fix
+            for label, fn, per_run in [
+                ("session cursor", cursor, len(hike)),
+                ("full scan", full_scan, 20),
+            ]:
+                samples = [
+                    ms * 1000 / per_run for ms in time_call(fn, repeat=5, warmup=1)
+                ]
+                self.stdout.write(
+                    format_summary(f"{label} (µs per fix)", samples).replace(
+                        " ms", " µs"
+                    )
+                )
+
+        self.stdout.write(self.style.SUCCESS("🎉 Benchmark complete."))
@@ -0,0 +1,108 @@
+import heapq
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from trail_nav.routing import TrailGraph
+from ._bench import format_summary, time_call
+
+
+def synthetic_network(edge_count, rng):
+    """A jittered grid of trailheads with edges to right/down neighbours and
+    occasional diagonals, sized to roughly ``edge_count`` segments."""
+    side = max(2, int((edge_count / 2.2) ** 0.5))
+    nodes = []
+    for row in range(side):
+        for col in range(side):
+            lat = 37.0 + row * 0.01 + rng.uniform(-0.003, 0.003)
+            lng = -119.0 + col * 0.01 + rng.uniform(-0.003, 0.003)
+            nodes.append((row * side + col + 1, lat, lng))
+
+    edges = []
+    for row in range(side):
+        for col in range(side):
+            node = row * side + col + 1
+            neighbours = []
+            if col + 1 < side:
+                neighbours.append(node + 1)
+            if row + 1 < side:
+                neighbours.append(node + side)
+            if row + 1 < side and col + 1 < side and rng.random() < 0.2:
+                neighbours.append(node + side + 1)
+            for other in neighbours:
+                # from_edges raises any length below the straight-line distance
+                edges.append(
+                    (len(edges) + 1, node, other, rng.uniform(800, 2000), True)
+                )
+    return nodes, edges
+
+
+def dijkstra(graph, start_id, goal_id):
+    """Plain Dijkstra over the same CSR arrays, as the A* baseline."""
+    start, goal = graph.index[start_id], graph.index[goal_id]
+    best = {start: 0.0}
+    heap = [(0.0, start)]
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if node == goal:
+            return cost
+        if cost > best[node]:
+            continue
+        for slot in range(graph.offsets[node], graph.offsets[node + 1]):
+            neighbor = graph.targets[slot]
+            new_cost = cost + graph.weights[slot]
+            if new_cost < best.get(neighbor, float("inf")):
+                best[neighbor] = new_cost
+                heapq.heappush(heap, (new_cost, neighbor))
+    return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark graph build and A* routing on synthetic 10k/100k/1M-edge networks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--edges", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        repeat = options["repeat"]
+
+        for edge_count in options["edges"]:
+            nodes, edges = synthetic_network(edge_count, rng)
+            started = time.perf_counter()
+            graph = TrailGraph.from_edges(nodes, edges)
+            built = time.perf_counter() - started
+            self.stdout.write(
+                f"🗺️  {len(nodes)} trailheads, {len(edges)} segments: "
+                f"graph built in {built * 1000:.1f} ms"
+            )
+
+            pairs = [
+                (rng.choice(nodes)[0], rng.choice(nodes)[0]) for _ in range(repeat)
+            ]
+            queue = iter(pairs * 3)
+
+            def astar():
+                graph.shortest_path(*next(queue))
+
+            self.stdout.write(
+                format_summary("A* shortest path", time_call(astar, repeat))
+            )
+            if edge_count <= 100_000:
+                queue = iter(pairs * 3)
+
+                def plain_dijkstra():
+                    dijkstra(graph, *next(queue))
+
+                self.stdout.write(
+                    format_summary(
+                        "Dijkstra baseline", time_call(plain_dijkstra, repeat)
+                    )
+                )
+
+        self.stdout.write(self.style.SUCCESS("🎉 Benchmark complete."))
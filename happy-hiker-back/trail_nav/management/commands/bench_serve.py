@@ -0,0 +1,107 @@
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ._bench import summarize
+
+SERVERS = {
+    "runserver": ["runserver", "--noreload"],
+    "serve asgi": ["serve", "--interface", "asgi"],
+    "serve wsgi": ["serve", "--interface", "wsgi"],
+}
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"Server exited with {process.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise CommandError(f"Server did not come up on {url}")
+
+
+class Command(BaseCommand):
+    help = "Requests/second of the dev server vs `manage.py serve` on the same app"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/trails/?page_size=20")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+        parser.add_argument("--workers", type=int, default=4, help="for serve")
+        parser.add_argument("--port", type=int, default=8100)
+
+    def handle(self, *args, **options):
+        manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+        for n, (label, command) in enumerate(SERVERS.items()):
+            bind = f"127.0.0.1:{options['port'] + n}"
+            if command[0] == "serve":
+                command = command + [
+                    "--bind",
+                    bind,
+                    "--workers",
+                    str(options["workers"]),
+                ]
+            else:
+                command = command + [bind]
+            process = subprocess.Popen(
+                manage + command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                url = f"http://{bind}{options['path']}"
+                wait_until_up(url, process)
+                self.report(label, *self.drive(url, options))
+            finally:
+                process.terminate()
+                process.wait()
+
+        self.stdout.write(self.style.SUCCESS("🎉 Benchmark complete."))
+
+    def drive(self, url, options):
+        """Closed loop: each thread sends its next request when one returns."""
+        latencies, errors = [], []
+        lock = threading.Lock()
+        stop_at = time.monotonic() + options["duration"]
+
+        def worker():
+            mine, failed = [], 0
+            while time.monotonic() < stop_at:
+                began = time.perf_counter()
+                try:
+                    urllib.request.urlopen(url, timeout=30).read()
+                except (urllib.error.URLError, ConnectionError):
+                    failed += 1
+                    continue
+                mine.append((time.perf_counter() - began) * 1000)
+            with lock:
+                latencies.extend(mine)
+                errors.append(failed)
+
+        threads = [
+            threading.Thread(target=worker) for _ in range(options["concurrency"])
+        ]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, sum(errors), time.perf_counter() - began
+
+    def report(self, label, latencies, errors, elapsed):
+        if not latencies:
+            raise CommandError(f"{label}: every request failed")
+        stats = summarize(latencies)
+        self.stdout.write(
+            f"🏁 {label:<12} {len(latencies) / elapsed:>8.1f} req/s"
+            f"  median {stats['median_ms']:>8.3f} ms  p95 {stats['p95_ms']:>8.3f} ms"
+            f"  ({errors} errors)"
+        )
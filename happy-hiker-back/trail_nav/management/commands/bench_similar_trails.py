@@ -0,0 +1,170 @@
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from trail_nav.catalog import bump_catalog_version
+from trail_nav.models import NavigationSession, Trail
+from trail_nav.similar import (
+    PERSONAL_HISTORY,
+    SimilarityIndex,
+    get_similarity_index,
+    invalidate_similarity_index,
+)
+from ._bench import Rollback, format_summary, time_call
+from .bench_trail_catalog import BENCH_CACHES
+
+DIFFICULTIES = ["Easy", "Moderate", "Hard", "Strenuous"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Similar trails: index build and incremental update times, k-d tree vs "
+        "brute-force lookups and /api/trails/<id>/similar/ latency per scale"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            default="100000,1000000",
+            help="comma-separated trail counts",
+        )
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument(
+            "--changed", type=float, default=0.01, help="share updated by an import"
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def seed(self, count, seed):
+        # generate_series keeps seeding 1M rows to a single round trip; the
+        # rows are days old and spread out, as an imported catalog would be
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(%s)", [(seed % 1000) / 1000])
+            cursor.execute(
+                f"""
+                INSERT INTO {Trail._meta.db_table}
+                    (name, lat, long, distance, elevation, difficulty,
+                     is_dog_friendly, is_hiking_trail, favorite_count, updated_at)
+                SELECT 'Bench Trail ' || n, 25 + random() * 24, -124 + random() * 57,
+                       round((0.5 + exp(random() * 3))::numeric, 1),
+                       floor(exp(random() * 8.5)),
+                       (%s::text[])[1 + floor(random() * %s)::int],
+                       random() < 0.4, true, 0,
+                       now() - interval '1 day' - n * interval '1 second'
+                FROM generate_series(1, %s) AS n
+                """,
+                [DIFFICULTIES, len(DIFFICULTIES), count],
+            )
+            cursor.execute(f"ANALYZE {Trail._meta.db_table}")
+
+    def handle(self, *args, **options):
+        scales = [int(scale) for scale in options["scales"].split(",")]
+        for scale in scales:
+            try:
+                with transaction.atomic():
+                    self.run(scale, options)
+                    raise Rollback
+            except Rollback:
+                pass
+            finally:
+                invalidate_similarity_index()
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
+
+    def run(self, scale, options):
+        limit, repeat = options["limit"], options["repeat"]
+        rng = np.random.default_rng(options["seed"])
+        self.stdout.write(f"🌱 Seeding {scale} synthetic trails...")
+        self.seed(scale, options["seed"])
+
+        began = time.perf_counter()
+        index = SimilarityIndex.from_database()
+        self.stdout.write(
+            f"🏗️  full build from the catalog     {time.perf_counter() - began:9.2f} s"
+        )
+        began = time.perf_counter()
+        index.compacted()
+        self.stdout.write(
+            f"🌳 k-d tree rebuild from memory    {time.perf_counter() - began:9.2f} s"
+        )
+
+        queries = iter(
+            index.tree.points[rng.integers(len(index.ids), size=3 * (repeat + 2))]
+        )
+        self.stdout.write(
+            format_summary(
+                f"top {limit}, k-d tree",
+                time_call(lambda: index.nearest(next(queries), limit), repeat),
+            )
+        )
+
+        def brute_force():
+            distances = ((index.tree.points - next(queries)) ** 2).sum(axis=1)
+            np.argpartition(distances, limit)[:limit]
+
+        self.stdout.write(
+            format_summary(
+                f"top {limit}, brute-force scan", time_call(brute_force, repeat)
+            )
+        )
+
+        # an import touching a share of the catalog, seen by a serving process
+        changed = max(1, int(scale * options["changed"]))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Trail._meta.db_table}
+                SET elevation = elevation + 100, updated_at = clock_timestamp()
+                WHERE id IN (
+                    SELECT id FROM {Trail._meta.db_table}
+                    ORDER BY random() LIMIT %s
+                )
+                """,
+                [changed],
+            )
+        began = time.perf_counter()
+        updated = index.updated("bench")
+        self.stdout.write(
+            f"🔁 catch up with {changed} changed trails "
+            f"{time.perf_counter() - began:7.2f} s "
+            f"({len(updated.delta)} in the delta, "
+            f"{'rebuilt' if updated.tree is not index.tree else 'same tree'})"
+        )
+        self.stdout.write(
+            format_summary(
+                f"top {limit}, tree + delta",
+                time_call(lambda: updated.nearest(next(queries), limit), repeat),
+            )
+        )
+
+        bump_catalog_version()
+        invalidate_similarity_index()
+        get_similarity_index()
+        ids = updated.ids[rng.integers(len(updated.ids), size=repeat + 2)].tolist()
+        hiker = get_user_model().objects.create(username="bench-similar")
+        NavigationSession.objects.bulk_create(
+            NavigationSession(trail_id=trail_id, user=hiker, is_active=False)
+            for trail_id in rng.choice(updated.ids, PERSONAL_HISTORY).tolist()
+        )
+        client = APIClient()
+        client.force_authenticate(hiker)
+        for label, params in [
+            ("endpoint", {}),
+            ("endpoint, personalized", {"personalized": 1}),
+        ]:
+            targets = iter(ids)
+            with override_settings(
+                CACHES=BENCH_CACHES, TRAIL_CATALOG_CACHE="bench-off"
+            ):
+                samples = time_call(
+                    lambda: client.get(f"/api/trails/{next(targets)}/similar/", params),
+                    repeat,
+                )
+            self.stdout.write(format_summary(label, samples))
@@ -0,0 +1,101 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from trail_nav.models import NavigationSession, Trail
+from trail_nav.tracks import session_points
+from ._bench import Rollback
+
+
+class Command(BaseCommand):
+    help = "Report storage size and read time of GPS tracks before and after compaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=10_000_000)
+        parser.add_argument("--points-per-session", type=int, default=3600)
+        parser.add_argument("--read-sessions", type=int, default=50)
+
+    def table_bytes(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COALESCE(SUM(pg_column_size(t.*)), 0) FROM {table} t"
+            )
+            return cursor.fetchone()[0]
+
+    def read_time(self, session_ids):
+        start = time.perf_counter()
+        points = 0
+        for session in NavigationSession.objects.filter(
+            id__in=session_ids
+        ).select_related("track"):
+            points += len(session_points(session))
+        return (time.perf_counter() - start) * 1000, points
+
+    def report(self, label, session_ids):
+        log_bytes = self.table_bytes("trail_nav_gpslog")
+        track_bytes = self.table_bytes("trail_nav_sessiontrack")
+        elapsed, points = self.read_time(session_ids)
+        self.stdout.write(
+            f"{label:<18} gpslog rows {log_bytes / 2**20:10.1f} MiB"
+            f"  packed tracks {track_bytes / 2**20:8.1f} MiB"
+            f"  read {points} points in {elapsed:8.1f} ms"
+        )
+
+    def handle(self, *args, **options):
+        per_session = options["points_per_session"]
+        sessions = max(1, options["points"] // per_session)
+
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create(username="bench-hiker")
+                trail = Trail.objects.create(
+                    name="Bench Trail", lat=37.7456, long=-119.5936
+                )
+                self.stdout.write(
+                    f"🌱 Seeding {sessions} sessions x {per_session} points..."
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        INSERT INTO trail_nav_navigationsession
+                            (trail_id, user_id, started_at, ended_at, is_active, status)
+                        SELECT %s, %s, now() - interval '1 day', now() - interval '1 hour',
+                               false, 'stopped'
+                        FROM generate_series(1, %s)
+                        """,
+                        [trail.id, user.id, sessions],
+                    )
+                    cursor.execute(
+                        """
+                        INSERT INTO trail_nav_gpslog (session_id, latitude, longitude, timestamp, client_seq)
+                        SELECT s.id, 37.7456 + n * 0.00001 + random() * 0.00001,
+                               -119.5936 + n * 0.00001 + random() * 0.00001,
+                               s.started_at + n * interval '1 second', n
+                        FROM trail_nav_navigationsession s, generate_series(0, %s - 1) AS n
+                        WHERE s.user_id = %s
+                        """,
+                        [per_session, user.id],
+                    )
+                session_ids = list(
+                    NavigationSession.objects.filter(user=user).values_list(
+                        "id", flat=True
+                    )[: options["read_sessions"]]
+                )
+
+                self.report("raw GPSLog rows", session_ids)
+                start = time.perf_counter()
+                call_command("compact_tracks", older_than=0, stdout=self.stdout)
+                self.stdout.write(
+                    f"compaction took {time.perf_counter() - start:.1f} s"
+                )
+                self.report("packed tracks", session_ids)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
@@ -0,0 +1,81 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from trail_nav.models import Trail, TrailImage
+from ._bench import Rollback, summarize, time_call
+from .bench_trail_spatial import seed_trails
+
+BENCH_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "bench-off": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+
+class Command(BaseCommand):
+    help = "Requests/second for /api/trails/: uncached vs warm cache vs 304"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trails", type=int, default=10_000)
+        parser.add_argument("--images-per-trail", type=int, default=3)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        repeat = options["repeat"]
+        urls = [
+            ("list page", "/api/trails/", {"page_size": options["page_size"]}),
+            ("nearby", "/api/trails/", {"near": "37.75,-119.59", "radius": 50}),
+            ("search", "/api/trails/search/", {"q": "bench trail 12"}),
+        ]
+
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"🌱 Seeding {options['trails']} trails...")
+                seed_trails(options["trails"], rng)
+                TrailImage.objects.bulk_create(
+                    TrailImage(trail_id=pk, image=f"https://example.com/{pk}/{n}.jpg")
+                    for pk in Trail.objects.values_list("id", flat=True)
+                    for n in range(options["images_per_trail"])
+                )
+                client = APIClient()
+
+                for label, url, params in urls:
+                    with override_settings(
+                        CACHES=BENCH_CACHES, TRAIL_CATALOG_CACHE="bench-off"
+                    ):
+                        uncached = time_call(lambda: client.get(url, params), repeat)
+                    with override_settings(
+                        CACHES=BENCH_CACHES, TRAIL_CATALOG_CACHE="default"
+                    ):
+                        warm = time_call(lambda: client.get(url, params), repeat)
+                        etag = client.get(url, params)["ETag"]
+                        not_modified = time_call(
+                            lambda: client.get(url, params, HTTP_IF_NONE_MATCH=etag),
+                            repeat,
+                        )
+
+                    self.stdout.write(f"📚 {label}")
+                    for name, samples in [
+                        ("uncached", uncached),
+                        ("warm cache", warm),
+                        ("304 revalidation", not_modified),
+                    ]:
+                        stats = summarize(samples)
+                        self.stdout.write(
+                            f"   {name:<20} {1000 / stats['median_ms']:>9.1f} req/s"
+                            f"  (median {stats['median_ms']:.3f} ms,"
+                            f" p95 {stats['p95_ms']:.3f} ms)"
+                        )
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
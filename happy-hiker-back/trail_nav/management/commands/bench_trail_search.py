@@ -0,0 +1,138 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from trail_nav.views import search_trails
+from ._bench import Rollback, format_summary, time_call
+
+PREFIXES = [
+    "Upper",
+    "Lower",
+    "North",
+    "South",
+    "East",
+    "West",
+    "Old",
+    "Little",
+    "Big",
+    "Hidden",
+]
+FEATURES = [
+    "Yosemite",
+    "Mist",
+    "Cathedral",
+    "Half Dome",
+    "Sentinel",
+    "Glacier",
+    "Eagle",
+    "Bear",
+    "Cedar",
+    "Granite",
+    "Tuolumne",
+    "Mirror",
+    "Panorama",
+    "Clouds Rest",
+    "Sunrise",
+    "Pine",
+]
+KINDS = [
+    "Falls Trail",
+    "Loop",
+    "Trailhead",
+    "Lake Trail",
+    "Ridge Trail",
+    "Canyon Hike",
+    "Overlook",
+    "Meadow Walk",
+]
+
+# a mix of typeahead prefixes, full names and misspellings
+QUERIES = [
+    "Up",
+    "Low",
+    "Yose",
+    "Half D",
+    "Glacer Point",
+    "cathedral lake",
+    "Mirrer Lake",
+    "Tuolumne Meadow",
+    "Eagle Peak Trail",
+    "Clouds Rest Ridge",
+    "sunrise",
+    "Pine Loop",
+]
+
+
+class Command(BaseCommand):
+    help = "Measure /api/trails/search/ latency on a synthetic trail-name catalog"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--names", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def seed_names(self, count, seed):
+        # generate_series keeps seeding 1M rows to a single round trip
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(%s)", [(seed % 1000) / 1000])
+            cursor.execute(
+                """
+                INSERT INTO trail_nav_trail
+                    (name, lat, long, distance, elevation, difficulty,
+                     is_dog_friendly, is_hiking_trail, favorite_count, updated_at)
+                SELECT
+                    (%s::text[])[1 + floor(random() * %s)::int] || ' ' ||
+                    (%s::text[])[1 + floor(random() * %s)::int] || ' ' ||
+                    (%s::text[])[1 + floor(random() * %s)::int] || ' ' || n,
+                    37.7, -119.5, 0, 0, 'Moderate', false, true, 0, now()
+                FROM generate_series(1, %s) AS n
+                """,
+                [
+                    PREFIXES,
+                    len(PREFIXES),
+                    FEATURES,
+                    len(FEATURES),
+                    KINDS,
+                    len(KINDS),
+                    count,
+                ],
+            )
+            cursor.execute("ANALYZE trail_nav_trail")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        client = APIClient()
+
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"🌱 Seeding {options['names']} synthetic trail names..."
+                )
+                self.seed_names(options["names"], options["seed"])
+
+                # both halves of the match should be bitmap index scans: the
+                # prefix on trail_name_upper_trgm, the fuzzy one on trail_name_trgm;
+                # "Up" shows the candidate LIMIT cutting a broad prefix short
+                for query in ["Up", "Yose", "Glacer Point"]:
+                    plan = search_trails(query)[:10].explain(analyze=True)
+                    self.stdout.write(f"🔎 EXPLAIN ANALYZE q={query!r}\n{plan}")
+
+                def search():
+                    response = client.get(
+                        "/api/trails/search/", {"q": rng.choice(QUERIES)}
+                    )
+                    assert response.status_code == 200, response.content
+
+                samples = time_call(
+                    search, repeat=options["repeat"], warmup=len(QUERIES)
+                )
+                self.stdout.write(format_summary("GET /api/trails/search/", samples))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
@@ -0,0 +1,115 @@
+import random
+
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from trail_nav.geo import haversine_km
+from trail_nav.models import Trail
+from ._bench import Rollback, format_summary, time_call
+
+
+def seed_trails(count, rng, batch_size=5000):
+    batch = []
+    for i in range(count):
+        lat = rng.uniform(25.0, 49.0)
+        lng = rng.uniform(-124.0, -67.0)
+        batch.append(
+            Trail(
+                name=f"Bench Trail {i}",
+                lat=lat,
+                long=lng,
+                location=Point(lng, lat, srid=4326),
+                is_hiking_trail=True,
+            )
+        )
+        if len(batch) >= batch_size:
+            Trail.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Trail.objects.bulk_create(batch)
+
+
+class Command(BaseCommand):
+    help = "Benchmark ?near= radius queries: GiST-indexed geography vs float lat/long scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trails", type=int, default=100_000)
+        parser.add_argument("--radius", type=float, default=25.0, help="radius in km")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        radius = options["radius"]
+        repeat = options["repeat"]
+        origins = [
+            (rng.uniform(30.0, 45.0), rng.uniform(-120.0, -75.0)) for _ in range(repeat)
+        ]
+
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"🌱 Seeding {options['trails']} synthetic trails...")
+                seed_trails(options["trails"], rng)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE trail_nav_trail")
+
+                def python_scan():
+                    lat, lng = rng.choice(origins)
+                    hits = []
+                    for pk, t_lat, t_lng in Trail.objects.values_list(
+                        "id", "lat", "long"
+                    ).iterator(chunk_size=10_000):
+                        d = haversine_km(lat, lng, t_lat, t_lng)
+                        if d <= radius:
+                            hits.append((d, pk))
+                    return sorted(hits)
+
+                def float_column_filter():
+                    # best case for the float columns: a lat/long box in SQL, then exact distance
+                    lat, lng = rng.choice(origins)
+                    dlat = radius / 111.0
+                    rows = Trail.objects.filter(
+                        lat__range=(lat - dlat, lat + dlat),
+                        long__range=(lng - dlat * 2, lng + dlat * 2),
+                    ).values_list("id", "lat", "long")
+                    hits = [(haversine_km(lat, lng, a, b), pk) for pk, a, b in rows]
+                    return sorted(h for h in hits if h[0] <= radius)
+
+                def geography_index():
+                    lat, lng = rng.choice(origins)
+                    origin = Point(lng, lat, srid=4326)
+                    return list(
+                        Trail.objects.filter(location__dwithin=(origin, D(km=radius)))
+                        .annotate(distance_from=Distance("location", origin))
+                        .order_by("distance_from")
+                        .values_list("id", flat=True)
+                    )
+
+                self.stdout.write(
+                    format_summary(
+                        "python scan of float columns",
+                        time_call(python_scan, repeat=max(3, repeat // 4)),
+                    )
+                )
+                self.stdout.write(
+                    format_summary(
+                        "float column range filter",
+                        time_call(float_column_filter, repeat=repeat),
+                    )
+                )
+                self.stdout.write(
+                    format_summary(
+                        "geography dwithin (GiST)",
+                        time_call(geography_index, repeat=repeat),
+                    )
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
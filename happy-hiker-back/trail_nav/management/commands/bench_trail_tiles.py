@@ -0,0 +1,107 @@
+import random
+import tempfile
+
+from django.contrib.gis.geos import LineString
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from trail_nav.models import Trail, TrailSegment
+from trail_nav.tiles import get_tile, render_tile, tile_for_point
+from ._bench import Rollback, format_summary, time_call
+from .bench_trail_spatial import seed_trails
+
+
+def seed_segments(count, rng, batch_size=5000):
+    """Wiggly segment geometry between random pairs of nearby trailheads."""
+    trails = list(Trail.objects.values_list("id", "lat", "long"))
+    trails.sort(key=lambda t: (round(t[1], 1), t[2]))
+    batch = []
+    for _ in range(count):
+        i = rng.randrange(len(trails) - 1)
+        (a, lat1, lng1), (b, lat2, lng2) = trails[i], trails[i + 1]
+        steps = 50
+        coords = [
+            (
+                lng1 + (lng2 - lng1) * k / steps + rng.uniform(-0.001, 0.001),
+                lat1 + (lat2 - lat1) * k / steps + rng.uniform(-0.001, 0.001),
+            )
+            for k in range(steps + 1)
+        ]
+        batch.append(
+            TrailSegment(
+                start_id=a,
+                end_id=b,
+                length_m=1000,
+                path=LineString(coords, srid=4326),
+            )
+        )
+        if len(batch) >= batch_size:
+            TrailSegment.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TrailSegment.objects.bulk_create(batch)
+
+
+class Command(BaseCommand):
+    help = "Benchmark ST_AsMVT trail tile generation time and size at zoom 6-16"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trails", type=int, default=100_000)
+        parser.add_argument("--segments", type=int, default=20_000)
+        parser.add_argument("--min-zoom", type=int, default=6)
+        parser.add_argument("--max-zoom", type=int, default=16)
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"🌱 Seeding {options['trails']} trails and "
+                    f"{options['segments']} segments..."
+                )
+                seed_trails(options["trails"], rng)
+                seed_segments(options["segments"], rng)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE trail_nav_trail")
+                    cursor.execute("ANALYZE trail_nav_trailsegment")
+                # centre each sample on a trailhead so deep zooms are not empty
+                centres = rng.sample(
+                    list(Trail.objects.values_list("lat", "long")), options["repeat"]
+                )
+
+                for z in range(options["min_zoom"], options["max_zoom"] + 1):
+                    tiles = [tile_for_point(z, lat, lng) for lat, lng in centres]
+                    queue = iter(tiles * 3)
+                    sizes = []
+
+                    def render():
+                        sizes.append(len(render_tile(z, *next(queue))))
+
+                    samples = time_call(render, repeat=len(tiles))
+                    self.stdout.write(
+                        format_summary(f"z{z} render", samples)
+                        + f"  avg {sum(sizes) / len(sizes) / 1024:.1f} KiB"
+                    )
+
+                with tempfile.TemporaryDirectory() as cache_dir:
+                    with override_settings(TILE_CACHE_DIR=cache_dir):
+                        z = options["max_zoom"]
+                        tile = tile_for_point(z, *centres[0])
+                        get_tile(z, *tile)
+                        self.stdout.write(
+                            format_summary(
+                                f"z{z} cached read",
+                                time_call(lambda: get_tile(z, *tile), repeat=100),
+                            )
+                        )
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
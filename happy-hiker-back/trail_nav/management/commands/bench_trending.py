@@ -0,0 +1,185 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from trail_nav.models import NavigationSession, Trail, TrailTrend
+from trail_nav.trending import (
+    TAU_SECONDS,
+    rebuild_trending,
+    record_start,
+    region_for,
+    top_trending,
+)
+from ._bench import Rollback, format_summary, time_call
+from .bench_trail_catalog import BENCH_CACHES
+from .bench_trail_spatial import seed_trails
+
+
+class Command(BaseCommand):
+    help = (
+        "Trending trails: an O(1) score upsert per session start vs decayed "
+        "recounts over every session, and the cached top-N"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--trails", type=int, default=100_000)
+        parser.add_argument("--sessions", type=int, default=1_000_000)
+        parser.add_argument("--days", type=int, default=90, help="history spread")
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def seed_sessions(self, count, days, seed):
+        account = get_user_model().objects.create(username="bench-trending")
+        table = NavigationSession._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(%s)", [(seed % 1000) / 1000])
+            cursor.execute(f"SELECT min(id), max(id) FROM {Trail._meta.db_table}")
+            first, last = cursor.fetchone()
+            # random()^3 piles most sessions onto a few popular trails
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (trail_id, user_id, started_at, ended_at, is_active, status,
+                     point_count, distance_m, moving_seconds, stopped_seconds,
+                     max_speed_mps, current_speed_mps, route_cursor, off_route,
+                     route_events)
+                SELECT %s + floor(power(random(), 3) * (%s - %s + 1))::int, %s,
+                       started, started + interval '2 hours', false, 'stopped',
+                       0, 1000 + random() * 9000, 7200, 0, 0, 0, 0, false, '[]'
+                FROM (
+                    SELECT now() - random() * %s * interval '1 day' AS started
+                    FROM generate_series(1, %s)
+                ) AS seeded
+                """,
+                [first, last, first, account.id, days, count],
+            )
+            cursor.execute(f"ANALYZE {table}")
+        return account
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        limit, repeat = options["limit"], options["repeat"]
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"🌱 Seeding {options['trails']} trails and "
+                    f"{options['sessions']} sessions..."
+                )
+                seed_trails(options["trails"], rng)
+                account = self.seed_sessions(
+                    options["sessions"], options["days"], options["seed"]
+                )
+
+                began = time.perf_counter()
+                written = rebuild_trending()
+                self.stdout.write(
+                    f"🔁 rebuild_trending: {written} trails from "
+                    f"{options['sessions']} sessions in "
+                    f"{time.perf_counter() - began:.1f} s"
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f"ANALYZE {TrailTrend._meta.db_table}")
+
+                trail_ids = list(Trail.objects.values_list("id", flat=True))
+                trails = Trail.objects.in_bulk(rng.sample(trail_ids, 200))
+
+                def start():
+                    session = NavigationSession.objects.create(
+                        trail=rng.choice(list(trails.values())), user=account
+                    )
+                    record_start(session)
+
+                def start_without_trend():
+                    NavigationSession.objects.create(
+                        trail=rng.choice(list(trails.values())), user=account
+                    )
+
+                self.stdout.write(
+                    format_summary(
+                        "start: session insert only",
+                        time_call(start_without_trend, repeat),
+                    )
+                )
+                self.stdout.write(
+                    format_summary(
+                        "start: insert + trend upsert", time_call(start, repeat)
+                    )
+                )
+
+                def recount(region_trails=None):
+                    # what a trending page costs without the running scores
+                    where, params = "", []
+                    if region_trails is not None:
+                        where, params = "WHERE trail_id = ANY(%s)", [region_trails]
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            f"""
+                            SELECT trail_id, sum(exp(
+                                -extract(epoch FROM now() - started_at) / %s
+                            )) AS score
+                            FROM {NavigationSession._meta.db_table} {where}
+                            GROUP BY trail_id ORDER BY score DESC LIMIT %s
+                            """,
+                            [TAU_SECONDS, *params, limit],
+                        )
+                        cursor.fetchall()
+
+                self.stdout.write(
+                    format_summary(
+                        f"top {limit}: decayed recount", time_call(recount, 3, warmup=1)
+                    )
+                )
+                with override_settings(
+                    CACHES=BENCH_CACHES, TRAIL_CATALOG_CACHE="bench-off"
+                ):
+                    self.stdout.write(
+                        format_summary(
+                            f"top {limit}: TrailTrend index",
+                            time_call(lambda: top_trending(None, limit), repeat),
+                        )
+                    )
+                with override_settings(
+                    CACHES=BENCH_CACHES, TRAIL_CATALOG_CACHE="default"
+                ):
+                    self.stdout.write(
+                        format_summary(
+                            f"top {limit}: cached",
+                            time_call(lambda: top_trending(None, limit), repeat),
+                        )
+                    )
+
+                # the region of the most popular trail, so it has plenty of trails
+                busiest = Trail.objects.get(pk=top_trending(None, 1)[0]["id"])
+                region = region_for(busiest.lat, busiest.long)
+                in_region = list(
+                    TrailTrend.objects.filter(region=region).values_list(
+                        "trail_id", flat=True
+                    )
+                )
+                self.stdout.write(
+                    format_summary(
+                        f"region {region} ({len(in_region)} trails): recount",
+                        time_call(lambda: recount(in_region), 3, warmup=1),
+                    )
+                )
+                with override_settings(
+                    CACHES=BENCH_CACHES, TRAIL_CATALOG_CACHE="bench-off"
+                ):
+                    self.stdout.write(
+                        format_summary(
+                            f"region {region}: TrailTrend index",
+                            time_call(lambda: top_trending(region, limit), repeat),
+                        )
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
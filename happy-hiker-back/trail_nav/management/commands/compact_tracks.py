@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from trail_nav.models import NavigationSession
+from trail_nav.tracks import compact_session
+
+
+class Command(BaseCommand):
+    help = "Pack GPSLog rows of stopped navigation sessions into per-session tracks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=10,
+            help="only compact sessions that ended at least this many minutes ago",
+        )
+        parser.add_argument("--limit", type=int, default=None)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options["older_than"])
+        sessions = (
+            NavigationSession.objects.filter(is_active=False, gps_logs__isnull=False)
+            # sessions stopped by starting a new one before ended_at was recorded
+            .filter(
+                Q(ended_at__lte=cutoff)
+                | Q(ended_at__isnull=True, started_at__lte=cutoff)
+            )
+            .select_related("track")
+            .distinct()
+            .order_by("id")
+        )
+        if options["limit"]:
+            sessions = sessions[: options["limit"]]
+
+        compacted = points = 0
+        for session in sessions.iterator():
+            points += compact_session(session)
+            compacted += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"📦 Compacted {compacted} sessions ({points} points) into packed tracks."
+            )
+        )
@@ -1,15 +1,26 @@
+import json
 import os
-import requests
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
 from dotenv import load_dotenv
-from django.core.management.base import BaseCommand
-from trail_nav.models import Trail, TrailImage
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from trail_nav.catalog import bump_catalog_version
+from trail_nav.sync import sync_records
+from trail_nav.tiles import clear_tile_cache
 
 load_dotenv(dotenv_path="/app/.env")
-API_KEY = os.getenv("NPS_API_KEY")
 
-if not API_KEY:
-    raise Exception("NPS_API_KEY not found in environment!")
+NPS_API_URL = "https://developer.nps.gov/api/v1"
+# /thingstodo first: its titles win over /places when both list a trail
+ENDPOINTS = ["thingstodo", "places"]
+HIKING_KEYWORDS = ["trail", "trailhead", "hike", "hiking"]
 
 
 def extract_distance_and_elevation(text):
@@ -25,157 +36,226 @@ def extract_distance_and_elevation(text):
     return distance, elevation
 
 
+def parse_lat_long(item):
+    latlong = item.get("latLong", "")
+    try:
+        if "lat:" in latlong and "long:" in latlong:
+            # legacy "lat:37.7, long:-119.5" format
+            lat = float(latlong.split("lat:")[1].split(",")[0])
+            long = float(latlong.split("long:")[1])
+        else:
+            lat = float(item.get("latitude", ""))
+            long = float(item.get("longitude", ""))
+    except (ValueError, IndexError):
+        return None, None
+    return lat, long
+
+
+def parse_item(endpoint, item):
+    """Turn one NPS record into trail fields + image list, or None to skip it."""
+    name = item.get("title", "").strip()
+    if not name:
+        return None
+
+    if endpoint == "thingstodo":
+        description = item.get("shortDescription", "") or item.get(
+            "longDescription", ""
+        )
+    else:
+        description = item.get("listingDescription") or item.get("description", "")
+        text = f"{name.lower()} {(description or '').lower()}"
+        if not any(word in text for word in HIKING_KEYWORDS):
+            return None
+
+    lat, long = parse_lat_long(item)
+    if lat is None or long is None:
+        return None
+
+    distance, elevation = extract_distance_and_elevation(description)
+    images = [
+        {"image": img["url"], "caption": img.get("caption", "")}
+        for img in item.get("images", [])
+        if img.get("url")
+    ]
+    return {
+        "name": name,
+        "lat": lat,
+        "long": long,
+        "distance": distance,
+        "elevation": elevation,
+        "images": images,
+    }
+
+
+class NPSClient:
+    """Fetches pages from the NPS API over one pooled, retrying session."""
+
+    def __init__(self, api_key, page_size, workers, record_dir=None):
+        self.api_key = api_key
+        self.page_size = page_size
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "happy-hiker-app/1.0"
+        adapter = HTTPAdapter(
+            pool_connections=workers,
+            pool_maxsize=workers,
+            max_retries=Retry(
+                total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504]
+            ),
+        )
+        self.session.mount("https://", adapter)
+
+    def fetch_page(self, endpoint, park_code, start):
+        response = self.session.get(
+            f"{NPS_API_URL}/{endpoint}",
+            params={
+                "parkCode": park_code,
+                "limit": self.page_size,
+                "start": start,
+                "api_key": self.api_key,
+            },
+            timeout=30,
+        )
+        response.raise_for_status()
+        page = response.json()
+        if self.record_dir:
+            self.record_dir.mkdir(parents=True, exist_ok=True)
+            path = self.record_dir / fixture_name(endpoint, park_code, start)
+            path.write_text(json.dumps(page))
+        return page
+
+
+class FixtureClient:
+    """Replays pages recorded with --record, for offline runs and benchmarks."""
+
+    def __init__(self, fixture_dir, page_size):
+        self.fixture_dir = Path(fixture_dir)
+        self.page_size = page_size
+
+    def fetch_page(self, endpoint, park_code, start):
+        path = self.fixture_dir / fixture_name(endpoint, park_code, start)
+        if not path.exists():
+            # same as a failed request: the listing is treated as incomplete
+            raise requests.ConnectionError(f"No recorded page {path.name}")
+        return json.loads(path.read_text())
+
+
+def fixture_name(endpoint, park_code, start):
+    return f"{endpoint}-{park_code.lower()}-{start}.json"
+
+
 class Command(BaseCommand):
-    help = "Import trails from both NPS /thingstodo and /places endpoints"
-
-    def handle(self, *args, **kwargs):
-        park_code = args[0] if args else "YOSE"
-        imported_titles = set()
-
-        def parse_lat_long(item):
-            latlong = item.get("latLong", "")
-            lat = long = None
-
-            if "lat:" in latlong and "long:" in latlong:
-                try:
-                    lat = float(latlong.split("lat:")[1].split(",")[0])
-                    long = float(latlong.split("long:")[1])
-                    print("✅ Parsed lat/long from legacy format")
-                except Exception as e:
-                    print(f"⚠️ Legacy lat/long parse error: {e}")
-            else:
-                try:
-                    lat = float(item.get("latitude", ""))
-                    long = float(item.get("longitude", ""))
-                    print("✅ Parsed lat/long from standard fields")
-                except Exception as e:
-                    print(f"⚠️ Standard lat/long parse error: {e}")
-            print(f"📍 Latitude: {lat}")
-            print(f"📍 Longitude: {long}")
-
-            return lat, long
-
-        def import_from_things_to_do():
-            url = "https://developer.nps.gov/api/v1/thingstodo"
-            params = {"parkCode": park_code, "limit": 100, "api_key": API_KEY}
-            headers = {"User-Agent": "happy-hiker-app/1.0"}
-            response = requests.get(url, params=params, headers=headers)
-
-            if response.status_code != 200:
-                self.stderr.write(f"❌ Error from /thingstodo: {response.status_code}")
-                return
-
-            for item in response.json().get("data", []):
-                print(f"\n→ {item.get('title', '').strip()}")
-                name = item.get("title", "").strip()
-                if name in imported_titles:
-                    print("🔁 Skipped (duplicate title)")
-                    continue
+    help = "Import trails from the NPS /thingstodo and /places endpoints"
 
-                description = item.get("shortDescription", "") or item.get(
-                    "longDescription", ""
-                )
-                images = item.get("images", [])
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "park_codes", nargs="*", default=["YOSE"], help="NPS park codes"
+        )
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--fixtures", help="replay recorded JSON pages from this directory"
+        )
+        parser.add_argument(
+            "--record", help="save fetched JSON pages to this directory"
+        )
 
-                lat, long = parse_lat_long(item)
-                if lat is None or long is None:
-                    print("⚠️ Skipped due to missing lat/long")
-                    continue
+    def handle(self, *args, **options):
+        park_codes = [code.upper() for code in options["park_codes"]]
+        if options["fixtures"]:
+            client = FixtureClient(options["fixtures"], options["page_size"])
+        else:
+            api_key = os.getenv("NPS_API_KEY")
+            if not api_key:
+                raise CommandError("NPS_API_KEY not found in environment!")
+            client = NPSClient(
+                api_key, options["page_size"], options["workers"], options["record"]
+            )
 
-                distance, elevation = extract_distance_and_elevation(description)
-                print(f"✅ Parsed Trail: {name}")
-                print(f"   Distance: {distance} mi, Elevation: {elevation} ft")
-                print(f"   Latitude: {lat}, Longitude: {long}")
-                print(f"   images found: {len(images)}")
-                print("-" * 60)
-
-                trail, created = Trail.objects.get_or_create(
-                    name=name,
-                    defaults={
-                        "lat": lat,
-                        "long": long,
-                        "distance": distance,
-                        "elevation": elevation,
-                        "difficulty": "Moderate",
-                        "is_dog_friendly": False,
-                        "is_hiking_trail": True,
-                    },
-                )
-
-                if created:
-                    imported_titles.add(name)
-                    self.stdout.write(f"🧭 [ThingsToDo] Imported: {trail.name}")
-                    for img in images:
-                        image_url = img.get("url")
-                        caption = img.get("caption", "")
-                        if image_url:
-                            TrailImage.objects.create(
-                                trail=trail, image=image_url, caption=caption
-                            )
-
-        def import_from_places():
-            url = "https://developer.nps.gov/api/v1/places"
-            params = {"parkCode": park_code, "limit": 100, "api_key": API_KEY}
-            headers = {"User-Agent": "happy-hiker-app/1.0"}
-            response = requests.get(url, params=params, headers=headers)
-
-            if response.status_code != 200:
-                self.stderr.write(f"❌ Error from /places: {response.status_code}")
-                return
-
-            for item in response.json().get("data", []):
-                print(f"\n→ {item.get('title', '').strip()}")
-                name = item.get("title", "").strip()
-                if name in imported_titles:
-                    print("🔁 Skipped (duplicate title)")
-                    continue
+        started = time.perf_counter()
+        pages, failed = self.fetch_all(client, park_codes, options["workers"])
+        fetched = time.perf_counter()
 
-                description = item.get("listingDescription") or item.get(
-                    "description", ""
-                )
-                print("Description:")
-                print(description.strip() if description else "no description")
-                images = item.get("images", [])
-
-                keywords = ["trail", "trailhead", "hike", "hiking"]
-                text = f"{name.lower()} {description.lower()}"
-                if not any(word in text for word in keywords):
-                    print("❌ Skipped: Not hiking related")
-                    continue
+        records, seen = self.collect_records(pages)
+        # only listings fetched in full can prove that a record has vanished
+        complete = {
+            (endpoint, park) for endpoint in ENDPOINTS for park in park_codes
+        } - failed
+        result = sync_records(records, complete, seen, options["batch_size"])
+        if result.created or result.updated or result.removed:
+            # bulk writes send no signals: the bump reaches cached responses and
+            # every process's route graph, trail lines and prompt index
+            bump_catalog_version()
+            clear_tile_cache()
+        done = time.perf_counter()
 
-                lat, long = parse_lat_long(item)
-                if lat is None or long is None:
-                    print("⚠️ Skipped due to missing lat/long")
+        self.stdout.write(
+            f"🌐 Fetched {len(pages)} pages in {fetched - started:.2f}s, "
+            f"synced {len(records)} records in {done - fetched:.2f}s: {result}"
+        )
+        self.stdout.write(self.style.SUCCESS("🎉 Combined import complete."))
+
+    def fetch_all(self, client, park_codes, workers):
+        """Fetch every page of every (endpoint, park) listing, in a stable order.
+
+        Returns the pages and the set of listings that could not be fetched.
+        """
+        jobs = [(endpoint, park) for endpoint in ENDPOINTS for park in park_codes]
+        pages = {}
+        failed = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # first pages tell us each listing's total, then fan out the rest
+            first = dict(
+                zip(jobs, pool.map(lambda job: self.safe_fetch(client, *job, 0), jobs))
+            )
+            rest = []
+            for (endpoint, park), page in first.items():
+                if page is None:
+                    failed.add((endpoint, park))
                     continue
+                pages[(endpoint, park, 0)] = page
+                total = int(page.get("total") or 0)
+                for start in range(client.page_size, total, client.page_size):
+                    rest.append((endpoint, park, start))
+            for job, page in zip(
+                rest, pool.map(lambda job: self.safe_fetch(client, *job), rest)
+            ):
+                if page is None:
+                    failed.add(job[:2])
+                else:
+                    pages[job] = page
 
-                distance, elevation = extract_distance_and_elevation(description)
-
-                trail, created = Trail.objects.get_or_create(
-                    name=name,
-                    defaults={
-                        "lat": lat,
-                        "long": long,
-                        "distance": distance,
-                        "elevation": elevation,
-                        "difficulty": "Moderate",
-                        "is_dog_friendly": False,
-                        "is_hiking_trail": True,
-                    },
-                )
-
-                if created:
-                    imported_titles.add(name)
-                    self.stdout.write(f"🌲 [Places] Imported: {trail.name}")
-                    for img in images:
-                        image_url = img.get("url")
-                        caption = img.get("caption", "")
-                        if image_url:
-                            TrailImage.objects.create(
-                                trail=trail, image=image_url, caption=caption
-                            )
-
-        self.stdout.write("🌐 Importing from /thingstodo...")
-        import_from_things_to_do()
-        self.stdout.write("🌐 Importing from /places...")
-        import_from_places()
-        self.stdout.write(self.style.SUCCESS("🎉 Combined import complete."))
+        order = {endpoint: i for i, endpoint in enumerate(ENDPOINTS)}
+        return [
+            (key[0], key[1], pages[key])
+            for key in sorted(pages, key=lambda k: (order[k[0]], k[1], k[2]))
+        ], failed
+
+    def safe_fetch(self, client, endpoint, park_code, start):
+        try:
+            return client.fetch_page(endpoint, park_code, start)
+        except requests.RequestException as e:
+            self.stderr.write(
+                f"❌ Error from /{endpoint} ({park_code}, start={start}): {e}"
+            )
+            return None
+
+    def collect_records(self, pages):
+        """Parse pages into one record per upstream (source, source_id), the
+        first park listing it wins; also return every (source, source_id) seen.
+
+        Namesakes are kept apart here: sync adopts the same trail listed by
+        another endpoint by name and location.
+        """
+        records = {}
+        for endpoint, park, page in pages:
+            for item in page.get("data", []):
+                record = parse_item(endpoint, item)
+                if record is None:
+                    continue
+                record["source"] = endpoint
+                record["source_id"] = item.get("id") or record["name"]
+                record["park_code"] = park
+                records.setdefault((endpoint, record["source_id"]), record)
+        return list(records.values()), set(records)
@@ -0,0 +1,62 @@
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.measure import D
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from trail_nav.catalog import bump_catalog_version
+from trail_nav.models import Trail, TrailSegment
+
+
+class Command(BaseCommand):
+    help = "Connect nearby trailheads with estimated TrailSegments for routing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--radius", type=float, default=2.0, help="radius in km")
+        parser.add_argument(
+            "--neighbors", type=int, default=4, help="max links per trailhead"
+        )
+        parser.add_argument(
+            "--detour",
+            type=float,
+            default=1.3,
+            help="walking length as a multiple of the straight-line distance",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        radius = options["radius"]
+        detour = max(1.0, options["detour"])
+        trails = Trail.objects.filter(removed_at__isnull=True, location__isnull=False)
+        linked = set(TrailSegment.objects.values_list("start_id", "end_id"))
+        batch, created = [], 0
+
+        for trail in trails.only("id", "location").iterator(chunk_size=2000):
+            nearest = (
+                trails.filter(location__dwithin=(trail.location, D(km=radius)))
+                .filter(~Q(id=trail.id))
+                .annotate(distance_from=Distance("location", trail.location))
+                .order_by("distance_from")
+                .values_list("id", "distance_from")[: options["neighbors"]]
+            )
+            for other_id, distance in nearest:
+                if (trail.id, other_id) in linked or (other_id, trail.id) in linked:
+                    continue
+                linked.add((trail.id, other_id))
+                batch.append(
+                    TrailSegment(
+                        start_id=trail.id,
+                        end_id=other_id,
+                        length_m=distance.m * detour,
+                    )
+                )
+            if len(batch) >= options["batch_size"]:
+                TrailSegment.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            TrailSegment.objects.bulk_create(batch)
+            created += len(batch)
+
+        # bulk_create sends no post_save; the bump reaches every process's graph
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"🎉 Linked {created} trail segments."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from trail_nav.trending import rebuild_trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the time-decayed trending scores of every trail from its "
+        "navigation sessions (backfill / repair)"
+    )
+
+    def handle(self, *args, **options):
+        written = rebuild_trending()
+        self.stdout.write(
+            self.style.SUCCESS(f"📈 Rebuilt trending scores for {written} trails.")
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from trail_nav.models import NavigationSession
+from trail_nav.stats import STATS_FIELDS, recompute_session_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild running navigation stats from full tracks (backfill / repair)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="recompute every session, not just ones with no stats yet",
+        )
+
+    def handle(self, *args, **options):
+        sessions = NavigationSession.objects.select_related("track").order_by("id")
+        if not options["all"]:
+            sessions = sessions.filter(point_count=0)
+
+        updated = 0
+        for session in sessions.iterator(chunk_size=200):
+            recompute_session_stats(session)
+            session.save(update_fields=STATS_FIELDS)
+            updated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"📈 Recomputed stats for {updated} sessions.")
+        )
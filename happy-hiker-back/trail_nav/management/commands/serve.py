@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+APPLICATIONS = {
+    # HTTP and the live navigation WebSocket, on uvicorn workers
+    "asgi": ("happy_hiker.asgi", "uvicorn_worker.UvicornWorker"),
+    # HTTP only, on threaded sync workers
+    "wsgi": ("happy_hiker.wsgi", "gthread"),
+}
+
+
+def default_workers():
+    return int(os.getenv("WEB_CONCURRENCY", 2 * multiprocessing.cpu_count() + 1))
+
+
+class Command(BaseCommand):
+    help = "Serve the app with gunicorn: preloaded app, several worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bind", default=os.getenv("BIND", "0.0.0.0:8000"))
+        parser.add_argument("--interface", choices=list(APPLICATIONS), default="asgi")
+        parser.add_argument("--workers", type=int, default=default_workers())
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=int(os.getenv("GUNICORN_THREADS", 4)),
+            help="per wsgi worker",
+        )
+        parser.add_argument("--timeout", type=int, default=30)
+        parser.add_argument(
+            "--max-requests",
+            type=int,
+            default=int(os.getenv("GUNICORN_MAX_REQUESTS", 5000)),
+            help="recycle a worker after this many requests (0: never)",
+        )
+
+    def handle(self, *args, **options):
+        from gunicorn.app.base import BaseApplication
+
+        module, worker_class = APPLICATIONS[options["interface"]]
+        database = settings.DATABASES["default"]
+        if options["interface"] == "asgi" and database.get("CONN_MAX_AGE"):
+            self.stderr.write(
+                "⚠️  CONN_MAX_AGE leaks connections under ASGI; "
+                "use DATABASE_POOL=1 instead"
+            )
+
+        # importing here, in the master, is the preload: workers fork with the
+        # app, URLconf and serializers already built
+        application = __import__(module, fromlist=["application"]).application
+
+        def post_fork(server, worker):
+            # never share the master's sockets with a child
+            connections.close_all()
+
+        config = {
+            "bind": options["bind"],
+            "workers": options["workers"],
+            "worker_class": worker_class,
+            "threads": options["threads"],
+            "timeout": options["timeout"],
+            "max_requests": options["max_requests"],
+            # spread recycling out so workers don't all restart together
+            "max_requests_jitter": options["max_requests"] // 10,
+            "preload_app": True,
+            "post_fork": post_fork,
+            "accesslog": "-",
+        }
+
+        class Server(BaseApplication):
+            def load_config(self):
+                for key, value in config.items():
+                    self.cfg.set(key, value)
+
+            def load(self):
+                return application
+
+        self.stdout.write(
+            f"🚀 Serving {module} on {options['bind']}: {options['workers']} "
+            f"{worker_class} workers"
+            f" ({'pooled' if 'pool' in database.get('OPTIONS', {}) else 'persistent'}"
+            " database connections)"
+        )
+        Server().run()
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0003_trail_is_hiking_trail_alter_trail_difficulty_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trail',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, geography=True, null=True, srid=4326),
+        ),
+        migrations.RunSQL(
+            sql="UPDATE trail_nav_trail SET location = ST_SetSRID(ST_MakePoint(long, lat), 4326)::geography WHERE location IS NULL;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:30
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0004_trail_location'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='trail',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='trail_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0005_trail_name_trgm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gpslog',
+            name='client_seq',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gpslog',
+            index=models.Index(fields=['session', 'timestamp'], name='gpslog_session_ts_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='gpslog',
+            constraint=models.UniqueConstraint(fields=('session', 'client_seq'), name='unique_gpslog_session_seq'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0006_gpslog_client_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('compacted_at', models.DateTimeField(auto_now=True)),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='track', to='trail_nav.navigationsession')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0007_sessiontrack'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessiontrack',
+            name='distance_m',
+            field=models.FloatField(default=0),
+        ),
+    ]
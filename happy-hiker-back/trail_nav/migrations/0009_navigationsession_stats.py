@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0008_sessiontrack_distance_m'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='navigationsession',
+            name='current_speed_mps',
+            field=models.FloatField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='distance_m',
+            field=models.FloatField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='last_fix_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='last_latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='last_longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='max_speed_mps',
+            field=models.FloatField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='moving_seconds',
+            field=models.FloatField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='point_count',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='stopped_seconds',
+            field=models.FloatField(db_default=0, default=0),
+        ),
+    ]
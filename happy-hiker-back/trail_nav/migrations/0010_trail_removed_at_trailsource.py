@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0009_navigationsession_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trail',
+            name='removed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TrailSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50)),
+                ('source_id', models.CharField(max_length=255)),
+                ('park_code', models.CharField(max_length=10)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('trail', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sources', to='trail_nav.trail')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'park_code'], name='trailsource_listing_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'source_id'), name='unique_trail_source')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:30
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0010_trail_removed_at_trailsource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrailSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('length_m', models.FloatField()),
+                ('bidirectional', models.BooleanField(default=True)),
+                ('path', django.contrib.gis.db.models.fields.LineStringField(blank=True, null=True, srid=4326)),
+                ('end', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_segments', to='trail_nav.trail')),
+                ('start', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_segments', to='trail_nav.trail')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:10
+
+import django.utils.timezone
+import trail_nav.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0011_trailsegment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(default=trail_nav.models.new_catalog_version, max_length=32)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0012_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Prompt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=255)),
+                ('audio_url', models.URLField(blank=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('radius_m', models.FloatField(default=50)),
+                ('min_pace_s_per_km', models.FloatField(blank=True, null=True)),
+                ('max_pace_s_per_km', models.FloatField(blank=True, null=True)),
+                ('min_elapsed_seconds', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('segment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='prompts', to='trail_nav.trailsegment')),
+                ('trail', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='prompts', to='trail_nav.trail')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PromptTrigger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('triggered_at', models.DateTimeField()),
+                ('prompt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='trail_nav.prompt')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prompt_triggers', to='trail_nav.navigationsession')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('session', 'prompt'), name='unique_prompt_per_session')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:20
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0013_prompt_prompttrigger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trail',
+            name='path',
+            field=django.contrib.gis.db.models.fields.LineStringField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='route_cursor',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='route_distance_m',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='route_progress_m',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='off_route',
+            field=models.BooleanField(db_default=False, default=False),
+        ),
+        migrations.AddField(
+            model_name='navigationsession',
+            name='route_events',
+            field=models.JSONField(blank=True, db_default=[], default=list),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0014_trail_path_navigationsession_route'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trail',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 21:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0015_trail_favorite_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrailTrend',
+            fields=[
+                ('trail', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='trail_nav.trail')),
+                ('region', models.CharField(max_length=32)),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score', 'trail'], name='trend_score_idx'), models.Index(fields=['region', '-score', 'trail'], name='trend_region_score_idx')],
+            },
+        ),
+    ]
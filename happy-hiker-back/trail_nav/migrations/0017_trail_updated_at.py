@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 22:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0016_trailtrend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trail',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
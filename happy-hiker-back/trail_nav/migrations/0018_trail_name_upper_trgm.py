@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 23:10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0017_trail_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trail',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='trail_name_upper_trgm'),
+        ),
+    ]
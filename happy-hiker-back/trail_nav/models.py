@@ -1,5 +1,10 @@
-from django.db import models
+import uuid
+
+from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.gis.geos import Point
 from django.conf import settings
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 
@@ -14,10 +19,84 @@ class Trail(models.Model):
     is_hiking_trail = models.BooleanField(
         default=False
     )  # ✅ used to filter trails for frontend
+    # kept in sync with lat/long on save; GiST-indexed for radius/bbox queries
+    location = models.PointField(geography=True, srid=4326, null=True, blank=True)
+    # the route itself, start to finish; sessions on a trail with a path are
+    # checked for going off route (trail_nav.deviation)
+    path = models.LineStringField(srid=4326, null=True, blank=True)
+    # set by import_trails when the upstream record disappears
+    removed_at = models.DateTimeField(null=True, blank=True)
+    # kept in step with user_profile.Favorite rows by its signals
+    favorite_count = models.PositiveIntegerField(default=0)
+    # bulk writes (trail_nav.sync) set it themselves; trail_nav.similar reads
+    # the trails changed since its last look
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # % / %> fuzzy matching on the name itself
+            GinIndex(
+                fields=["name"], name="trail_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            # case-insensitive lookups (istartswith typeahead) compile to
+            # UPPER(name) LIKE UPPER(...), which only an index on UPPER(name) serves
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="trail_name_upper_trgm",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.lat is not None and self.long is not None:
+            self.location = Point(self.long, self.lat, srid=4326)
+        super().save(*args, **kwargs)
+
+
+class TrailSource(models.Model):
+    """Sync state linking a Trail to the upstream NPS record it came from."""
+
+    trail = models.ForeignKey(Trail, on_delete=models.CASCADE, related_name="sources")
+    source = models.CharField(max_length=50)  # NPS endpoint, e.g. "thingstodo"
+    source_id = models.CharField(max_length=255)
+    park_code = models.CharField(max_length=10)
+    content_hash = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "source_id"], name="unique_trail_source"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["source", "park_code"], name="trailsource_listing_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.source}:{self.source_id} -> {self.trail_id}"
+
+
+class TrailSegment(models.Model):
+    """A walkable connection between two trailheads, the edges of the route graph."""
+
+    start = models.ForeignKey(
+        Trail, on_delete=models.CASCADE, related_name="outgoing_segments"
+    )
+    end = models.ForeignKey(
+        Trail, on_delete=models.CASCADE, related_name="incoming_segments"
+    )
+    length_m = models.FloatField()
+    bidirectional = models.BooleanField(default=True)
+    # optional trail geometry from start to end; routes fall back to straight lines
+    path = models.LineStringField(srid=4326, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.start_id} -> {self.end_id} ({self.length_m:.0f} m)"
+
 
 class TrailImage(models.Model):
     trail = models.ForeignKey(Trail, related_name="images", on_delete=models.CASCADE)
@@ -28,6 +107,22 @@ class TrailImage(models.Model):
         return f"Image for {self.trail.name}"
 
 
+def new_catalog_version():
+    return uuid.uuid4().hex
+
+
+class CatalogVersion(models.Model):
+    """Single row that changes whenever a trail or trail image does.
+
+    Drives the ETag of catalog responses and namespaces their cache keys
+    (see trail_nav.catalog). Random rather than a counter, so a recreated row
+    can never collide with keys cached for an earlier one.
+    """
+
+    version = models.CharField(max_length=32, default=new_catalog_version)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+
 class NavigationSession(models.Model):
     trail = models.ForeignKey(Trail, on_delete=models.CASCADE, related_name="sessions")
     user = models.ForeignKey(
@@ -43,10 +138,41 @@ class NavigationSession(models.Model):
         choices=[("started", "Started"), ("paused", "Paused"), ("stopped", "Stopped")],
         default="started",
     )
+    # running aggregates, advanced per fix by trail_nav.stats.apply_fix; the db
+    # defaults keep raw INSERTs of sessions (benches, backfills) valid
+    point_count = models.PositiveIntegerField(default=0, db_default=0)
+    distance_m = models.FloatField(default=0, db_default=0)
+    moving_seconds = models.FloatField(default=0, db_default=0)
+    stopped_seconds = models.FloatField(default=0, db_default=0)
+    max_speed_mps = models.FloatField(default=0, db_default=0)
+    current_speed_mps = models.FloatField(default=0, db_default=0)
+    last_latitude = models.FloatField(null=True, blank=True)
+    last_longitude = models.FloatField(null=True, blank=True)
+    last_fix_at = models.DateTimeField(null=True, blank=True)
+    # position against trail.path, advanced per fix by trail_nav.deviation
+    # nearest path segment
+    route_cursor = models.PositiveIntegerField(default=0, db_default=0)
+    route_distance_m = models.FloatField(null=True, blank=True)
+    route_progress_m = models.FloatField(null=True, blank=True)
+    off_route = models.BooleanField(default=False, db_default=False)
+    # [{"event": "off_route" | "back_on_route", "at", "distance_m", "progress_m"}]
+    route_events = models.JSONField(default=list, db_default=[], blank=True)
 
     def __str__(self):
         return f"{self.user.username} on {self.trail.name} ({self.status})"
 
+    @property
+    def current_pace_s_per_km(self):
+        if self.current_speed_mps <= 0:
+            return None
+        return 1000 / self.current_speed_mps
+
+    @property
+    def average_pace_s_per_km(self):
+        if self.distance_m <= 0:
+            return None
+        return self.moving_seconds / (self.distance_m / 1000)
+
 
 class GPSLog(models.Model):
     session = models.ForeignKey(
@@ -55,6 +181,109 @@ class GPSLog(models.Model):
     latitude = models.FloatField()
     longitude = models.FloatField()
     timestamp = models.DateTimeField(default=timezone.now)
+    # client-side sequence number, lets retried uploads be de-duplicated
+    client_seq = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session", "client_seq"], name="unique_gpslog_session_seq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["session", "timestamp"], name="gpslog_session_ts_idx")
+        ]
 
     def __str__(self):
         return f"{self.session.user.username} at {self.latitude}, {self.longitude} on {self.timestamp}"
+
+
+class SessionTrack(models.Model):
+    """A finished session's GPS fixes packed into one blob (see trail_nav.tracks)."""
+
+    session = models.OneToOneField(
+        NavigationSession, on_delete=models.CASCADE, related_name="track"
+    )
+    point_count = models.PositiveIntegerField(default=0)
+    distance_m = models.FloatField(default=0)
+    data = models.BinaryField()
+    compacted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Track for session {self.session_id} ({self.point_count} points)"
+
+
+class TrailTrend(models.Model):
+    """A trail's time-decayed popularity, kept by trail_nav.trending."""
+
+    trail = models.OneToOneField(
+        Trail, on_delete=models.CASCADE, primary_key=True, related_name="trend"
+    )
+    # "z/x/y" of the coarse map tile holding the trailhead
+    region = models.CharField(max_length=32)
+    # log of the score at trending.EPOCH; orders trails like the score does now
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-score", "trail"], name="trend_score_idx"),
+            models.Index(
+                fields=["region", "-score", "trail"], name="trend_region_score_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Trend for trail {self.trail_id} in {self.region}"
+
+
+class Prompt(models.Model):
+    """A mindfulness prompt played when a hiker enters its zone.
+
+    The zone is a circle of ``radius_m`` around latitude/longitude, or a
+    corridor of that half-width along ``segment``; a prompt with neither plays
+    anywhere. ``trail`` limits it to sessions on one trail, and the pace and
+    elapsed-time bounds must also hold. Each prompt fires once per session.
+    """
+
+    text = models.CharField(max_length=255)
+    audio_url = models.URLField(blank=True)
+    trail = models.ForeignKey(
+        Trail, on_delete=models.CASCADE, null=True, blank=True, related_name="prompts"
+    )
+    segment = models.ForeignKey(
+        TrailSegment,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="prompts",
+    )
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    radius_m = models.FloatField(default=50)
+    # seconds per km; a slower pace is a larger number
+    min_pace_s_per_km = models.FloatField(null=True, blank=True)
+    max_pace_s_per_km = models.FloatField(null=True, blank=True)
+    min_elapsed_seconds = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.text
+
+
+class PromptTrigger(models.Model):
+    session = models.ForeignKey(
+        NavigationSession, on_delete=models.CASCADE, related_name="prompt_triggers"
+    )
+    prompt = models.ForeignKey(Prompt, on_delete=models.CASCADE, related_name="+")
+    triggered_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session", "prompt"], name="unique_prompt_per_session"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Prompt {self.prompt_id} in session {self.session_id}"
@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TrailCursorPagination(CursorPagination):
+    """Keyset pagination: each page is an indexed `WHERE key > cursor LIMIT n`."""
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("id",)
+
+    def get_ordering(self, request, queryset, view):
+        # ?near= / ?bbox= results are sorted by distance, so page on that instead
+        if "distance_from" in queryset.query.annotations:
+            return ("distance_from", "id")
+        return super().get_ordering(request, queryset, view)
+
+
+class SessionCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-started_at",)
@@ -0,0 +1,279 @@
+"""Geofenced prompt matching for GPS updates.
+
+Prompt zones are bucketed into a uniform lat/long grid held in memory, so a
+fix only tests the handful of zones registered in its own cell, whatever the
+size of the catalog. Zones too big for the grid and zone-less prompts are
+tested on every fix, and are expected to be few. The index is rebuilt after
+INDEX_TTL_SECONDS, when a Prompt changes, or when the catalog version moves
+(segments and trailheads the zones follow).
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict
+
+from .geo import EARTH_RADIUS_KM
+
+INDEX_TTL_SECONDS = 300
+# ~1.1 km north-south; most zones are a few tens of metres to a few hundred
+CELL_DEG = 0.01
+# zones spanning more cells than this are checked on every fix instead
+MAX_CELLS_PER_ZONE = 400
+METRES_PER_DEG = EARTH_RADIUS_KM * 1000 * math.pi / 180
+
+
+class PromptZone:
+    """The matching-relevant parts of a Prompt, flattened for speed."""
+
+    __slots__ = [
+        "prompt_id",
+        "text",
+        "audio_url",
+        "trail_id",
+        "radius_m",
+        "path",
+        "min_pace",
+        "max_pace",
+        "min_elapsed",
+    ]
+
+    def __init__(
+        self,
+        prompt_id,
+        radius_m,
+        path=None,
+        text="",
+        audio_url="",
+        trail_id=None,
+        min_pace=None,
+        max_pace=None,
+        min_elapsed=0,
+    ):
+        self.prompt_id = prompt_id
+        self.text = text
+        self.audio_url = audio_url
+        self.trail_id = trail_id
+        self.radius_m = radius_m
+        # [(lat, lng), ...]: one point for a circle, a polyline for a corridor,
+        # None for a prompt that plays anywhere
+        self.path = path
+        self.min_pace = min_pace
+        self.max_pace = max_pace
+        self.min_elapsed = min_elapsed
+
+    def bounds(self):
+        lats = [lat for lat, _ in self.path]
+        lngs = [lng for _, lng in self.path]
+        dlat = self.radius_m / METRES_PER_DEG
+        dlng = dlat / max(math.cos(math.radians(max(map(abs, lats)))), 0.01)
+        return min(lats) - dlat, min(lngs) - dlng, max(lats) + dlat, max(lngs) + dlng
+
+    def contains(self, lat, lng):
+        if self.path is None:
+            return True
+        kx = math.cos(math.radians(lat)) * METRES_PER_DEG
+        x, y = lng * kx, lat * METRES_PER_DEG
+        limit = self.radius_m * self.radius_m
+        first_lat, first_lng = self.path[0]
+        ax, ay = first_lng * kx, first_lat * METRES_PER_DEG
+        if len(self.path) == 1:
+            return (x - ax) ** 2 + (y - ay) ** 2 <= limit
+        for b_lat, b_lng in self.path[1:]:
+            bx, by = b_lng * kx, b_lat * METRES_PER_DEG
+            dx, dy = bx - ax, by - ay
+            length = dx * dx + dy * dy
+            t = 0.0 if length == 0 else ((x - ax) * dx + (y - ay) * dy) / length
+            t = max(0.0, min(1.0, t))
+            if (x - ax - t * dx) ** 2 + (y - ay - t * dy) ** 2 <= limit:
+                return True
+            ax, ay = bx, by
+        return False
+
+    def conditions_met(self, session, timestamp):
+        if self.min_elapsed and session.started_at is not None:
+            if (timestamp - session.started_at).total_seconds() < self.min_elapsed:
+                return False
+        if self.min_pace is not None or self.max_pace is not None:
+            pace = session.current_pace_s_per_km
+            if pace is None:
+                return False
+            if self.min_pace is not None and pace < self.min_pace:
+                return False
+            if self.max_pace is not None and pace > self.max_pace:
+                return False
+        return True
+
+
+def _cell(lat, lng):
+    return math.floor(lat / CELL_DEG), math.floor(lng / CELL_DEG)
+
+
+class PromptIndex:
+    def __init__(self, zones):
+        self.cells = defaultdict(list)
+        self.everywhere = []
+        for zone in zones:
+            if zone.path is None:
+                self.everywhere.append(zone)
+                continue
+            south, west, north, east = zone.bounds()
+            (i0, j0), (i1, j1) = _cell(south, west), _cell(north, east)
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > MAX_CELLS_PER_ZONE:
+                self.everywhere.append(zone)
+                continue
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self.cells[(i, j)].append(zone)
+        self.zone_count = len(zones)
+        self.built_at = time.monotonic()
+        self.catalog_version = None
+
+    @classmethod
+    def from_database(cls):
+        from .models import Prompt
+
+        zones = []
+        for prompt in Prompt.objects.filter(is_active=True).select_related(
+            "segment__start", "segment__end"
+        ):
+            if prompt.segment is not None:
+                segment = prompt.segment
+                if segment.path is not None:
+                    path = [(lat, lng) for lng, lat in segment.path.coords]
+                else:
+                    path = [
+                        (segment.start.lat, segment.start.long),
+                        (segment.end.lat, segment.end.long),
+                    ]
+            elif prompt.latitude is not None and prompt.longitude is not None:
+                path = [(prompt.latitude, prompt.longitude)]
+            else:
+                path = None
+            zones.append(
+                PromptZone(
+                    prompt.id,
+                    prompt.radius_m,
+                    path=path,
+                    text=prompt.text,
+                    audio_url=prompt.audio_url,
+                    trail_id=prompt.trail_id,
+                    min_pace=prompt.min_pace_s_per_km,
+                    max_pace=prompt.max_pace_s_per_km,
+                    min_elapsed=prompt.min_elapsed_seconds,
+                )
+            )
+        return cls(zones)
+
+    def match(self, lat, lng, trail_id=None):
+        """Zones containing the point, for a session on ``trail_id``."""
+        hits = []
+        for zones in (self.cells.get(_cell(lat, lng), ()), self.everywhere):
+            for zone in zones:
+                if zone.trail_id is not None and zone.trail_id != trail_id:
+                    continue
+                if zone.contains(lat, lng):
+                    hits.append(zone)
+        return hits
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_prompt_index():
+    from .catalog import recent_catalog_version
+
+    global _index
+    version = recent_catalog_version()
+    index = _index
+    if (
+        index is None
+        or index.catalog_version != version
+        or time.monotonic() - index.built_at > INDEX_TTL_SECONDS
+    ):
+        with _index_lock:
+            if _index is index:
+                index = PromptIndex.from_database()
+                index.catalog_version = version
+                _index = index
+            index = _index
+    return index
+
+
+def invalidate_prompt_index(**kwargs):
+    global _index
+    _index = None
+
+
+class PromptScheduler:
+    """Decides which prompts a session's new fixes trigger.
+
+    Call check() after apply_fix() for each fix (pace conditions read the
+    running stats), then save() once to record the triggers. The index is
+    taken once, so a long-lived scheduler keeps the zones it started with.
+    """
+
+    def __init__(self, session, index=None):
+        self.session = session
+        self.index = index if index is not None else get_prompt_index()
+        self.fired = None
+        self.new_triggers = []
+
+    def load_fired(self):
+        from .models import PromptTrigger
+
+        self.fired = set(
+            PromptTrigger.objects.filter(session=self.session).values_list(
+                "prompt_id", flat=True
+            )
+        )
+
+    def check(self, lat, lng, timestamp):
+        """Prompt payloads triggered by this fix."""
+        zones = self.index.match(lat, lng, self.session.trail_id)
+        if not zones:
+            return []
+        if self.fired is None:
+            # only sessions that reach a zone pay for this query
+            self.load_fired()
+        due = []
+        for zone in zones:
+            if zone.prompt_id in self.fired:
+                continue
+            if not zone.conditions_met(self.session, timestamp):
+                continue
+            self.fired.add(zone.prompt_id)
+            self.new_triggers.append((zone.prompt_id, timestamp))
+            due.append(
+                {
+                    "id": zone.prompt_id,
+                    "text": zone.text,
+                    "audio_url": zone.audio_url,
+                    "triggered_at": timestamp,
+                }
+            )
+        return due
+
+    def pop_triggers(self):
+        triggers, self.new_triggers = self.new_triggers, []
+        return triggers
+
+    def save(self):
+        """Store the triggers found since the last save."""
+        write_triggers(self.session.id, self.pop_triggers())
+
+
+def write_triggers(session_id, triggers):
+    from .models import PromptTrigger
+
+    if triggers:
+        PromptTrigger.objects.bulk_create(
+            [
+                PromptTrigger(
+                    session_id=session_id, prompt_id=prompt_id, triggered_at=ts
+                )
+                for prompt_id, ts in triggers
+            ],
+            ignore_conflicts=True,
+        )
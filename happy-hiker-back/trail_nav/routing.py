@@ -0,0 +1,187 @@
+"""In-memory walking route engine over trailheads (nodes) and TrailSegments.
+
+The graph is held in compressed sparse row form in stdlib arrays - one offset
+per node plus a target and a weight per directed edge - so a million edges cost
+tens of megabytes rather than a dict of tuples per edge. Routes are found with
+A* using the great-circle distance to the goal, which is admissible because no
+edge is allowed to be shorter than the straight line between its endpoints.
+
+The graph is built once per process and rebuilt when the catalog version
+moves, which every Trail or TrailSegment write does, bulk ones included.
+"""
+
+import heapq
+import math
+import threading
+from array import array
+
+from .geo import EARTH_RADIUS_KM, haversine_km
+
+
+class TrailGraph:
+    def __init__(self, node_ids, lats, lngs, offsets, targets, weights, edge_ids):
+        self.node_ids = node_ids  # array: index -> Trail id
+        self.index = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.lats = lats
+        self.lngs = lngs
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.edge_ids = edge_ids  # array: directed edge -> TrailSegment id
+        self.catalog_version = None
+
+    @classmethod
+    def from_edges(cls, nodes, edges):
+        """Build from ``nodes`` [(id, lat, lng)] and ``edges``
+        [(segment_id, start_id, end_id, length_m, bidirectional)]."""
+        node_ids = array("q")
+        lats, lngs = array("d"), array("d")
+        index = {}
+        for node_id, lat, lng in nodes:
+            index[node_id] = len(node_ids)
+            node_ids.append(node_id)
+            lats.append(lat)
+            lngs.append(lng)
+
+        directed = []
+        for segment_id, start, end, length_m, bidirectional in edges:
+            a, b = index.get(start), index.get(end)
+            if a is None or b is None or a == b:
+                continue
+            # never shorter than the straight line, keeps the A* heuristic admissible
+            weight = max(
+                length_m or 0.0,
+                haversine_km(lats[a], lngs[a], lats[b], lngs[b]) * 1000,
+            )
+            directed.append((a, b, weight, segment_id))
+            if bidirectional:
+                directed.append((b, a, weight, segment_id))
+
+        # counting sort by source node into CSR arrays
+        offsets = array("q", [0]) * (len(node_ids) + 1)
+        for a, _, _, _ in directed:
+            offsets[a + 1] += 1
+        for i in range(len(node_ids)):
+            offsets[i + 1] += offsets[i]
+        cursor = array("q", offsets)
+        targets = array("q", [0]) * len(directed)
+        weights = array("d", [0.0]) * len(directed)
+        edge_ids = array("q", [0]) * len(directed)
+        for a, b, weight, segment_id in directed:
+            slot = cursor[a]
+            targets[slot], weights[slot], edge_ids[slot] = b, weight, segment_id
+            cursor[a] += 1
+        return cls(node_ids, lats, lngs, offsets, targets, weights, edge_ids)
+
+    @classmethod
+    def from_database(cls):
+        from .catalog import get_catalog_version
+        from .models import Trail, TrailSegment
+
+        # read first: a write during the build leaves the graph a version behind
+        version = get_catalog_version().version
+        nodes = Trail.objects.filter(removed_at__isnull=True).values_list(
+            "id", "lat", "long"
+        )
+        edges = TrailSegment.objects.values_list(
+            "id", "start_id", "end_id", "length_m", "bidirectional"
+        )
+        graph = cls.from_edges(nodes.iterator(), edges.iterator(chunk_size=10_000))
+        graph.catalog_version = version
+        return graph
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def _heuristic(self, goal):
+        # precomputed trig for the goal; same formula as geo.haversine_km
+        glat = math.radians(self.lats[goal])
+        glng = math.radians(self.lngs[goal])
+        cos_glat = math.cos(glat)
+        lats, lngs = self.lats, self.lngs
+        radius_m = EARTH_RADIUS_KM * 1000
+
+        def estimate(node):
+            lat = math.radians(lats[node])
+            a = (
+                math.sin((glat - lat) / 2) ** 2
+                + math.cos(lat)
+                * cos_glat
+                * math.sin((glng - math.radians(lngs[node])) / 2) ** 2
+            )
+            return 2 * radius_m * math.asin(min(1.0, math.sqrt(a)))
+
+        return estimate
+
+    def shortest_path(self, start_id, goal_id):
+        """A* from one Trail id to another.
+
+        Returns (distance_m, [trail ids], [segment ids]) or None if unreachable.
+        Raises KeyError for ids that are not in the graph.
+        """
+        start, goal = self.index[start_id], self.index[goal_id]
+        if start == goal:
+            return 0.0, [start_id], []
+
+        estimate = self._heuristic(goal)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        best = {start: 0.0}
+        came_from = {}
+        closed = set()
+        heap = [(estimate(start), 0.0, start)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == goal:
+                return cost, *self._unwind(came_from, start, goal)
+            if node in closed:
+                continue
+            closed.add(node)
+            for slot in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[slot]
+                if neighbor in closed:
+                    continue
+                new_cost = cost + weights[slot]
+                if new_cost < best.get(neighbor, math.inf):
+                    best[neighbor] = new_cost
+                    came_from[neighbor] = (node, slot)
+                    heapq.heappush(
+                        heap, (new_cost + estimate(neighbor), new_cost, neighbor)
+                    )
+        return None
+
+    def _unwind(self, came_from, start, goal):
+        nodes, segments = [goal], []
+        node = goal
+        while node != start:
+            node, slot = came_from[node]
+            nodes.append(node)
+            segments.append(self.edge_ids[slot])
+        nodes.reverse()
+        segments.reverse()
+        return [self.node_ids[n] for n in nodes], segments
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """The process-wide graph, rebuilt when the catalog version moves."""
+    from .catalog import get_catalog_version
+
+    global _graph
+    version = get_catalog_version().version
+    graph = _graph
+    if graph is None or graph.catalog_version != version:
+        with _graph_lock:
+            if _graph is graph:
+                _graph = TrailGraph.from_database()
+            graph = _graph
+    return graph
+
+
+def invalidate_graph(**kwargs):
+    """Drop the cached graph, for a caller that found it out of date."""
+    global _graph
+    _graph = None
@@ -1,5 +1,28 @@
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Trail, TrailImage, NavigationSession, GPSLog
+from .tracks import session_points
+
+
+def requested_fields(request):
+    """Return the set named in ?fields=a,b,c, or None when every field is wanted."""
+    if request is None:
+        return None
+    fields = request.query_params.get("fields")
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(",") if field.strip()}
+
+
+class SparseFieldsMixin:
+    """Drop any serializer fields not listed in the request's ?fields= param."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get("request"))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
 
 
 class TrailImageSerializer(serializers.ModelSerializer):
@@ -8,8 +31,10 @@ class TrailImageSerializer(serializers.ModelSerializer):
         fields = ["id", "image", "caption"]
 
 
-class TrailSerializer(serializers.ModelSerializer):
+class TrailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     images = TrailImageSerializer(many=True, read_only=True)
+    distance_km = serializers.SerializerMethodField()
+    is_favorite = serializers.SerializerMethodField()
 
     class Meta:
         model = Trail
@@ -23,6 +48,46 @@ class TrailSerializer(serializers.ModelSerializer):
             "difficulty",
             "is_dog_friendly",
             "images",
+            "distance_km",
+            "favorite_count",
+            "is_favorite",
+        ]
+        read_only_fields = ["favorite_count"]
+
+    def get_distance_km(self, obj):
+        # only present when the list was filtered with ?near= or ?bbox=
+        distance = getattr(obj, "distance_from", None)
+        return round(distance / 1000, 3) if distance is not None else None
+
+    def get_is_favorite(self, obj):
+        # annotated for ?favorites=1, otherwise filled in per hiker by the view
+        return getattr(obj, "is_favorite", False)
+
+
+class TrailSearchResultSerializer(serializers.ModelSerializer):
+    score = serializers.FloatField(source="similarity", read_only=True)
+
+    class Meta:
+        model = Trail
+        fields = ["id", "name", "lat", "long", "score"]
+
+
+class SimilarTrailSerializer(serializers.ModelSerializer):
+    # feature-space distance from the trail asked about; smaller is more alike
+    similarity_distance = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Trail
+        fields = [
+            "id",
+            "name",
+            "lat",
+            "long",
+            "distance",
+            "elevation",
+            "difficulty",
+            "is_dog_friendly",
+            "similarity_distance",
         ]
 
 
@@ -32,8 +97,47 @@ class GPSLogSerializer(serializers.ModelSerializer):
         fields = ["id", "latitude", "longitude", "timestamp"]
 
 
+class GPSPointSerializer(serializers.Serializer):
+    """One fix in a batch upload; timestamp and seq come from the client."""
+
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    timestamp = serializers.DateTimeField(required=False)
+    # stored in GPSLog.client_seq, a 32-bit integer column
+    seq = serializers.IntegerField(min_value=0, max_value=2**31 - 1, required=False)
+
+
+class NavigationStatsSerializer(serializers.ModelSerializer):
+    """Running aggregates maintained by trail_nav.stats; no GPSLog access."""
+
+    distance_km = serializers.SerializerMethodField()
+    current_pace_s_per_km = serializers.FloatField(read_only=True)
+    average_pace_s_per_km = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = NavigationSession
+        fields = [
+            "point_count",
+            "distance_km",
+            "moving_seconds",
+            "stopped_seconds",
+            "max_speed_mps",
+            "current_speed_mps",
+            "current_pace_s_per_km",
+            "average_pace_s_per_km",
+            "last_fix_at",
+            "off_route",
+            "route_distance_m",
+            "route_progress_m",
+        ]
+
+    def get_distance_km(self, obj):
+        return round(obj.distance_m / 1000, 3)
+
+
 class NavigationSessionSerializer(serializers.ModelSerializer):
-    gps_logs = GPSLogSerializer(many=True, read_only=True)
+    gps_logs = serializers.SerializerMethodField()
+    stats = NavigationStatsSerializer(source="*", read_only=True)
 
     class Meta:
         model = NavigationSession
@@ -45,6 +149,53 @@ class NavigationSessionSerializer(serializers.ModelSerializer):
             "ended_at",
             "is_active",
             "status",
+            "stats",
+            "route_events",
             "gps_logs",
         ]
-        read_only_fields = ["started_at", "ended_at", "gps_logs"]
+        read_only_fields = ["started_at", "ended_at", "route_events", "gps_logs"]
+
+    def get_gps_logs(self, obj):
+        # compacted sessions are decoded from their packed track; packed points
+        # no longer have row ids. Views loading sessions select_related("track"),
+        # so telling the two apart costs no query per session
+        if hasattr(obj, "track"):
+            return [
+                {"id": None, "latitude": lat, "longitude": lng, "timestamp": ts}
+                for lat, lng, ts in session_points(obj)
+            ]
+        return GPSLogSerializer(obj.gps_logs.all(), many=True).data
+
+
+class NavigationSessionSummarySerializer(serializers.ModelSerializer):
+    """History row: the session's stored aggregates, without the track."""
+
+    trail_name = serializers.CharField(source="trail.name", read_only=True)
+    duration_seconds = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+    average_pace_s_per_km = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = NavigationSession
+        fields = [
+            "id",
+            "trail",
+            "trail_name",
+            "started_at",
+            "ended_at",
+            "is_active",
+            "status",
+            "duration_seconds",
+            "distance_km",
+            "point_count",
+            "moving_seconds",
+            "max_speed_mps",
+            "average_pace_s_per_km",
+        ]
+
+    def get_duration_seconds(self, obj):
+        end = obj.ended_at or timezone.now()
+        return round((end - obj.started_at).total_seconds())
+
+    def get_distance_km(self, obj):
+        return round(obj.distance_m / 1000, 3)
@@ -0,0 +1,55 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .deviation import invalidate_trail_line
+from .models import Prompt, Trail, TrailImage, TrailSegment
+from .prompts import invalidate_prompt_index
+from .tiles import invalidate_extent
+
+
+def _extent(instance):
+    """(south, west, north, east) of what the instance draws on a map tile."""
+    if isinstance(instance, Trail):
+        if instance.lat is None or instance.long is None:
+            return None
+        return instance.lat, instance.long, instance.lat, instance.long
+    if instance.path is None:
+        return None
+    west, south, east, north = instance.path.extent
+    return south, west, north, east
+
+
+@receiver(pre_save, sender=Trail)
+@receiver(pre_save, sender=TrailSegment)
+def remember_tile_extent(sender, instance, **kwargs):
+    # the old position has to be cleared too when something moves
+    previous = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._previous_tile_extent = previous and _extent(previous)
+
+
+@receiver([post_save, post_delete], sender=Trail)
+@receiver([post_save, post_delete], sender=TrailSegment)
+def invalidate_tiles(sender, instance, **kwargs):
+    for extent in {_extent(instance), getattr(instance, "_previous_tile_extent", None)}:
+        if extent is not None:
+            invalidate_extent(*extent)
+
+
+@receiver([post_save, post_delete], sender=Trail)
+@receiver([post_save, post_delete], sender=TrailImage)
+@receiver([post_save, post_delete], sender=TrailSegment)
+def trail_catalog_changed(sender, **kwargs):
+    # also what the route graph, trail lines and prompt index are keyed on
+    bump_catalog_version()
+
+
+@receiver([post_save, post_delete], sender=Prompt)
+@receiver([post_save, post_delete], sender=TrailSegment)
+def prompt_zones_changed(sender, **kwargs):
+    invalidate_prompt_index()
+
+
+@receiver([post_save, post_delete], sender=Trail)
+def trail_path_changed(sender, instance, **kwargs):
+    invalidate_trail_line(instance.id)
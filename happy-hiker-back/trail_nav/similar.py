@@ -0,0 +1,397 @@
+"""Similar-trail lookups over an in-memory k-d tree of trail feature vectors.
+
+Each trail becomes a short vector: log length and log elevation gain, a
+difficulty rank and the dog flag, standardized over the catalog, plus the
+trailhead as a point on a sphere scaled so LOCATION_SCALE_KM of separation
+weighs as much as one standard deviation of the others. The vectors sit in one
+float32 NumPy matrix, ordered as the leaves of a KDTree, and the most similar
+trails to one are its nearest neighbours there.
+
+The index is built once per process and then kept current incrementally: when
+the catalog version moves (a save, or an import_trails run in another
+process), only trails whose updated_at is past the index's watermark are
+re-read. Their old rows are masked out of the tree and their new vectors kept
+in a small delta matrix that is scanned directly; once the delta outgrows
+COMPACT_FRACTION of the tree, a new tree is built from the vectors already in
+memory, without reading the catalog again.
+"""
+
+import heapq
+import math
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from .catalog import get_catalog_version
+from .geo import EARTH_RADIUS_KM
+from .models import NavigationSession, Trail
+
+LEAF_SIZE = 32
+DIFFICULTY_RANKS = {"easy": 0, "moderate": 1, "hard": 2, "difficult": 2, "strenuous": 3}
+# trailheads this far apart differ as much as one standard deviation of a feature
+LOCATION_SCALE_KM = 100
+# rebuild the tree once this share of it has been superseded by the delta
+COMPACT_FRACTION = 0.05
+COMPACT_MIN_DELTA = 1000
+# re-read a little before the watermark, for writes that committed late
+WATERMARK_OVERLAP = timedelta(minutes=5)
+BUILD_CHUNK_SIZE = 50_000
+FEATURE_COLUMNS = [
+    "id",
+    "distance",
+    "elevation",
+    "difficulty",
+    "is_dog_friendly",
+    "lat",
+    "long",
+]
+# how much of a personalized query comes from the hiker's history
+PERSONAL_WEIGHT = 0.3
+PERSONAL_HISTORY = 50
+
+
+def raw_features(rows):
+    """(n, 7) matrix from FEATURE_COLUMNS rows minus the id."""
+    features = np.empty((len(rows), 7))
+    for i, (distance, elevation, difficulty, dog, lat, lng) in enumerate(rows):
+        features[i, 0] = math.log1p(max(distance or 0.0, 0.0))
+        features[i, 1] = math.log1p(max(elevation or 0, 0))
+        features[i, 2] = DIFFICULTY_RANKS.get((difficulty or "").lower(), 1)
+        features[i, 3] = 1.0 if dog else 0.0
+        features[i, 4:] = _unit_vector(lat, lng)
+    return features
+
+
+def _unit_vector(lat, lng):
+    phi, lam = math.radians(lat), math.radians(lng)
+    return (
+        math.cos(phi) * math.cos(lam),
+        math.cos(phi) * math.sin(lam),
+        math.sin(phi),
+    )
+
+
+class Scaler:
+    """Standardizes the first four features; scales the unit vector to match.
+
+    Fitted once, on the full build, and reused for incremental updates so
+    existing rows never need rescaling.
+    """
+
+    def __init__(self, mean, std):
+        self.mean = mean
+        self.std = std
+
+    @classmethod
+    def fit(cls, features):
+        if len(features):
+            mean, std = features[:, :4].mean(axis=0), features[:, :4].std(axis=0)
+        else:
+            mean, std = np.zeros(4), np.ones(4)
+        return cls(mean, np.where(std > 1e-9, std, 1.0))
+
+    def transform(self, features):
+        vectors = np.empty(features.shape, dtype=np.float32)
+        vectors[:, :4] = (features[:, :4] - self.mean) / self.std
+        vectors[:, 4:] = features[:, 4:] * (EARTH_RADIUS_KM / LOCATION_SCALE_KM)
+        return vectors
+
+
+class KDTree:
+    """A static k-d tree over the rows of a matrix.
+
+    Nodes split at the median of their widest dimension down to ``leaf_size``
+    rows and keep their bounding boxes, so a query opens nodes nearest box
+    first and stops once no box can beat the k-th best distance so far. Rows
+    are stored in tree order (``order`` maps them back), so a leaf is one
+    contiguous slice scanned in a single vectorized step.
+    """
+
+    def __init__(self, points, leaf_size=LEAF_SIZE):
+        n, dims = points.shape
+        order = np.arange(n)
+        starts, ends, lefts, rights, lows, highs = [], [], [], [], [], []
+
+        def add_node(lo, hi):
+            block = points[order[lo:hi]]
+            starts.append(lo)
+            ends.append(hi)
+            lefts.append(-1)
+            rights.append(-1)
+            lows.append(block.min(axis=0) if hi > lo else np.zeros(dims))
+            highs.append(block.max(axis=0) if hi > lo else np.zeros(dims))
+            return len(starts) - 1
+
+        stack = [add_node(0, n)]
+        while stack:
+            node = stack.pop()
+            lo, hi = starts[node], ends[node]
+            if hi - lo <= leaf_size:
+                continue
+            dim = int(np.argmax(highs[node] - lows[node]))
+            mid = (lo + hi) // 2
+            rows = order[lo:hi]
+            order[lo:hi] = rows[np.argpartition(points[rows, dim], mid - lo)]
+            lefts[node] = add_node(lo, mid)
+            rights[node] = add_node(mid, hi)
+            stack += [lefts[node], rights[node]]
+
+        self.order = order
+        self.points = points[order]
+        self.starts, self.ends = np.array(starts), np.array(ends)
+        self.lefts, self.rights = np.array(lefts), np.array(rights)
+        self.lows, self.highs = np.array(lows), np.array(highs)
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, point, k, alive=None):
+        """Tree rows and squared distances of the ``k`` nearest live rows."""
+        best_rows = np.empty(0, dtype=np.int64)
+        best = np.empty(0)
+        worst = math.inf
+        if not len(self.points) or k < 1:
+            return best_rows, best
+        heap = [(0.0, 0)]
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if bound >= worst:
+                break
+            left = self.lefts[node]
+            if left < 0:
+                lo, hi = self.starts[node], self.ends[node]
+                distances = ((self.points[lo:hi] - point) ** 2).sum(axis=1)
+                if alive is not None:
+                    distances[~alive[lo:hi]] = math.inf
+                best = np.concatenate([best, distances])
+                best_rows = np.concatenate([best_rows, np.arange(lo, hi)])
+                if len(best) > k:
+                    keep = np.argpartition(best, k - 1)[:k]
+                    best, best_rows = best[keep], best_rows[keep]
+                if len(best) == k:
+                    worst = best.max()
+                continue
+            for child in (left, self.rights[node]):
+                gap = np.maximum(self.lows[child] - point, 0) + np.maximum(
+                    point - self.highs[child], 0
+                )
+                child_bound = float(gap @ gap)
+                if child_bound < worst:
+                    heapq.heappush(heap, (child_bound, child))
+        found = np.isfinite(best)
+        best, best_rows = best[found], best_rows[found]
+        ranked = np.argsort(best, kind="stable")
+        return best_rows[ranked], best[ranked]
+
+
+class SimilarityIndex:
+    def __init__(self, ids, vectors, scaler):
+        self.scaler = scaler
+        self.tree = KDTree(vectors)
+        self.ids = np.asarray(ids, dtype=np.int64)[self.tree.order]
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        # id -> tree row, by binary search rather than a million-entry dict
+        self.by_id = np.argsort(self.ids, kind="stable")
+        self.sorted_ids = self.ids[self.by_id]
+        # new vectors of trails added or changed since the tree was built
+        self.delta = {}
+        self.delta_ids = np.empty(0, dtype=np.int64)
+        self.delta_vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self.catalog_version = None
+        self.watermark = None
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_database(cls):
+        version = get_catalog_version().version
+        ids, features, watermark = [], [], None
+        rows = (
+            Trail.objects.filter(removed_at__isnull=True)
+            .order_by()
+            .values_list(*FEATURE_COLUMNS, "updated_at")
+        )
+        chunk = []
+        for row in rows.iterator(chunk_size=BUILD_CHUNK_SIZE):
+            chunk.append(row)
+            if len(chunk) == BUILD_CHUNK_SIZE:
+                watermark = _take_chunk(chunk, ids, features, watermark)
+                chunk = []
+        watermark = _take_chunk(chunk, ids, features, watermark)
+        features = np.concatenate(features) if features else np.empty((0, 7))
+        scaler = Scaler.fit(features)
+        index = cls(ids, scaler.transform(features), scaler)
+        index.catalog_version = version
+        index.watermark = watermark
+        return index
+
+    def __len__(self):
+        return int(self.alive.sum()) + len(self.delta)
+
+    def row_of(self, trail_id):
+        position = np.searchsorted(self.sorted_ids, trail_id)
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == trail_id:
+            return int(self.by_id[position])
+        return None
+
+    def vector(self, trail_id):
+        """The trail's vector, or None for a trail the index does not hold."""
+        if trail_id in self.delta:
+            return self.delta[trail_id]
+        row = self.row_of(trail_id)
+        if row is None or not self.alive[row]:
+            return None
+        return self.tree.points[row]
+
+    def vector_for(self, trail):
+        """The vector of a Trail instance, held by the index or not."""
+        vector = self.vector(trail.id)
+        if vector is None:
+            row = [getattr(trail, column) for column in FEATURE_COLUMNS[1:]]
+            vector = self.scaler.transform(raw_features([row]))[0]
+        return vector
+
+    def nearest(self, vector, k, exclude=()):
+        """[(trail id, distance)] of the ``k`` trails closest to ``vector``."""
+        exclude = set(exclude)
+        rows, distances = self.tree.query(vector, k + len(exclude), self.alive)
+        candidates = list(zip(self.ids[rows].tolist(), distances.tolist()))
+        if len(self.delta_ids):
+            delta = ((self.delta_vectors - vector) ** 2).sum(axis=1)
+            closest = np.argsort(delta)[: k + len(exclude)]
+            candidates += zip(self.delta_ids[closest].tolist(), delta[closest].tolist())
+        candidates.sort(key=lambda candidate: candidate[1])
+        return [
+            (trail_id, math.sqrt(distance))
+            for trail_id, distance in candidates
+            if trail_id not in exclude
+        ][:k]
+
+    def updated(self, version):
+        """A copy that has caught up with trails changed since the watermark.
+
+        Readers keep using this index meanwhile, so nothing here mutates it.
+        """
+        changes = Trail.objects.order_by().values_list(
+            *FEATURE_COLUMNS, "removed_at", "updated_at"
+        )
+        if self.watermark is not None:
+            changes = changes.filter(updated_at__gte=self.watermark - WATERMARK_OVERLAP)
+        changes = list(changes)
+
+        index = object.__new__(type(self))
+        index.__dict__.update(self.__dict__)
+        index.alive = self.alive.copy()
+        index.delta = dict(self.delta)
+        live = [row for row in changes if row[-2] is None]
+        vectors = dict(
+            zip(
+                (row[0] for row in live),
+                self.scaler.transform(raw_features([row[1:-2] for row in live])),
+            )
+        )
+        for row in changes:
+            trail_id = row[0]
+            vector = vectors.get(trail_id)
+            tree_row = self.row_of(trail_id)
+            if tree_row is not None and self.alive[tree_row]:
+                if vector is not None and np.array_equal(
+                    self.tree.points[tree_row], vector
+                ):
+                    # re-read within the overlap, but unchanged
+                    continue
+                index.alive[tree_row] = False
+            if vector is None:
+                index.delta.pop(trail_id, None)
+            else:
+                index.delta[trail_id] = vector
+        index.delta_ids = np.fromiter(
+            index.delta, dtype=np.int64, count=len(index.delta)
+        )
+        index.delta_vectors = (
+            np.stack(list(index.delta.values()))
+            if index.delta
+            else np.empty((0, self.tree.points.shape[1]), dtype=np.float32)
+        )
+        index.catalog_version = version
+        if changes:
+            latest = max(row[-1] for row in changes)
+            index.watermark = max(latest, self.watermark or latest)
+
+        if len(index.delta) > max(COMPACT_MIN_DELTA, COMPACT_FRACTION * len(self.ids)):
+            index = index.compacted()
+        return index
+
+    def compacted(self):
+        """A new tree over the live tree rows and the delta, from memory."""
+        ids = np.concatenate([self.ids[self.alive], self.delta_ids])
+        vectors = np.concatenate([self.tree.points[self.alive], self.delta_vectors])
+        index = type(self)(ids, vectors, self.scaler)
+        index.catalog_version = self.catalog_version
+        index.watermark = self.watermark
+        return index
+
+
+def _take_chunk(chunk, ids, features, watermark):
+    if not chunk:
+        return watermark
+    ids.extend(row[0] for row in chunk)
+    features.append(raw_features([row[1:-1] for row in chunk]))
+    latest = max(row[-1] for row in chunk)
+    return latest if watermark is None else max(watermark, latest)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """The process-wide index, caught up with the catalog (one query when current)."""
+    global _index
+    version = get_catalog_version().version
+    index = _index
+    if index is None or index.catalog_version != version:
+        with _index_lock:
+            if _index is None:
+                _index = SimilarityIndex.from_database()
+            elif _index.catalog_version != version:
+                _index = _index.updated(version)
+            index = _index
+    return index
+
+
+def invalidate_similarity_index(**kwargs):
+    global _index
+    _index = None
+
+
+def taste_vector(index, user, limit=PERSONAL_HISTORY):
+    """Mean vector of the trails in the hiker's latest sessions, and their ids."""
+    trail_ids = list(
+        NavigationSession.objects.filter(user=user)
+        .order_by("-started_at")
+        .values_list("trail_id", flat=True)[:limit]
+    )
+    vectors = [index.vector(trail_id) for trail_id in trail_ids]
+    vectors = [vector for vector in vectors if vector is not None]
+    if not vectors:
+        return None, set(trail_ids)
+    return np.mean(vectors, axis=0), set(trail_ids)
+
+
+def similar_trails(trail, k, user=None):
+    """[(trail id, distance)] of the trails most like ``trail``.
+
+    For a ``user`` with navigation history the query leans PERSONAL_WEIGHT
+    towards the trails they have been on, and leaves those out.
+    """
+    index = get_similarity_index()
+    vector = index.vector_for(trail)
+    exclude = {trail.id}
+    if user is not None:
+        taste, navigated = taste_vector(index, user)
+        if taste is not None:
+            vector = (1 - PERSONAL_WEIGHT) * vector + PERSONAL_WEIGHT * taste
+            exclude |= navigated
+    return index.nearest(vector.astype(np.float32), k, exclude)
@@ -0,0 +1,97 @@
+"""Running per-session statistics, advanced in O(1) for every GPS fix.
+
+NavigationSession carries the aggregates plus the last accepted fix, so
+UpdateGPSView and batch ingest only ever look at the new point and the stored
+state - never at the GPSLog history. recompute_session_stats() replays the
+same step function over a full track for backfills and consistency checks, and
+for the rare fix older than the last one folded in (see is_late).
+"""
+
+from .geo import haversine_km
+from .tracks import session_points
+
+# below this a hiker is standing around (GPS drift alone is ~0.1-0.2 m/s)
+MOVING_SPEED_MPS = 0.3
+# faster than this between two fixes is a GPS jump, not walking
+MAX_PLAUSIBLE_SPEED_MPS = 10.0
+# weight of the newest segment in the smoothed current speed
+SPEED_SMOOTHING = 0.3
+
+STATS_FIELDS = [
+    "point_count",
+    "distance_m",
+    "moving_seconds",
+    "stopped_seconds",
+    "max_speed_mps",
+    "current_speed_mps",
+    "last_latitude",
+    "last_longitude",
+    "last_fix_at",
+]
+
+
+def reset_stats(session):
+    session.point_count = 0
+    session.distance_m = 0.0
+    session.moving_seconds = 0.0
+    session.stopped_seconds = 0.0
+    session.max_speed_mps = 0.0
+    session.current_speed_mps = 0.0
+    session.last_latitude = session.last_longitude = session.last_fix_at = None
+
+
+def is_late(session, timestamp):
+    """Whether a fix predates the last one folded in.
+
+    apply_fix cannot place such a fix; store it and replay the track with
+    recompute_session_stats() instead.
+    """
+    return session.last_fix_at is not None and timestamp < session.last_fix_at
+
+
+def apply_fix(session, latitude, longitude, timestamp):
+    """Fold one fix into the session's running aggregates (does not save)."""
+    session.point_count += 1
+    if session.last_fix_at is None:
+        session.last_latitude, session.last_longitude = latitude, longitude
+        session.last_fix_at = timestamp
+        return
+
+    elapsed = (timestamp - session.last_fix_at).total_seconds()
+    if elapsed <= 0:
+        # duplicate-time fix: counted, not measured, as in a replay
+        return
+    step = haversine_km(
+        session.last_latitude, session.last_longitude, latitude, longitude
+    )
+    speed = step * 1000 / elapsed
+    if speed > MAX_PLAUSIBLE_SPEED_MPS:
+        # keep the previous fix as the anchor and wait for the signal to settle
+        return
+
+    session.distance_m += step * 1000
+    if speed >= MOVING_SPEED_MPS:
+        session.moving_seconds += elapsed
+    else:
+        session.stopped_seconds += elapsed
+    session.max_speed_mps = max(session.max_speed_mps, speed)
+    session.current_speed_mps = (
+        SPEED_SMOOTHING * speed + (1 - SPEED_SMOOTHING) * session.current_speed_mps
+    )
+    session.last_latitude, session.last_longitude = latitude, longitude
+    session.last_fix_at = timestamp
+
+
+def finalize_stats(session):
+    """Called when a session stops; the hiker is no longer moving."""
+    session.current_speed_mps = 0.0
+
+
+def recompute_session_stats(session):
+    """Rebuild the aggregates from the full track (packed and raw). Does not save."""
+    reset_stats(session)
+    for latitude, longitude, timestamp in session_points(session):
+        apply_fix(session, latitude, longitude, timestamp)
+    if not session.is_active:
+        finalize_stats(session)
+    return session
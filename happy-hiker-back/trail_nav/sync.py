@@ -0,0 +1,246 @@
+"""Change-detecting sync of upstream NPS records into Trail / TrailImage.
+
+Every imported record has a TrailSource row holding its upstream id and a hash
+of the fields we derive from it. A re-run only reads those rows: unchanged
+records cost no writes, changed ones are updated in place (images by diff),
+and records that vanished from a fully fetched listing soft-delete their trail
+unless another endpoint still lists it. A record without sync state takes over
+an existing trail of the same name close by: one imported before sync state
+existed, or the same trail listed by another endpoint.
+"""
+
+import hashlib
+import json
+from collections import defaultdict
+
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.utils import timezone
+
+from .geo import haversine_km
+from .models import Trail, TrailImage, TrailSource
+
+TRAIL_FIELDS = ["lat", "long", "distance", "elevation"]
+# a new record takes over an existing trail of the same name this close by
+ADOPT_DISTANCE_KM = 0.1
+
+
+def content_hash(record):
+    content = {field: record[field] for field in ["name", *TRAIL_FIELDS]}
+    content["images"] = record["images"]
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class SyncResult:
+    def __init__(self):
+        self.created = self.updated = self.unchanged = self.removed = 0
+        self.images_created = self.images_deleted = 0
+
+    def __str__(self):
+        return (
+            f"{self.created} created, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {self.removed} removed; images "
+            f"+{self.images_created} -{self.images_deleted}"
+        )
+
+
+def _apply_fields(trail, record):
+    trail.name = record["name"]
+    for field in TRAIL_FIELDS:
+        setattr(trail, field, record[field])
+    # bulk writes skip Trail.save(), so keep location in step here
+    trail.location = Point(record["long"], record["lat"], srid=4326)
+    trail.removed_at = None
+    # nor is auto_now applied by bulk_update
+    trail.updated_at = timezone.now()
+
+
+def _new_trail(record):
+    trail = Trail(difficulty="Moderate", is_dog_friendly=False, is_hiking_trail=True)
+    _apply_fields(trail, record)
+    return trail
+
+
+def _adoption_candidates(records):
+    """Existing trails named like the records, as (trail, sources it came
+    from) pairs by name."""
+    trails = list(Trail.objects.filter(name__in={r["name"] for r in records}))
+    sources = defaultdict(set)
+    for trail_id, source in TrailSource.objects.filter(
+        trail_id__in=[trail.id for trail in trails]
+    ).values_list("trail_id", "source"):
+        sources[trail_id].add(source)
+    candidates = defaultdict(list)
+    for trail in trails:
+        candidates[trail.name].append((trail, sources[trail.id]))
+    return candidates
+
+
+def _adopt(candidates, record):
+    """The nearest candidate within ADOPT_DISTANCE_KM of the record, if any.
+
+    Trails another record of the same endpoint already owns are different
+    upstream items, so they are never taken over.
+    """
+    best, best_km = None, ADOPT_DISTANCE_KM
+    for candidate in candidates:
+        trail, sources = candidate
+        if record["source"] in sources:
+            continue
+        km = haversine_km(trail.lat, trail.long, record["lat"], record["long"])
+        if km <= best_km:
+            best, best_km = candidate, km
+    if best is None:
+        return None
+    candidates.remove(best)
+    return best[0]
+
+
+def _sync_images(trails_by_id, records_by_trail, result):
+    """Diff each trail's images against the record by URL."""
+    existing = defaultdict(dict)
+    for image in TrailImage.objects.filter(trail_id__in=list(trails_by_id)):
+        existing[image.trail_id][image.image] = image
+
+    to_create, to_update, to_delete = [], [], []
+    for trail_id, record in records_by_trail.items():
+        current = existing.get(trail_id, {})
+        wanted = {img["image"]: img["caption"] for img in record["images"]}
+        for url, image in current.items():
+            if url not in wanted:
+                to_delete.append(image.id)
+            elif image.caption != wanted[url]:
+                image.caption = wanted[url]
+                to_update.append(image)
+        for url, caption in wanted.items():
+            if url not in current:
+                to_create.append(
+                    TrailImage(trail_id=trail_id, image=url, caption=caption)
+                )
+
+    if to_delete:
+        TrailImage.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        TrailImage.objects.bulk_update(to_update, ["caption"])
+    if to_create:
+        TrailImage.objects.bulk_create(to_create)
+    result.images_created += len(to_create)
+    result.images_deleted += len(to_delete)
+
+
+def sync_batch(records, result):
+    """Create, update or skip one batch of parsed records (see parse_item)."""
+    states = {
+        (state.source, state.source_id): state
+        for state in TrailSource.objects.filter(
+            source__in={r["source"] for r in records},
+            source_id__in=[r["source_id"] for r in records],
+        ).select_related("trail")
+    }
+
+    changed, new = [], []
+    for record in records:
+        record["hash"] = content_hash(record)
+        state = states.get((record["source"], record["source_id"]))
+        if state is None:
+            new.append(record)
+        elif state.content_hash != record["hash"] or state.trail.removed_at:
+            changed.append((state, record))
+        else:
+            result.unchanged += 1
+
+    if not changed and not new:
+        return
+
+    with transaction.atomic():
+        # trails imported before sync state existed, or the same trail listed by
+        # another endpoint, are adopted by name and location
+        candidates = _adoption_candidates(new)
+        adopted, created = [], []
+        for record in new:
+            trail = _adopt(candidates[record["name"]], record)
+            if trail is not None:
+                adopted.append((trail, record))
+            else:
+                trail = _new_trail(record)
+                created.append((trail, record))
+                # another endpoint's record later in this batch may join it
+                candidates[record["name"]].append((trail, {record["source"]}))
+        Trail.objects.bulk_create([trail for trail, _ in created])
+
+        updated = [(state.trail, record) for state, record in changed] + adopted
+        for trail, record in updated:
+            _apply_fields(trail, record)
+        if updated:
+            Trail.objects.bulk_update(
+                [trail for trail, _ in updated],
+                ["name", *TRAIL_FIELDS, "location", "removed_at", "updated_at"],
+            )
+
+        for state, record in changed:
+            state.content_hash = record["hash"]
+        if changed:
+            TrailSource.objects.bulk_update(
+                [state for state, _ in changed], ["content_hash"]
+            )
+        TrailSource.objects.bulk_create(
+            [
+                TrailSource(
+                    source=record["source"],
+                    source_id=record["source_id"],
+                    park_code=record["park_code"],
+                    trail=trail,
+                    content_hash=record["hash"],
+                )
+                for trail, record in created + adopted
+            ]
+        )
+
+        touched = created + updated
+        _sync_images(
+            {trail.id: trail for trail, _ in touched},
+            {trail.id: record for trail, record in touched},
+            result,
+        )
+
+    result.created += len(created)
+    result.updated += len(updated)
+
+
+def remove_vanished(complete_listings, seen, result):
+    """Soft-delete trails whose record is gone from a fully fetched listing."""
+    vanished = {}
+    for source, park_code in complete_listings:
+        for source_id, trail_id in TrailSource.objects.filter(
+            source=source, park_code=park_code, trail__removed_at__isnull=True
+        ).values_list("source_id", "trail_id"):
+            if (source, source_id) not in seen:
+                vanished[(source, source_id)] = trail_id
+    if not vanished:
+        return
+    # a trail several endpoints list stays while any of its other sources does
+    kept = {
+        trail_id
+        for source, source_id, trail_id in TrailSource.objects.filter(
+            trail_id__in=set(vanished.values())
+        ).values_list("source", "source_id", "trail_id")
+        if (source, source_id) not in vanished
+    }
+    removed = set(vanished.values()) - kept
+    if removed:
+        now = timezone.now()
+        Trail.objects.filter(id__in=removed).update(removed_at=now, updated_at=now)
+    result.removed += len(removed)
+
+
+def sync_records(records, complete_listings, seen=None, batch_size=500):
+    """Sync parsed records; ``seen`` is every (source, source_id) upstream
+    returned, including records dropped as duplicates."""
+    result = SyncResult()
+    for i in range(0, len(records), batch_size):
+        sync_batch(records[i : i + batch_size], result)
+    if seen is None:
+        seen = {(record["source"], record["source_id"]) for record in records}
+    remove_vanished(complete_listings, seen, result)
+    return result
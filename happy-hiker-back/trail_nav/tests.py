@@ -1,3 +1,1772 @@
-from django.test import TestCase
+import json
+import math
+import random
+import tempfile
+from io import StringIO
+from unittest import mock
+from pathlib import Path
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.gis.gdal import GDALRaster
+from django.contrib.gis.geos import LineString
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from happy_hiker.profiling import REGISTRY
+from user_profile.identity import forget_identity, register_hiker
+from user_profile.models import Favorite, User as ProfileUser
+
+from .catalog import bump_catalog_version
+from .deviation import TrailLine, invalidate_trail_line
+from .elevation import DEMStore
+from .management.commands.bench_endpoints import (
+    ENDPOINTS,
+    QUERY_BUDGETS,
+    count_queries,
+    request,
+    seed,
+)
+from .management.commands.bench_import_trails import write_fixtures
+from .management.commands.bench_trail_catalog import BENCH_CACHES
+from .models import (
+    GPSLog,
+    NavigationSession,
+    Prompt,
+    PromptTrigger,
+    SessionTrack,
+    Trail,
+    TrailImage,
+    TrailSegment,
+    TrailTrend,
+)
+from . import consumers, similar, views
+from .prompts import PromptIndex, PromptZone, invalidate_prompt_index
+from .routing import TrailGraph
+from .tiles import tile_for_point
+from .websocket_urls import websocket_urlpatterns
+from .serializers import NavigationSessionSerializer
+from .similar import KDTree, invalidate_similarity_index
+from .stats import recompute_session_stats
+from .sync import sync_records
+from .tracks import compact_session, decode_track, encode_track
+from .trending import (
+    FINISH_WEIGHT,
+    START_WEIGHT,
+    TAU_SECONDS,
+    rebuild_trending,
+    record_finish,
+    record_start,
+    region_for,
+    score_at,
+)
+
+
+class TrailSpatialQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Yosemite Valley, a few km apart, plus one trail far away in Utah
+        cls.valley = Trail.objects.create(
+            name="Valley Loop", lat=37.7456, long=-119.5936
+        )
+        cls.falls = Trail.objects.create(
+            name="Lower Falls", lat=37.7566, long=-119.5969
+        )
+        cls.glacier = Trail.objects.create(
+            name="Glacier Point", lat=37.7309, long=-119.5735
+        )
+        cls.zion = Trail.objects.create(
+            name="Angels Landing", lat=37.2692, long=-112.9473
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_location_is_synced_from_lat_long(self):
+        self.assertAlmostEqual(self.valley.location.y, 37.7456)
+        self.assertAlmostEqual(self.valley.location.x, -119.5936)
+
+    def test_near_filters_by_radius_and_sorts_by_distance(self):
+        response = self.client.get(
+            "/api/trails/", {"near": "37.7460,-119.5940", "radius": 5}
+        )
+        self.assertEqual(response.status_code, 200)
+        names = [trail["name"] for trail in response.json()["results"]]
+        self.assertEqual(names, ["Valley Loop", "Lower Falls", "Glacier Point"])
+        self.assertIsNotNone(response.json()["results"][0]["distance_km"])
+
+    def test_bbox_filters_to_box(self):
+        response = self.client.get("/api/trails/", {"bbox": "-113.5,37,-112.5,37.5"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [trail["name"] for trail in response.json()["results"]], ["Angels Landing"]
+        )
+
+    def test_invalid_near_is_rejected(self):
+        response = self.client.get("/api/trails/", {"near": "not-a-point"})
+        self.assertEqual(response.status_code, 400)
+
+
+class TrailListPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def make_trails(self, count, images_per_trail=3):
+        start = Trail.objects.count()
+        for i in range(start, start + count):
+            trail = Trail.objects.create(name=f"Trail {i}", lat=37.0, long=-119.0)
+            TrailImage.objects.bulk_create(
+                TrailImage(trail=trail, image=f"https://example.com/{i}/{n}.jpg")
+                for n in range(images_per_trail)
+            )
+
+    def test_query_count_is_constant_as_trails_grow(self):
+        # catalog version, the page of trails, and all of their images
+        self.make_trails(5)
+        with self.assertNumQueries(3):
+            self.client.get("/api/trails/")
+        self.make_trails(45)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/trails/")
+        self.assertEqual(len(response.json()["results"]), 50)
+        self.assertEqual(len(response.json()["results"][0]["images"]), 3)
+
+    def test_sparse_fieldset_skips_images_query(self):
+        self.make_trails(10)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/trails/", {"fields": "id,name"})
+        self.assertEqual(set(response.json()["results"][0]), {"id", "name"})
+
+    def test_cursor_pages_cover_every_trail_once(self):
+        self.make_trails(25, images_per_trail=0)
+        seen = []
+        url, params = "/api/trails/", {"page_size": 10, "fields": "id"}
+        while url:
+            body = self.client.get(url, params).json()
+            seen += [trail["id"] for trail in body["results"]]
+            url, params = body["next"], None
+        self.assertEqual(seen, sorted(Trail.objects.values_list("id", flat=True)))
+
+    def test_filters_are_applied_before_paging(self):
+        for i in range(6):
+            Trail.objects.create(
+                name=f"Trail {i}",
+                lat=37.0,
+                long=-119.0,
+                is_dog_friendly=i % 2 == 0,
+                difficulty="Hard" if i < 3 else "Moderate",
+            )
+        body = self.client.get(
+            "/api/trails/", {"dog_friendly": 1, "difficulty": "moderate"}
+        ).json()
+        self.assertEqual([trail["name"] for trail in body["results"]], ["Trail 4"])
+
+
+class TrailSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in [
+            "Mist Trail",
+            "Mirror Lake Loop",
+            "Half Dome",
+            "Upper Yosemite Falls",
+        ]:
+            Trail.objects.create(name=name, lat=37.7, long=-119.5)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_prefix_typeahead(self):
+        response = self.client.get("/api/trails/search/", {"q": "Mi"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [trail["name"] for trail in response.json()],
+            ["Mirror Lake Loop", "Mist Trail"],
+        )
+
+    def test_fuzzy_match_tolerates_typos(self):
+        response = self.client.get("/api/trails/search/", {"q": "Yosmite Falls"})
+        self.assertEqual(response.json()[0]["name"], "Upper Yosemite Falls")
+
+    def test_only_the_first_candidates_are_ranked(self):
+        with mock.patch.object(views, "SEARCH_MAX_CANDIDATES", 1):
+            response = self.client.get("/api/trails/search/", {"q": "Mi"})
+        self.assertEqual(len(response.json()), 1)
+
+    def test_limit_and_missing_query(self):
+        response = self.client.get("/api/trails/search/", {"q": "M", "limit": 1})
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(self.client.get("/api/trails/search/").status_code, 400)
+
+
+class BatchGPSIngestTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="hiker")
+        self.trail = Trail.objects.create(name="Mist Trail", lat=37.7, long=-119.5)
+        self.session = NavigationSession.objects.create(
+            trail=self.trail, user=self.user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def points(self, seqs):
+        return [
+            {
+                "latitude": 37.7 + seq * 1e-4,
+                "longitude": -119.5,
+                "timestamp": f"2026-06-01T10:00:{seq:02d}Z",
+                "seq": seq,
+            }
+            for seq in seqs
+        ]
+
+    def post(self, points):
+        return self.client.post("/api/nav/update/", {"points": points}, format="json")
+
+    def test_batch_is_written_with_client_timestamps(self):
+        response = self.post(self.points(range(5)))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["accepted"], 5)
+        logs = GPSLog.objects.filter(session=self.session).order_by("client_seq")
+        self.assertEqual(logs.count(), 5)
+        self.assertEqual(logs[4].timestamp.second, 4)
+
+    def test_retried_batch_is_deduplicated(self):
+        self.post(self.points(range(5)))
+        response = self.post(self.points(range(3, 8)))
+        self.assertEqual(response.json()["accepted"], 3)
+        self.assertEqual(response.json()["duplicates"], 2)
+        self.assertEqual(GPSLog.objects.filter(session=self.session).count(), 8)
+
+    def test_single_point_still_supported(self):
+        response = self.client.post(
+            "/api/nav/update/", {"latitude": 37.7, "longitude": -119.5}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(GPSLog.objects.count(), 1)
+
+    def test_invalid_points_are_rejected(self):
+        response = self.post([{"latitude": 123, "longitude": 0}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(GPSLog.objects.count(), 0)
+
+    def test_seq_beyond_the_column_range_is_rejected(self):
+        response = self.post([{"latitude": 37.7, "longitude": -119.5, "seq": 2**31}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(GPSLog.objects.count(), 0)
+
+    def test_oversized_batch_is_rejected_before_validation(self):
+        points = self.points(range(3)) * (views.MAX_GPS_BATCH // 3 + 1)
+        with mock.patch.object(
+            views.GPSPointSerializer, "run_validation"
+        ) as run_validation:
+            response = self.post(points)
+        self.assertEqual(response.status_code, 400)
+        run_validation.assert_not_called()
+
+
+class TrackCompactionTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create(username="hiker")
+        trail = Trail.objects.create(name="Mist Trail", lat=37.7, long=-119.5)
+        self.start = datetime(2026, 6, 1, 10, tzinfo=dt_timezone.utc)
+        self.session = NavigationSession.objects.create(
+            trail=trail,
+            user=user,
+            is_active=False,
+            status="stopped",
+            ended_at=self.start - timedelta(hours=1),
+        )
+        GPSLog.objects.bulk_create(
+            GPSLog(
+                session=self.session,
+                latitude=37.7 + i * 1e-5,
+                longitude=-119.5 - i * 1e-5,
+                timestamp=self.start + timedelta(seconds=i),
+            )
+            for i in range(100)
+        )
+
+    def test_codec_round_trip(self):
+        points = [
+            (37.123456, -119.654321, self.start),
+            (-33.9, 151.2, self.start + timedelta(milliseconds=1500)),
+        ]
+        self.assertEqual(decode_track(encode_track(points)), points)
+
+    def test_compaction_replaces_rows_and_reads_back_transparently(self):
+        before = NavigationSessionSerializer(self.session).data["gps_logs"]
+        call_command("compact_tracks", older_than=0, stdout=StringIO())
+
+        self.assertEqual(GPSLog.objects.filter(session=self.session).count(), 0)
+        self.assertEqual(
+            SessionTrack.objects.get(session=self.session).point_count, 100
+        )
+
+        session = NavigationSession.objects.get(id=self.session.id)
+        after = NavigationSessionSerializer(session).data["gps_logs"]
+        self.assertEqual(len(after), 100)
+        for old, new in zip(before, after):
+            self.assertAlmostEqual(old["latitude"], new["latitude"], places=6)
+            self.assertAlmostEqual(old["longitude"], new["longitude"], places=6)
+
+    def test_serializing_sessions_does_not_query_per_track(self):
+        for _ in range(3):
+            NavigationSession.objects.create(
+                trail=self.session.trail, user=self.session.user, is_active=False
+            )
+        sessions = NavigationSession.objects.select_related("track").prefetch_related(
+            "gps_logs"
+        )
+        # the sessions with their tracks joined, then all of their logs
+        with self.assertNumQueries(2):
+            data = NavigationSessionSerializer(sessions, many=True).data
+        self.assertEqual(sorted(len(s["gps_logs"]) for s in data), [0, 0, 0, 100])
+
+    def test_active_sessions_are_not_compacted(self):
+        NavigationSession.objects.filter(id=self.session.id).update(is_active=True)
+        call_command("compact_tracks", older_than=0, stdout=StringIO())
+        self.assertEqual(GPSLog.objects.filter(session=self.session).count(), 100)
+
+
+class NavigationHistoryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="hiker")
+        self.trail = Trail.objects.create(name="Mist Trail", lat=37.7, long=-119.5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = datetime(2026, 6, 1, 10, tzinfo=dt_timezone.utc)
+
+    def make_session(self, points=600):
+        session = NavigationSession.objects.create(
+            trail=self.trail, user=self.user, is_active=False, status="stopped"
+        )
+        GPSLog.objects.bulk_create(
+            GPSLog(
+                session=session,
+                latitude=37.7 + i * 1e-5,
+                longitude=-119.5,
+                timestamp=self.start + timedelta(seconds=i),
+            )
+            for i in range(points)
+        )
+        recompute_session_stats(session)
+        session.save()
+        return session
+
+    def test_history_returns_summaries_without_tracks(self):
+        self.make_session()
+        body = self.client.get("/api/nav/history/").json()
+        summary = body["results"][0]
+        self.assertNotIn("gps_logs", summary)
+        self.assertEqual(summary["trail_name"], "Mist Trail")
+        self.assertEqual(summary["point_count"], 600)
+        # 599 steps of 1e-5 degrees latitude is about 666 m
+        self.assertAlmostEqual(summary["distance_km"], 0.666, places=2)
+
+    def test_history_query_count_does_not_grow_with_sessions(self):
+        self.make_session()
+        with self.assertNumQueries(1):
+            self.client.get("/api/nav/history/")
+        for _ in range(5):
+            self.make_session(points=50)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/nav/history/")
+        self.assertEqual(len(response.json()["results"]), 6)
+
+    def test_compacted_sessions_are_summarized_from_the_track(self):
+        session = self.make_session()
+        compact_session(session)
+        summary = self.client.get("/api/nav/history/").json()["results"][0]
+        self.assertEqual(summary["point_count"], 600)
+        self.assertAlmostEqual(summary["distance_km"], 0.666, places=2)
+
+    def test_track_is_downsampled_to_budget(self):
+        session = self.make_session()
+        body = self.client.get(
+            f"/api/nav/sessions/{session.id}/track/", {"max_points": 50}
+        ).json()
+        self.assertEqual(body["point_count"], 600)
+        self.assertLessEqual(body["returned"], 50)
+        # a straight line collapses to its endpoints at any tolerance
+        body = self.client.get(
+            f"/api/nav/sessions/{session.id}/track/", {"tolerance": 1}
+        ).json()
+        self.assertEqual(body["returned"], 2)
+
+    def test_other_users_tracks_are_hidden(self):
+        session = self.make_session()
+        other = get_user_model().objects.create(username="someone-else")
+        self.client.force_authenticate(other)
+        response = self.client.get(f"/api/nav/sessions/{session.id}/track/")
+        self.assertEqual(response.status_code, 404)
+
+
+class SessionStatsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="hiker")
+        self.trail = Trail.objects.create(name="Mist Trail", lat=37.7, long=-119.5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.post("/api/nav/start/", {"trail": self.trail.id}, format="json")
+        self.session = NavigationSession.objects.get(user=self.user, is_active=True)
+
+    def track(self):
+        # walk, stand still, walk again, with one GPS jump thrown in
+        start = datetime(2026, 6, 1, 10, tzinfo=dt_timezone.utc)
+        lat, points = 37.7, []
+        for i in range(300):
+            if i < 100 or i >= 200:
+                lat += 1.2e-5  # ~1.3 m/s
+            point = {"latitude": lat, "longitude": -119.5, "seq": i}
+            if i == 150:
+                point["latitude"] = lat + 0.01
+            point["timestamp"] = (start + timedelta(seconds=i)).isoformat()
+            points.append(point)
+        return points
+
+    def test_incremental_stats_match_full_recompute(self):
+        points = self.track()
+        # mixed single and batched uploads, one batch out of order
+        for point in points[:10]:
+            self.client.post("/api/nav/update/", point, format="json")
+        self.client.post(
+            "/api/nav/update/", {"points": points[10:150][::-1]}, format="json"
+        )
+        self.client.post("/api/nav/update/", {"points": points[150:]}, format="json")
+        self.client.post("/api/nav/stop/")
+
+        incremental = self.assertStatsMatchRecompute()
+        self.assertEqual(incremental.point_count, 300)
+        self.assertAlmostEqual(incremental.moving_seconds, 199, delta=2)
+        self.assertAlmostEqual(incremental.stopped_seconds, 99, delta=2)
+        self.assertLess(incremental.max_speed_mps, 2)
+
+    def test_late_fixes_match_full_recompute(self):
+        points = self.track()
+        self.client.post("/api/nav/update/", {"points": points[100:]}, format="json")
+        # an offline buffer from before the fixes already stored, then one
+        # straggler on its own
+        self.client.post("/api/nav/update/", {"points": points[1:100]}, format="json")
+        self.client.post("/api/nav/update/", points[0], format="json")
+
+        incremental = self.assertStatsMatchRecompute()
+        self.assertEqual(incremental.point_count, 300)
+        self.assertEqual(incremental.last_fix_at.isoformat(), points[-1]["timestamp"])
+
+    def assertStatsMatchRecompute(self):
+        incremental = NavigationSession.objects.get(id=self.session.id)
+        recomputed = recompute_session_stats(
+            NavigationSession.objects.get(id=self.session.id)
+        )
+        for field in ["point_count", "last_fix_at", "current_speed_mps"]:
+            self.assertEqual(getattr(incremental, field), getattr(recomputed, field))
+        for field in [
+            "distance_m",
+            "moving_seconds",
+            "stopped_seconds",
+            "max_speed_mps",
+        ]:
+            self.assertAlmostEqual(
+                getattr(incremental, field), getattr(recomputed, field), places=6
+            )
+        return incremental
+
+    def test_update_response_carries_live_stats(self):
+        points = self.track()
+        self.client.post("/api/nav/update/", points[0], format="json")
+        response = self.client.post("/api/nav/update/", points[1], format="json")
+        stats = response.json()["stats"]
+        self.assertEqual(stats["point_count"], 2)
+        self.assertGreater(stats["distance_km"], 0)
+        self.assertIsNotNone(stats["current_pace_s_per_km"])
+
+
+class ImportTrailsTests(TestCase):
+    def setUp(self):
+        self.fixtures = tempfile.TemporaryDirectory()
+        self.addCleanup(self.fixtures.cleanup)
+        # 120 items per listing over pages of 50 exercises start/total paging
+        write_fixtures(self.fixtures.name, ["YOSE", "ZION"], 120, 50, random.Random(1))
+
+    def run_import(self, *park_codes):
+        call_command(
+            "import_trails",
+            *park_codes,
+            fixtures=self.fixtures.name,
+            page_size=50,
+            batch_size=100,
+            stdout=StringIO(),
+        )
+
+    def test_imports_every_page_of_every_park(self):
+        self.run_import("YOSE", "ZION")
+        # 2 parks x 2 endpoints x 120 items, titles are unique per endpoint
+        self.assertEqual(Trail.objects.count(), 480)
+        trail = Trail.objects.get(name="YOSE thingstodo Trail 119")
+        self.assertIsNotNone(trail.location)
+        self.assertGreater(trail.distance, 0)
+
+    def test_reimport_does_not_duplicate(self):
+        self.run_import("YOSE")
+        images = TrailImage.objects.count()
+        self.run_import("YOSE")
+        self.assertEqual(Trail.objects.count(), 240)
+        self.assertEqual(TrailImage.objects.count(), images)
+
+    def edit_page(self, name, edit):
+        path = Path(self.fixtures.name) / name
+        page = json.loads(path.read_text())
+        edit(page["data"])
+        path.write_text(json.dumps(page))
+
+    def test_unchanged_rerun_does_no_writes(self):
+        self.run_import("YOSE", "ZION")
+        with CaptureQueriesContext(connection) as queries:
+            self.run_import("YOSE", "ZION")
+        writes = [
+            q["sql"]
+            for q in queries.captured_queries
+            if q["sql"].lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        self.assertEqual(writes, [])
+
+    def test_changed_record_is_updated_in_place(self):
+        self.run_import("YOSE")
+        trail = Trail.objects.get(name="YOSE thingstodo Trail 0")
+
+        def move_and_reshoot(items):
+            items[0]["latitude"] = "40.5"
+            items[0]["images"] = [
+                {"url": "https://example.com/new.jpg", "caption": "new"}
+            ]
+
+        self.edit_page("thingstodo-yose-0.json", move_and_reshoot)
+        self.run_import("YOSE")
+
+        trail.refresh_from_db()
+        self.assertEqual(trail.lat, 40.5)
+        self.assertAlmostEqual(trail.location.y, 40.5)
+        self.assertEqual(
+            list(trail.images.values_list("image", flat=True)),
+            ["https://example.com/new.jpg"],
+        )
+        self.assertEqual(Trail.objects.count(), 240)
+
+    def test_vanished_record_is_soft_deleted_and_hidden(self):
+        self.run_import("YOSE")
+        self.edit_page("thingstodo-yose-0.json", lambda items: items.pop(0))
+        self.run_import("YOSE")
+
+        trail = Trail.objects.get(name="YOSE thingstodo Trail 0")
+        self.assertIsNotNone(trail.removed_at)
+        response = APIClient().get("/api/trails/search/", {"q": trail.name})
+        self.assertNotIn(trail.id, [t["id"] for t in response.json()])
+
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create(username="late"))
+        response = client.post("/api/nav/start/", {"trail": trail.id}, format="json")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(NavigationSession.objects.exists())
+
+    def test_namesakes_in_other_parks_are_kept(self):
+        def rename(items):
+            items[0]["title"] = "YOSE thingstodo Trail 0"
+
+        self.edit_page("thingstodo-zion-0.json", rename)
+        self.run_import("YOSE", "ZION")
+        self.assertEqual(Trail.objects.count(), 480)
+        self.assertEqual(
+            set(
+                Trail.objects.filter(name="YOSE thingstodo Trail 0").values_list(
+                    "sources__park_code", flat=True
+                )
+            ),
+            {"YOSE", "ZION"},
+        )
+
+    def test_failed_listing_does_not_remove_trails(self):
+        self.run_import("YOSE")
+        (Path(self.fixtures.name) / "places-yose-0.json").unlink()
+        self.run_import("YOSE")
+        self.assertFalse(Trail.objects.filter(removed_at__isnull=False).exists())
+
+    def test_same_trail_from_another_endpoint_is_adopted(self):
+        def record(source, source_id, lat=37.7459):
+            return {
+                "source": source,
+                "source_id": source_id,
+                "park_code": "YOSE",
+                "name": "Half Dome",
+                "lat": lat,
+                "long": -119.5332,
+                "distance": 16.0,
+                "elevation": 4800,
+                "images": [],
+            }
+
+        sync_records([record("thingstodo", "hd")], [("thingstodo", "YOSE")])
+        places = [record("places", "hd"), record("places", "far", lat=37.9)]
+        sync_records(places, [("places", "YOSE")])
+
+        # the nearby record joins the existing trail, the distant namesake does not
+        trail = Trail.objects.get(name="Half Dome", lat=37.7459)
+        self.assertEqual(
+            set(trail.sources.values_list("source", flat=True)),
+            {"thingstodo", "places"},
+        )
+        self.assertEqual(Trail.objects.filter(name="Half Dome").count(), 2)
+
+        # gone from one endpoint, still listed by the other
+        sync_records(places, [("thingstodo", "YOSE"), ("places", "YOSE")])
+        trail.refresh_from_db()
+        self.assertIsNone(trail.removed_at)
+
+    def test_same_trail_from_two_endpoints_in_one_batch_is_merged(self):
+        records = [
+            {
+                "source": source,
+                "source_id": "mist",
+                "park_code": "YOSE",
+                "name": "Mist Trail",
+                "lat": 37.7269,
+                "long": -119.5448,
+                "distance": 5.4,
+                "elevation": 1000,
+                "images": [],
+            }
+            for source in ["thingstodo", "places"]
+        ]
+        sync_records(records, [("thingstodo", "YOSE"), ("places", "YOSE")])
+        trail = Trail.objects.get(name="Mist Trail")
+        self.assertEqual(
+            set(trail.sources.values_list("source", flat=True)),
+            {"thingstodo", "places"},
+        )
+
+
+class RoutingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        # a-b-c along a line, plus a long direct a-c detour and an isolated d
+        self.a, self.b, self.c, self.d = [
+            Trail.objects.create(name=name, lat=37.0, long=lng)
+            for name, lng in [
+                ("A", -119.0),
+                ("B", -118.99),
+                ("C", -118.98),
+                ("D", -110),
+            ]
+        ]
+        TrailSegment.objects.create(start=self.a, end=self.b, length_m=1000)
+        TrailSegment.objects.create(start=self.b, end=self.c, length_m=1000)
+        self.detour = TrailSegment.objects.create(
+            start=self.a, end=self.c, length_m=5000
+        )
+
+    def test_shortest_route(self):
+        response = self.client.get("/api/routes/", {"from": self.a.id, "to": self.c.id})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [t["id"] for t in body["trails"]], [self.a.id, self.b.id, self.c.id]
+        )
+        self.assertEqual(body["distance_m"], 2000)
+        self.assertEqual(len(body["coordinates"]), 3)
+
+    def test_segments_are_walkable_both_ways(self):
+        response = self.client.get("/api/routes/", {"from": self.c.id, "to": self.a.id})
+        self.assertEqual(
+            [t["id"] for t in response.json()["trails"]],
+            [self.c.id, self.b.id, self.a.id],
+        )
+
+    def test_graph_is_rebuilt_when_segments_change(self):
+        self.client.get("/api/routes/", {"from": self.a.id, "to": self.c.id})
+        self.detour.length_m = 1500
+        self.detour.save()
+        response = self.client.get("/api/routes/", {"from": self.a.id, "to": self.c.id})
+        self.assertEqual(response.json()["segments"], [self.detour.id])
+
+    def test_graph_follows_bulk_writes(self):
+        self.client.get("/api/routes/", {"from": self.a.id, "to": self.c.id})
+        # no signals, only the version bump, as after import_trails
+        TrailSegment.objects.filter(id=self.detour.id).update(length_m=1500)
+        bump_catalog_version()
+        response = self.client.get("/api/routes/", {"from": self.a.id, "to": self.c.id})
+        self.assertEqual(response.json()["segments"], [self.detour.id])
+
+    def test_stale_graph_is_rebuilt_when_a_trail_is_gone(self):
+        self.client.get("/api/routes/", {"from": self.a.id, "to": self.c.id})
+        # a removal this process has not seen the version bump for yet
+        Trail.objects.filter(id=self.b.id).update(removed_at=timezone.now())
+        response = self.client.get("/api/routes/", {"from": self.a.id, "to": self.c.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["segments"], [self.detour.id])
+
+    def test_unreachable_and_unknown_trails(self):
+        response = self.client.get("/api/routes/", {"from": self.a.id, "to": self.d.id})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get("/api/routes/", {"from": self.a.id, "to": 0})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get("/api/routes/", {"from": "a"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_astar_matches_exhaustive_search(self):
+        rng = random.Random(3)
+        nodes = [
+            (i, 37 + rng.uniform(0, 0.1), -119 + rng.uniform(0, 0.1))
+            for i in range(1, 201)
+        ]
+        edges = [
+            (i, rng.randint(1, 200), rng.randint(1, 200), rng.uniform(0, 20000), True)
+            for i in range(1, 801)
+        ]
+        graph = TrailGraph.from_edges(nodes, edges)
+        for _ in range(20):
+            start, goal = rng.randint(1, 200), rng.randint(1, 200)
+            route = graph.shortest_path(start, goal)
+            # Bellman-Ford style relaxation as the reference
+            best = {start: 0.0}
+            changed = True
+            while changed:
+                changed = False
+                for node, cost in list(best.items()):
+                    i = graph.index[node]
+                    for slot in range(graph.offsets[i], graph.offsets[i + 1]):
+                        other = graph.node_ids[graph.targets[slot]]
+                        if cost + graph.weights[slot] < best.get(other, float("inf")):
+                            best[other] = cost + graph.weights[slot]
+                            changed = True
+            if goal in best:
+                self.assertAlmostEqual(route[0], best[goal], places=6)
+            else:
+                self.assertIsNone(route)
+
+
+def write_synthetic_dem(path, west, north, size=101, pixel=0.01):
+    """A GeoTIFF rising 500 m per degree of longitude from 1000 m at its
+    first pixel centre."""
+    degrees = np.arange(size) * pixel
+    data = np.tile(1000 + 500 * degrees, (size, 1)).astype(np.float32)
+    GDALRaster(
+        {
+            "driver": "GTiff",
+            "name": str(path),
+            "srid": 4326,
+            "width": size,
+            "height": size,
+            "origin": [west, north],
+            "scale": [pixel, -pixel],
+            "datatype": 6,
+            "bands": [{"data": data, "nodata_value": -9999}],
+        }
+    )
+
+
+class ElevationProfileTests(TestCase):
+    def setUp(self):
+        self.dem = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dem.cleanup)
+        # two side by side 1 degree tiles
+        write_synthetic_dem(Path(self.dem.name) / "west.tif", -120.005, 38.005)
+        write_synthetic_dem(Path(self.dem.name) / "east.tif", -119.005, 38.005)
+        self.store = DEMStore(self.dem.name, cache_size=1)
+        patcher = mock.patch("trail_nav.views.get_dem_store", return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def post(self, data):
+        return self.client.post("/api/elevation/profile/", data, format="json")
+
+    def test_gain_and_loss_of_polyline(self):
+        response = self.post(
+            {"points": [[37.5, -119.9], [37.5, -119.5], [37.5, -119.7]], "samples": 0}
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertAlmostEqual(body["gain_m"], 200, delta=0.5)
+        self.assertAlmostEqual(body["loss_m"], 100, delta=0.5)
+        self.assertAlmostEqual(body["profile"][0]["elevation_m"], 1050, delta=0.5)
+
+    def test_resamples_across_tiles(self):
+        response = self.post(
+            {"points": [[37.5, -119.9], [37.5, -118.9]], "samples": 11}
+        )
+        body = response.json()
+        self.assertEqual(len(body["profile"]), 11)
+        elevations = [p["elevation_m"] for p in body["profile"]]
+        # the synthetic tiles each restart at 1000 m, so the seam is a drop
+        self.assertGreater(body["loss_m"], 0)
+        self.assertAlmostEqual(elevations[0], 1050, delta=0.5)
+        self.assertAlmostEqual(elevations[-1], 1050, delta=0.5)
+        # cache_size=1: only the last tile stays open, memory-mapped
+        self.assertEqual(len(self.store._tiles), 1)
+        self.assertTrue((Path(self.dem.name) / "west.npy").exists())
+        self.assertEqual(list(Path(self.dem.name).glob("*.tmp")), [])
+
+    def test_session_track_profile(self):
+        user = get_user_model().objects.create_user(username="climber")
+        trail = Trail.objects.create(name="Ridge", lat=37.5, long=-119.9)
+        session = NavigationSession.objects.create(user=user, trail=trail)
+        start = datetime(2026, 6, 1, 8, 0, tzinfo=dt_timezone.utc)
+        for i, lng in enumerate((-119.9, -119.8, -119.7)):
+            GPSLog.objects.create(
+                session=session,
+                latitude=37.5,
+                longitude=lng,
+                timestamp=start + timedelta(minutes=i),
+            )
+
+        response = self.post({"session": session.id, "samples": 0})
+        self.assertEqual(response.status_code, 401)
+        self.client.force_authenticate(user)
+        response = self.post({"session": session.id, "samples": 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.json()["gain_m"], 100, delta=0.5)
+
+    def test_tiles_added_later_are_picked_up(self):
+        store = DEMStore(self.dem.name, recheck_seconds=0)
+        self.assertTrue(np.isnan(store.sample([40.5], [-119.5])[0]))
+        write_synthetic_dem(Path(self.dem.name) / "north.tif", -120.005, 41.005)
+        self.assertAlmostEqual(store.sample([40.5], [-119.5])[0], 1250, delta=0.5)
+
+    def test_rejects_bad_input_and_missing_coverage(self):
+        self.assertEqual(self.post({"points": [[37.5]]}).status_code, 400)
+        self.assertEqual(self.post({"points": [[37.5, -119.9]]}).status_code, 400)
+        response = self.post({"points": [[10, 10], [10.1, 10.1]]})
+        self.assertEqual(response.status_code, 422)
+
+
+class TrailTileTests(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = Path(cache_dir.name)
+        override = override_settings(TILE_CACHE_DIR=cache_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+
+        self.longest = Trail.objects.create(
+            name="Longest Loop", lat=37.75, long=-119.55, distance=12
+        )
+        for i in range(5):
+            Trail.objects.create(
+                name=f"Short Spur {i}", lat=37.75 + i * 0.0001, long=-119.55, distance=1
+            )
+        TrailSegment.objects.create(
+            start=self.longest,
+            end=Trail.objects.get(name="Short Spur 1"),
+            length_m=1000,
+            path=LineString((-119.55, 37.75), (-119.54, 37.76), srid=4326),
+        )
+
+    def get_tile(self, z, lat=37.75, lng=-119.55):
+        x, y = tile_for_point(z, lat, lng)
+        return self.client.get(f"/api/tiles/trails/{z}/{x}/{y}.pbf")
+
+    def test_tile_has_trailheads_and_segments(self):
+        response = self.get_tile(14)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/vnd.mapbox-vector-tile")
+        self.assertIn(b"trailheads", response.content)
+        self.assertIn(b"segments", response.content)
+        self.assertIn(b"Short Spur 4", response.content)
+
+    def test_low_zoom_thins_trailheads_and_drops_segments(self):
+        content = self.get_tile(6).content
+        self.assertIn(b"Longest Loop", content)
+        self.assertNotIn(b"Short Spur", content)
+        self.assertNotIn(b"segments", content)
+
+    def test_empty_and_invalid_tiles(self):
+        response = self.get_tile(14, lat=0, lng=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            self.client.get("/api/tiles/trails/2/4/0.pbf").status_code, 404
+        )
+
+    def test_cached_tile_is_invalidated_when_trail_changes(self):
+        self.get_tile(12)
+        x, y = tile_for_point(12, 37.75, -119.55)
+        self.assertTrue((self.cache_dir / "12" / str(x) / f"{y}.pbf").exists())
+
+        self.longest.name = "Renamed Loop"
+        self.longest.save()
+        self.assertFalse((self.cache_dir / "12" / str(x) / f"{y}.pbf").exists())
+        self.assertIn(b"Renamed Loop", self.get_tile(12).content)
+
+
+class TrailCatalogCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trail = Trail.objects.create(name="Half Dome", lat=37.74, long=-119.53)
+
+    def test_matching_etag_gets_304_without_catalog_queries(self):
+        response = self.client.get("/api/trails/")
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/trails/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_query_parameters(self):
+        first = self.client.get("/api/trails/")["ETag"]
+        second = self.client.get("/api/trails/", {"fields": "id"})["ETag"]
+        self.assertNotEqual(first, second)
+
+    def test_warm_cache_skips_queries(self):
+        self.client.get(f"/api/trails/{self.trail.id}/")
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/trails/{self.trail.id}/")
+        self.assertEqual(response.json()["name"], "Half Dome")
+
+    def test_trail_and_image_changes_bump_the_version(self):
+        etag = self.client.get("/api/trails/")["ETag"]
+        self.trail.name = "Half Dome Cables"
+        self.trail.save()
+        response = self.client.get("/api/trails/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["name"], "Half Dome Cables")
+
+        etag = response["ETag"]
+        TrailImage.objects.create(trail=self.trail, image="https://example.com/hd.jpg")
+        response = self.client.get("/api/trails/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.json()["results"][0]["images"]), 1)
+
+    def test_bulk_updates_need_an_explicit_bump(self):
+        self.client.get("/api/trails/")
+        Trail.objects.update(name="Bulk Renamed")
+        self.assertEqual(
+            self.client.get("/api/trails/").json()["results"][0]["name"], "Half Dome"
+        )
+        bump_catalog_version()
+        self.assertEqual(
+            self.client.get("/api/trails/").json()["results"][0]["name"],
+            "Bulk Renamed",
+        )
+
+
+class TrailFavoriteTests(TestCase):
+    def setUp(self):
+        # identities are cached per process, and every test reuses the subs
+        self.addCleanup(forget_identity)
+        self.trails = [
+            Trail.objects.create(name=f"Trail {i}", lat=37.0, long=-119.0)
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_hiker("auth0|fan"))
+
+    def make_hiker(self, sub):
+        account = get_user_model().objects.create(username=sub)
+        register_hiker(sub, "Hiker", f"{sub.split('|')[1]}@example.com")
+        return account
+
+    def favorite(self, trail, client=None, method="post"):
+        client = client or self.client
+        return getattr(client, method)(f"/api/trails/{trail.id}/favorite/")
+
+    def flags(self, response):
+        return {
+            trail["id"]: (trail["is_favorite"], trail["favorite_count"])
+            for trail in response.json()["results"]
+        }
+
+    def test_favoriting_is_idempotent_and_counted(self):
+        trail = self.trails[0]
+        for _ in range(2):
+            response = self.favorite(trail)
+        self.assertEqual(
+            response.json(),
+            {"trail": trail.id, "is_favorite": True, "favorite_count": 1},
+        )
+        other = APIClient()
+        other.force_authenticate(self.make_hiker("auth0|other"))
+        self.assertEqual(self.favorite(trail, other).json()["favorite_count"], 2)
+
+        for _ in range(2):
+            response = self.favorite(trail, method="delete")
+        self.assertEqual(response.json()["favorite_count"], 1)
+        self.assertFalse(response.json()["is_favorite"])
+        self.assertEqual(Favorite.objects.count(), 1)
+
+    def test_deleting_a_hiker_uncounts_their_favorites(self):
+        self.favorite(self.trails[0])
+        ProfileUser.objects.get(auth0_id="auth0|fan").delete()
+        self.trails[0].refresh_from_db()
+        self.assertEqual(self.trails[0].favorite_count, 0)
+
+    def test_favorites_need_a_registered_hiker(self):
+        self.assertEqual(self.favorite(self.trails[0], APIClient()).status_code, 401)
+        stranger = APIClient()
+        stranger.force_authenticate(
+            get_user_model().objects.create(username="auth0|stranger")
+        )
+        self.assertEqual(self.favorite(self.trails[0], stranger).status_code, 403)
+        response = APIClient().get("/api/trails/", {"favorites": 1})
+        self.assertEqual(response.status_code, 401)
+
+    def test_page_flags_cost_one_query_whatever_the_page_size(self):
+        self.favorite(self.trails[0])
+        self.favorite(self.trails[2])
+        # catalog version, the page, its images, then the hiker's flags and
+        # live counts for the whole page
+        with self.assertNumQueries(4):
+            self.client.get("/api/trails/", {"page_size": 1})
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/trails/", {"page_size": 3})
+        self.assertEqual(
+            self.flags(response),
+            {
+                self.trails[0].id: (True, 1),
+                self.trails[1].id: (False, 0),
+                self.trails[2].id: (True, 1),
+            },
+        )
+
+    def test_cached_pages_show_current_favorites(self):
+        response = self.client.get("/api/trails/")
+        anonymous = APIClient().get("/api/trails/")
+        self.favorite(self.trails[1])
+
+        # the catalog was not bumped, but the hiker's ETag changes
+        response = self.client.get("/api/trails/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.flags(response)[self.trails[1].id], (True, 1))
+        self.assertIn("private", response["Cache-Control"])
+        again = self.client.get("/api/trails/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        # anonymous readers share the cached page
+        response = APIClient().get("/api/trails/", HTTP_IF_NONE_MATCH=anonymous["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_carries_the_flag(self):
+        self.favorite(self.trails[1])
+        data = self.client.get(f"/api/trails/{self.trails[1].id}/").json()
+        self.assertTrue(data["is_favorite"])
+        self.assertEqual(data["favorite_count"], 1)
+
+    def test_favorites_filter_is_served_by_the_database(self):
+        self.favorite(self.trails[0])
+        self.favorite(self.trails[2])
+        other = APIClient()
+        other.force_authenticate(self.make_hiker("auth0|other"))
+        self.favorite(self.trails[1], other)
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/trails/", {"favorites": 1})
+        self.assertEqual(
+            self.flags(response),
+            {self.trails[0].id: (True, 1), self.trails[2].id: (True, 1)},
+        )
+        response = self.client.get(
+            "/api/trails/", {"favorites": 1, "page_size": 1, "fields": "id"}
+        )
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertIsNotNone(response.json()["next"])
+
+
+class TrailTrendingTests(TestCase):
+    def setUp(self):
+        # rankings are cached across requests, and every test reuses the keys
+        cache = caches[settings.TRAIL_CATALOG_CACHE]
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.now = timezone.now()
+        self.user = get_user_model().objects.create(username="trender")
+        self.mist = Trail.objects.create(name="Mist Trail", lat=37.73, long=-119.55)
+        self.dome = Trail.objects.create(name="Half Dome", lat=37.75, long=-119.53)
+        self.acadia = Trail.objects.create(name="Precipice", lat=44.35, long=-68.19)
+
+    def navigate(self, trail, days_ago, distance_m=None):
+        """A session started ``days_ago``, fed to the trend as it starts and stops."""
+        started = self.now - timedelta(days=days_ago)
+        session = NavigationSession.objects.create(trail=trail, user=self.user)
+        NavigationSession.objects.filter(pk=session.pk).update(started_at=started)
+        session.started_at = started
+        record_start(session)
+        if distance_m is not None:
+            session.is_active = False
+            session.status = "stopped"
+            session.distance_m = distance_m
+            session.ended_at = started + timedelta(hours=3)
+            session.save()
+            record_finish(session)
+        return session
+
+    def brute_force(self, trail):
+        """sum(weight * exp(-age / tau)) over every event, straight from sessions."""
+        total = 0.0
+        for session in trail.sessions.all():
+            total += START_WEIGHT * math.exp(
+                -(self.now - session.started_at).total_seconds() / TAU_SECONDS
+            )
+            if not session.is_active and session.distance_m >= 200:
+                total += FINISH_WEIGHT * math.exp(
+                    -(self.now - session.ended_at).total_seconds() / TAU_SECONDS
+                )
+        return total
+
+    def scores(self):
+        return {
+            trend.trail_id: score_at(trend.score, self.now)
+            for trend in TrailTrend.objects.all()
+        }
+
+    def test_incremental_score_matches_a_brute_force_recompute(self):
+        rng = random.Random(7)
+        trails = [self.mist, self.dome, self.acadia]
+        for _ in range(60):
+            self.navigate(
+                rng.choice(trails),
+                rng.uniform(0, 120),
+                rng.choice([None, 50, 4000]),
+            )
+        incremental = self.scores()
+        self.assertEqual(set(incremental), {trail.id for trail in trails})
+        for trail in trails:
+            self.assertAlmostEqual(
+                incremental[trail.id] / self.brute_force(trail), 1.0, places=9
+            )
+
+        self.assertEqual(rebuild_trending(), 3)
+        for pk, score in self.scores().items():
+            self.assertAlmostEqual(score / incremental[pk], 1.0, places=9)
+
+    def test_each_event_is_one_statement_whatever_the_history(self):
+        for _ in range(20):
+            self.navigate(self.mist, 1)
+        session = NavigationSession.objects.create(trail=self.mist, user=self.user)
+        with self.assertNumQueries(1):
+            record_start(session)
+
+    def test_recent_starts_outrank_old_popularity(self):
+        for _ in range(3):
+            # four half-lives ago: 3 / 16 of a start today
+            self.navigate(self.mist, 28)
+        self.navigate(self.dome, 0, distance_m=4000)
+        self.navigate(self.acadia, 0)
+
+        ranked = APIClient().get("/api/trails/trending/").json()
+        self.assertEqual(
+            [trail["id"] for trail in ranked],
+            [self.dome.id, self.acadia.id, self.mist.id],
+        )
+        self.assertAlmostEqual(ranked[2]["score"], 3 / 16, places=3)
+
+    def test_regions_rank_their_own_trails(self):
+        self.navigate(self.acadia, 0)
+        self.navigate(self.acadia, 0)
+        self.navigate(self.mist, 0)
+        client = APIClient()
+        yosemite = client.get("/api/trails/trending/", {"near": "37.74,-119.54"})
+        self.assertEqual([trail["id"] for trail in yosemite.json()], [self.mist.id])
+
+        region = region_for(self.acadia.lat, self.acadia.long)
+        acadia = client.get("/api/trails/trending/", {"region": region})
+        self.assertEqual([trail["id"] for trail in acadia.json()], [self.acadia.id])
+
+        for bad in ["6/1", "3/1/1", "6/64/0", "x/y/z"]:
+            response = client.get("/api/trails/trending/", {"region": bad})
+            self.assertEqual(response.status_code, 400, bad)
+
+    def test_rankings_are_cached_and_removed_trails_dropped(self):
+        self.navigate(self.mist, 0)
+        client = APIClient()
+        self.assertEqual(len(client.get("/api/trails/trending/").json()), 1)
+        self.navigate(self.dome, 0)
+        with self.assertNumQueries(0):
+            cached = client.get("/api/trails/trending/").json()
+        self.assertEqual(len(cached), 1)
+
+        caches[settings.TRAIL_CATALOG_CACHE].clear()
+        Trail.objects.filter(pk=self.mist.pk).update(removed_at=self.now)
+        ranked = client.get("/api/trails/trending/").json()
+        self.assertEqual([trail["id"] for trail in ranked], [self.dome.id])
+
+    def test_navigation_feeds_the_trend(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.post("/api/nav/start/", {"trail": self.dome.id}, format="json")
+        NavigationSession.objects.filter(is_active=True).update(distance_m=3000)
+        client.post("/api/nav/stop/")
+        # a start and a finished hike, both just now
+        score = self.scores()[self.dome.id]
+        self.assertAlmostEqual(score, START_WEIGHT + FINISH_WEIGHT, places=3)
+
+
+class SimilarTrailTests(TestCase):
+    def setUp(self):
+        # the index lives for the process; every test starts from a fresh build
+        invalidate_similarity_index()
+        self.addCleanup(invalidate_similarity_index)
+        self.client = APIClient()
+        self.mist = self.trail("Mist Trail", 5.0, 1000, lat=37.73, lng=-119.55)
+        self.twin = self.trail("Vernal Loop", 5.4, 1100, lat=37.74, lng=-119.54)
+        self.dome = self.trail("Half Dome", 16.0, 4800, "Strenuous", lat=37.75)
+        self.far = self.trail("Precipice", 5.0, 1000, lat=44.35, lng=-68.19)
+
+    def trail(self, name, distance, elevation, difficulty="Moderate", **where):
+        return Trail.objects.create(
+            name=name,
+            lat=where.get("lat", 37.7),
+            long=where.get("lng", -119.5),
+            distance=distance,
+            elevation=elevation,
+            difficulty=difficulty,
+            is_dog_friendly=where.get("dogs", True),
+        )
+
+    def similar(self, trail, client=None, **params):
+        client = client or self.client
+        response = client.get(f"/api/trails/{trail.id}/similar/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [result["id"] for result in response.json()]
+
+    def test_kd_tree_matches_a_brute_force_scan(self):
+        rng = np.random.default_rng(3)
+        points = rng.normal(size=(5000, 7)).astype(np.float32)
+        tree = KDTree(points, leaf_size=16)
+        alive = rng.random(5000) > 0.1
+        for query in rng.normal(size=(25, 7)).astype(np.float32):
+            rows, distances = tree.query(query, 8, alive)
+            brute = ((points - query) ** 2).sum(axis=1)
+            brute[~alive] = np.inf
+            expected = np.sort(brute)[:8]
+            np.testing.assert_allclose(distances, expected, rtol=1e-5)
+            np.testing.assert_array_equal(
+                np.sort(tree.order[rows]), np.sort(np.argsort(brute)[:8])
+            )
+
+    def test_nearest_trails_come_first(self):
+        results = self.similar(self.mist)
+        self.assertNotIn(self.mist.id, results)
+        self.assertEqual(results[0], self.twin.id)
+        # same length and climb, but half a continent away
+        self.assertEqual(results[-1], self.far.id)
+        self.assertEqual(len(self.similar(self.mist, limit=1)), 1)
+        response = self.client.get("/api/trails/999999/similar/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_answers_are_cached_with_the_catalog(self):
+        self.similar(self.mist)
+        # the catalog version, then the cached response
+        with self.assertNumQueries(1):
+            self.similar(self.mist)
+
+    def test_changes_are_applied_without_a_rebuild(self):
+        self.similar(self.mist)
+        tree = similar.get_similarity_index().tree
+
+        closer = self.trail("Mist Spur", 5.0, 1000, lat=37.731, lng=-119.551)
+        self.assertEqual(self.similar(self.mist)[0], closer.id)
+        closer.removed_at = timezone.now()
+        closer.save()
+        self.twin.lat, self.twin.long = 44.3, -68.2
+        self.twin.save()
+        results = self.similar(self.mist)
+        self.assertNotIn(closer.id, results)
+        self.assertEqual(results[0], self.dome.id)
+
+        index = similar.get_similarity_index()
+        self.assertIs(index.tree, tree)
+        self.assertEqual(set(index.delta), {self.twin.id})
+        self.assertEqual(len(index), 4)
+
+    def test_import_changes_reach_the_index(self):
+        self.similar(self.mist)
+        record = {
+            "source": "thingstodo",
+            "source_id": "vernal",
+            "park_code": "yose",
+            "name": "Vernal Fall",
+            "lat": 37.727,
+            "long": -119.544,
+            "distance": 5.0,
+            "elevation": 1000,
+            "images": [],
+        }
+        sync_records([record], [("thingstodo", "yose")])
+        bump_catalog_version()
+        vernal = Trail.objects.get(name="Vernal Fall")
+        self.assertIn(vernal.id, self.similar(self.mist)[:2])
+
+        # gone upstream: soft-deleted by the next full sync
+        sync_records([], [("thingstodo", "yose")])
+        bump_catalog_version()
+        self.assertNotIn(vernal.id, self.similar(self.mist))
+
+    def test_compaction_keeps_the_answers(self):
+        index = similar.get_similarity_index()
+        for i in range(3):
+            self.trail(f"Copy {i}", 5.0, 1000, lat=37.73, lng=-119.55)
+        with mock.patch.object(similar, "COMPACT_MIN_DELTA", 0):
+            updated = similar.get_similarity_index()
+        self.assertIsNot(updated.tree, index.tree)
+        self.assertEqual(updated.delta, {})
+        self.assertEqual(len(updated), 7)
+
+    def test_personalized_results_lean_towards_history(self):
+        hiker = get_user_model().objects.create(username="climber")
+        NavigationSession.objects.create(trail=self.dome, user=hiker)
+        steep = self.trail("Clouds Rest", 14.0, 4500, "Strenuous", lat=37.76)
+        client = APIClient()
+        client.force_authenticate(hiker)
+
+        url = f"/api/trails/{self.mist.id}/similar/"
+        plain = {r["id"]: r for r in self.client.get(url).json()}
+        personal = {r["id"]: r for r in client.get(url, {"personalized": 1}).json()}
+        # trails they have been on are left out, and ones like them move closer
+        self.assertIn(self.dome.id, plain)
+        self.assertNotIn(self.dome.id, personal)
+        self.assertLess(
+            personal[steep.id]["similarity_distance"],
+            plain[steep.id]["similarity_distance"],
+        )
+
+        response = self.client.get(url, {"personalized": 1})
+        self.assertEqual(response.status_code, 401)
+
+
+class NavigationWebSocketTests(TransactionTestCase):
+    # consumers write from worker threads, so the data has to be committed
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="streamer")
+        self.trail = Trail.objects.create(name="Mist Trail", lat=37.72, long=-119.55)
+
+    async def connect(self, user=None):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), "/ws/nav/"
+        )
+        if user is not None:
+            communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def test_requires_authentication(self):
+        async def scenario():
+            communicator = await self.connect()
+            await communicator.send_json_to({"type": "start", "trail": 1})
+            output = await communicator.receive_output()
+            self.assertEqual(output["code"], consumers.CLOSE_UNAUTHENTICATED)
+
+        async_to_sync(scenario)()
+
+    def test_auth_without_a_string_token_closes(self):
+        async def scenario(message):
+            communicator = await self.connect()
+            await communicator.send_json_to(message)
+            output = await communicator.receive_output()
+            self.assertEqual(output["code"], consumers.CLOSE_UNAUTHENTICATED)
+
+        verifier = mock.Mock()
+        with mock.patch.object(consumers, "get_verifier", return_value=verifier):
+            for message in [
+                {"type": "auth"},
+                {"type": "auth", "token": None},
+                {"type": "auth", "token": 42},
+                {"type": "auth", "token": ["t"]},
+                {"type": "auth", "token": ""},
+            ]:
+                with self.subTest(message=message):
+                    async_to_sync(scenario)(message)
+        verifier.verify.assert_not_called()
+
+    def test_token_auth_once_then_stream(self):
+        verifier = mock.Mock()
+        verifier.verify.return_value = {"sub": "streamer"}
+
+        async def scenario():
+            communicator = await self.connect()
+            await communicator.send_json_to({"type": "auth", "token": "t"})
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {"type": "status", "session": None},
+            )
+            await communicator.send_json_to({"type": "start", "trail": self.trail.id})
+            status = await communicator.receive_json_from()
+            self.assertEqual(status["status"], "started")
+            await communicator.disconnect()
+
+        with mock.patch.object(consumers, "get_verifier", return_value=verifier):
+            async_to_sync(scenario)()
+        verifier.verify.assert_called_once_with("t")
+
+    def test_fixes_are_coalesced_and_stats_pushed(self):
+        start = datetime(2026, 6, 1, 8, 0, tzinfo=dt_timezone.utc)
+
+        async def scenario():
+            communicator = await self.connect(self.user)
+            await communicator.receive_json_from()
+            await communicator.send_json_to({"type": "start", "trail": self.trail.id})
+            session_id = (await communicator.receive_json_from())["session"]
+
+            for i in range(5):
+                await communicator.send_json_to(
+                    {
+                        "type": "fix",
+                        "latitude": 37.72 + i * 1e-4,
+                        "longitude": -119.55,
+                        "timestamp": (start + timedelta(seconds=10 * i)).isoformat(),
+                        "seq": i,
+                    }
+                )
+                stats = await communicator.receive_json_from()
+                self.assertEqual(stats["seq"], i)
+            self.assertEqual(stats["stats"]["point_count"], 5)
+            self.assertGreater(stats["stats"]["distance_km"], 0.04)
+
+            # nothing written yet: the flush interval has not passed
+            count = database_sync_to_async(
+                GPSLog.objects.filter(session_id=session_id).count
+            )
+            self.assertEqual(await count(), 0)
+
+            # a resent fix after a reconnect is acknowledged but not stored again
+            await communicator.send_json_to(
+                {"type": "fix", "latitude": 37.72, "longitude": -119.55, "seq": 4}
+            )
+            self.assertEqual((await communicator.receive_json_from())["seq"], 4)
+
+            await communicator.send_json_to({"type": "stop"})
+            status = await communicator.receive_json_from()
+            self.assertEqual(status["status"], "stopped")
+            await communicator.receive_json_from()
+            self.assertEqual(await count(), 5)
+            await communicator.disconnect()
+            return session_id
+
+        with mock.patch.object(consumers, "FLUSH_INTERVAL_SECONDS", 60):
+            session_id = async_to_sync(scenario)()
+
+        session = NavigationSession.objects.get(id=session_id)
+        self.assertFalse(session.is_active)
+        self.assertEqual(session.point_count, 5)
+        self.assertAlmostEqual(session.distance_m, 44.5, delta=1)
+
+    def test_cannot_start_on_a_removed_trail(self):
+        Trail.objects.filter(id=self.trail.id).update(removed_at=timezone.now())
+
+        async def scenario():
+            communicator = await self.connect(self.user)
+            await communicator.receive_json_from()
+            await communicator.send_json_to({"type": "start", "trail": self.trail.id})
+            self.assertEqual(
+                await communicator.receive_json_from(),
+                {"type": "error", "error": "Trail not found"},
+            )
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+        self.assertFalse(NavigationSession.objects.exists())
+
+    def test_stop_after_http_stop_is_not_rolled_up_twice(self):
+        async def scenario():
+            communicator = await self.connect(self.user)
+            await communicator.receive_json_from()
+            await communicator.send_json_to({"type": "start", "trail": self.trail.id})
+            session_id = (await communicator.receive_json_from())["session"]
+            # stopped over HTTP while the socket still holds the session
+            await database_sync_to_async(
+                NavigationSession.objects.filter(id=session_id).update
+            )(is_active=False, status="stopped")
+
+            await communicator.send_json_to({"type": "stop"})
+            reply = await communicator.receive_json_from()
+            self.assertEqual(reply["type"], "error")
+            await communicator.send_json_to({"type": "pause"})
+            self.assertEqual(
+                (await communicator.receive_json_from())["error"],
+                "No active navigation session",
+            )
+            await communicator.disconnect()
+
+        with mock.patch.object(consumers, "end_session") as end_session:
+            async_to_sync(scenario)()
+        end_session.assert_not_called()
+        self.assertEqual(NavigationSession.objects.get().status, "stopped")
+
+    def test_disconnect_flushes_pending_fixes(self):
+        async def scenario():
+            communicator = await self.connect(self.user)
+            await communicator.receive_json_from()
+            await communicator.send_json_to({"type": "start", "trail": self.trail.id})
+            await communicator.receive_json_from()
+            await communicator.send_json_to(
+                {"type": "fix", "latitude": 37.72, "longitude": -119.55}
+            )
+            await communicator.receive_json_from()
+            await communicator.disconnect()
+
+        with mock.patch.object(consumers, "FLUSH_INTERVAL_SECONDS", 60):
+            async_to_sync(scenario)()
+        self.assertEqual(GPSLog.objects.count(), 1)
+        self.assertTrue(NavigationSession.objects.get().is_active)
+
+
+class GeofencedPromptTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="mindful")
+        self.trail = Trail.objects.create(name="Mist Trail", lat=37.7, long=-119.5)
+        self.session = NavigationSession.objects.create(
+            trail=self.trail, user=self.user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.bridge = Prompt.objects.create(
+            text="Pause here and listen to the river.",
+            latitude=37.701,
+            longitude=-119.5,
+            radius_m=30,
+        )
+        # the process-wide index must not outlive this test's rows
+        self.addCleanup(invalidate_prompt_index)
+
+    def post(self, latitude, longitude=-119.5, **extra):
+        return self.client.post(
+            "/api/nav/update/",
+            {"latitude": latitude, "longitude": longitude, **extra},
+            format="json",
+        )
+
+    def test_prompt_fires_once_on_entering_zone(self):
+        self.assertEqual(self.post(37.7).json()["prompts"], [])
+        prompts = self.post(37.7011).json()["prompts"]
+        self.assertEqual([p["id"] for p in prompts], [self.bridge.id])
+        self.assertEqual(prompts[0]["text"], self.bridge.text)
+        self.assertEqual(self.post(37.701).json()["prompts"], [])
+        self.assertEqual(PromptTrigger.objects.filter(session=self.session).count(), 1)
+
+    def test_trail_and_pace_conditions(self):
+        other = Trail.objects.create(name="Other", lat=0, long=0)
+        Prompt.objects.create(
+            text="Elsewhere", trail=other, latitude=37.7, longitude=-119.5
+        )
+        rushing = Prompt.objects.create(
+            text="How's your pace?",
+            latitude=37.7,
+            longitude=-119.5,
+            radius_m=500,
+            max_pace_s_per_km=600,
+        )
+        # 11 m every 2 s is ~5.6 m/s: well under 10 min/km once smoothed in
+        points = [
+            {
+                "latitude": 37.7 + i * 1e-4,
+                "longitude": -119.5,
+                "timestamp": f"2026-06-01T10:00:{2 * i:02d}Z",
+            }
+            for i in range(6)
+        ]
+        response = self.client.post(
+            "/api/nav/update/", {"points": points}, format="json"
+        )
+        ids = [p["id"] for p in response.json()["prompts"]]
+        self.assertIn(rushing.id, ids)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertFalse(Prompt.objects.filter(id__in=ids, text="Elsewhere").exists())
+
+    def test_segment_corridor_zone(self):
+        index = PromptIndex(
+            [PromptZone(1, 20, path=[(37.70, -119.50), (37.70, -119.48)])]
+        )
+        self.assertEqual(len(index.match(37.7001, -119.49)), 1)
+        self.assertEqual(index.match(37.701, -119.49), [])
+        self.assertEqual(index.match(37.7001, -119.47), [])
+
+
+class RouteDeviationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="wanderer")
+        # ~1.1 km due north in 11 m steps
+        self.trail = Trail.objects.create(
+            name="Ridge Line",
+            lat=45.0,
+            long=-120.0,
+            path=LineString([(-120.0, 45.0 + i * 1e-4) for i in range(101)]),
+        )
+        self.session = NavigationSession.objects.create(
+            trail=self.trail, user=self.user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(invalidate_trail_line)
+
+    def post(self, latitude, longitude=-120.0):
+        return self.client.post(
+            "/api/nav/update/",
+            {"latitude": latitude, "longitude": longitude},
+            format="json",
+        )
+
+    def test_progress_and_off_route_events(self):
+        data = self.post(45.005, -120.00005).json()
+        self.assertEqual(data["route_events"], [])
+        self.assertFalse(data["stats"]["off_route"])
+        self.assertAlmostEqual(data["stats"]["route_progress_m"], 556, delta=2)
+        self.assertAlmostEqual(data["stats"]["route_distance_m"], 4, delta=1)
+
+        # ~80 m east of the line
+        data = self.post(45.0055, -119.999)
+        events = data.json()["route_events"]
+        self.assertEqual([e["event"] for e in events], ["off_route"])
+        # still off route: no new event, progress held where the hiker left
+        data = self.post(45.0065, -119.9995).json()
+        self.assertEqual(data["route_events"], [])
+        self.assertAlmostEqual(data["stats"]["route_progress_m"], 556, delta=2)
+
+        data = self.post(45.008).json()
+        self.assertEqual([e["event"] for e in data["route_events"]], ["back_on_route"])
+        self.assertAlmostEqual(data["stats"]["route_progress_m"], 890, delta=2)
+
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.off_route)
+        self.assertEqual(
+            [e["event"] for e in self.session.route_events],
+            ["off_route", "back_on_route"],
+        )
+
+    def test_batch_reports_events_in_time_order(self):
+        points = [
+            {"latitude": 45.001, "longitude": lng, "timestamp": ts}
+            for lng, ts in [
+                (-120.0, "2026-06-01T10:00:00Z"),
+                (-119.999, "2026-06-01T10:00:10Z"),
+                (-120.0, "2026-06-01T10:00:20Z"),
+            ]
+        ]
+        response = self.client.post(
+            "/api/nav/update/", {"points": points[::-1]}, format="json"
+        )
+        events = response.json()["route_events"]
+        self.assertEqual([e["event"] for e in events], ["off_route", "back_on_route"])
+
+    def test_trail_without_path_is_not_tracked(self):
+        self.trail.path = None
+        self.trail.save()
+        data = self.post(46.0).json()
+        self.assertEqual(data["route_events"], [])
+        self.assertIsNone(data["stats"]["route_distance_m"])
+
+    def test_bulk_moved_path_is_picked_up(self):
+        self.post(45.005)
+        moved = LineString([(-121.0, 45.0 + i * 1e-4) for i in range(101)])
+        Trail.objects.filter(id=self.trail.id).update(path=moved)
+        bump_catalog_version()
+        data = self.post(45.005, -121.0).json()
+        self.assertAlmostEqual(data["stats"]["route_distance_m"], 0, delta=1)
+
+    def test_cursor_matches_full_scan_off_route(self):
+        rng = random.Random(7)
+        lat, lng, heading, coords = 45.0, -120.0, 0.0, [(-120.0, 45.0)]
+        for _ in range(5_000):
+            heading += rng.gauss(0, 0.3)
+            lat += np.cos(heading) * 1e-4
+            lng += np.sin(heading) * 1.4e-4
+            coords.append((lng, lat))
+        line = TrailLine(coords)
+        cursor = 0
+        for k in range(0, 5_000, 50):
+            point_lng, point_lat = coords[k]
+            # far enough off that the cursor window cannot answer alone
+            lat, lng = point_lat + 0.002, point_lng
+            distance, cursor, _ = line.locate(lat, lng, cursor)
+            x, y = line.project(lat, lng)
+            best = line._best_in(range(line.segment_count), x, y, (np.inf, 0, 0.0))
+            self.assertAlmostEqual(distance, np.sqrt(best[0]), places=6)
+
+
+@override_settings(CACHES=BENCH_CACHES, TRAIL_CATALOG_CACHE="bench-off")
+class EndpointQueryBudgetTests(TestCase):
+    """The bench_endpoints budgets, held at two data scales."""
+
+    TINY = {
+        "trails": 20,
+        "images_per_trail": 2,
+        "users": 3,
+        "sessions_per_user": 2,
+        "points_per_session": 10,
+    }
+
+    def setUp(self):
+        self.addCleanup(invalidate_prompt_index)
+        self.addCleanup(invalidate_trail_line)
+        self.addCleanup(forget_identity)
+
+    def query_counts(self, client):
+        counts = {}
+        for tick, endpoint in enumerate(ENDPOINTS):
+            # the first request may warm process-wide indexes
+            request(client, endpoint, 0, 2 * tick)
+            with CaptureQueriesContext(connection) as queries:
+                response = request(client, endpoint, 0, 2 * tick + 1)
+            self.assertLess(response.status_code, 400, endpoint)
+            counts[endpoint] = count_queries(queries.captured_queries)
+        return counts
+
+    def test_query_counts_are_within_budget_and_flat(self):
+        rng = random.Random(1)
+        users = seed(self.TINY, rng)
+        client = APIClient()
+        client.force_authenticate(users[0])
+        small = self.query_counts(client)
+        for endpoint, count in small.items():
+            self.assertLessEqual(count, QUERY_BUDGETS[endpoint], endpoint)
+
+        seed(dict(self.TINY, trails=200, sessions_per_user=15), rng, prefix="more")
+        self.assertEqual(self.query_counts(client), small)
+
+
+@override_settings(
+    PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_METRICS_TOKEN=""
+)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        Trail.objects.create(name="Mist Trail", lat=37.7, long=-119.5)
+        self.client = APIClient()
+        REGISTRY.reset()
+        self.addCleanup(REGISTRY.reset)
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get("/api/trails/")
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn("serialize;dur=", timing)
+        self.assertIn("view;dur=", timing)
+
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn("# TYPE happyhiker_request_duration_seconds histogram", body)
+        self.assertRegex(
+            body,
+            r'happyhiker_sampled_responses_total\{route="api/[^"]*trails[^"]*",'
+            r'method="GET",status="200"\} 1',
+        )
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.client.get("/api/trails/")
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(PROFILING_METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,149 @@
+"""Mapbox vector tiles of trailheads and trail segment geometry.
+
+Tiles are built in one PostGIS query with ST_AsMVT. Low zooms thin the
+trailheads to one per grid cell and drop segments below SEGMENT_MIN_ZOOM;
+segment lines are simplified to about one pixel. Built tiles are cached on
+disk under TILE_CACHE_DIR and the tiles covering a trail or segment are
+deleted when it changes (bulk imports clear the whole cache).
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+MAX_ZOOM = 22
+# deeper tiles are cheap to build and too numerous to invalidate, so not cached
+CACHE_MAX_ZOOM = 16
+EXTENT = 4096
+BUFFER = 64
+# segments are noise on the map below this zoom
+SEGMENT_MIN_ZOOM = 10
+# at and above this zoom every trailhead is drawn
+THIN_MAX_ZOOM = 12
+# below it, one trailhead (the longest trail) per cell of this many tile units
+THIN_CELL = 128
+SIMPLIFY_PX = 1.0
+WEB_MERCATOR_HALF_WORLD = 20037508.342789244
+
+TILE_SQL = """
+WITH bounds AS (
+    SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom,
+           ST_Transform(
+               ST_TileEnvelope(%(z)s, %(x)s, %(y)s, margin => %(margin)s), 4326
+           ) AS geom_4326
+),
+located AS (
+    SELECT t.id, t.name, t.difficulty, t.distance, t.elevation, t.is_dog_friendly,
+           ST_AsMVTGeom(ST_Transform(t.location::geometry, 3857), bounds.geom,
+                        %(extent)s, %(buffer)s, true) AS geom
+    FROM trail_nav_trail t, bounds
+    WHERE t.removed_at IS NULL
+      AND t.location && bounds.geom_4326::geography
+),
+trailheads AS (
+    SELECT {distinct} * FROM located
+    WHERE geom IS NOT NULL
+    ORDER BY {cell} distance DESC, id
+),
+segments AS (
+    SELECT s.id, s.start_id, s.end_id, s.length_m,
+           ST_AsMVTGeom(ST_Simplify(ST_Transform(s.path, 3857), %(tolerance)s),
+                        bounds.geom, %(extent)s, %(buffer)s, true) AS geom
+    FROM trail_nav_trailsegment s, bounds
+    WHERE %(z)s >= %(segment_min_zoom)s
+      AND s.path && bounds.geom_4326
+)
+SELECT
+    COALESCE(
+        (SELECT ST_AsMVT(trailheads, 'trailheads', %(extent)s, 'geom')
+         FROM trailheads),
+        ''::bytea
+    ) || COALESCE(
+        (SELECT ST_AsMVT(segments, 'segments', %(extent)s, 'geom')
+         FROM segments WHERE geom IS NOT NULL),
+        ''::bytea
+    )
+"""
+THIN_CELL_SQL = "floor(ST_X(geom) / {size}), floor(ST_Y(geom) / {size})"
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def tile_for_point(z, lat, lng):
+    """The (x, y) of the web mercator tile containing a point at zoom z."""
+    n = 2**z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lng + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def render_tile(z, x, y):
+    """Build one tile as MVT bytes (empty for a tile with no features)."""
+    if z < THIN_MAX_ZOOM:
+        cell = THIN_CELL_SQL.format(size=THIN_CELL)
+        sql = TILE_SQL.format(distinct=f"DISTINCT ON ({cell})", cell=f"{cell},")
+    else:
+        sql = TILE_SQL.format(distinct="", cell="")
+    metres_per_pixel = 2 * WEB_MERCATOR_HALF_WORLD / 2**z / 256
+    params = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "extent": EXTENT,
+        "buffer": BUFFER,
+        # the index prefilter must cover the buffer too, or edge features vanish
+        "margin": BUFFER / EXTENT,
+        "tolerance": metres_per_pixel * SIMPLIFY_PX,
+        "segment_min_zoom": SEGMENT_MIN_ZOOM,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        tile = cursor.fetchone()[0]
+    return bytes(tile or b"")
+
+
+def _tile_path(z, x, y):
+    return Path(settings.TILE_CACHE_DIR) / str(z) / str(x) / f"{y}.pbf"
+
+
+def get_tile(z, x, y):
+    """A tile from the disk cache, rendered and stored on a miss."""
+    if z > CACHE_MAX_ZOOM:
+        return render_tile(z, x, y)
+    path = _tile_path(z, x, y)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    tile = render_tile(z, x, y)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write then rename, so concurrent readers never see a partial tile
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(tile)
+    os.replace(tmp, path)
+    return tile
+
+
+def invalidate_extent(south, west, north, east):
+    """Drop every cached tile that shows the extent, buffers included."""
+    for z in range(CACHE_MAX_ZOOM + 1):
+        last = 2**z - 1
+        x0, y0 = tile_for_point(z, north, west)
+        x1, y1 = tile_for_point(z, south, east)
+        # a neighbour's buffer can reach one tile in
+        for x in range(max(x0 - 1, 0), min(x1 + 1, last) + 1):
+            for y in range(max(y0 - 1, 0), min(y1 + 1, last) + 1):
+                _tile_path(z, x, y).unlink(missing_ok=True)
+
+
+def clear_tile_cache():
+    shutil.rmtree(settings.TILE_CACHE_DIR, ignore_errors=True)
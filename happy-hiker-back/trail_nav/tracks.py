@@ -0,0 +1,124 @@
+"""Packed storage for finished navigation tracks.
+
+A stopped session's GPSLog rows are compacted into a single SessionTrack blob:
+a small header followed by zigzag varint deltas of (lat, long) in micro-degrees
+and timestamps in milliseconds. Consecutive fixes are close together, so most
+deltas fit in one or two bytes instead of a ~60 byte table row per point.
+"""
+
+import struct
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+
+from .geo import track_length_m
+
+TRACK_FORMAT_VERSION = 1
+COORD_SCALE = 1_000_000  # micro-degrees, ~0.1 m
+HEADER = struct.Struct("<BI")  # version, point count
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _to_millis(timestamp):
+    return round(timestamp.timestamp() * 1000)
+
+
+def encode_track(points):
+    """Pack an iterable of (latitude, longitude, timestamp) tuples into bytes."""
+    out = bytearray(HEADER.size)
+    count = 0
+    prev_lat = prev_lng = prev_ms = 0
+    for latitude, longitude, timestamp in points:
+        lat = round(latitude * COORD_SCALE)
+        lng = round(longitude * COORD_SCALE)
+        ms = _to_millis(timestamp)
+        _write_varint(out, _zigzag(lat - prev_lat))
+        _write_varint(out, _zigzag(lng - prev_lng))
+        _write_varint(out, _zigzag(ms - prev_ms))
+        prev_lat, prev_lng, prev_ms = lat, lng, ms
+        count += 1
+    HEADER.pack_into(out, 0, TRACK_FORMAT_VERSION, count)
+    return bytes(out)
+
+
+def decode_track(data):
+    """Unpack bytes from encode_track() into (latitude, longitude, timestamp) tuples."""
+    data = bytes(data)
+    version, count = HEADER.unpack_from(data, 0)
+    if version != TRACK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported track format version {version}")
+    pos = HEADER.size
+    lat = lng = ms = 0
+    points = []
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        lat += _unzigzag(delta)
+        delta, pos = _read_varint(data, pos)
+        lng += _unzigzag(delta)
+        delta, pos = _read_varint(data, pos)
+        ms += _unzigzag(delta)
+        points.append(
+            (
+                lat / COORD_SCALE,
+                lng / COORD_SCALE,
+                datetime.fromtimestamp(ms / 1000, tz=dt_timezone.utc),
+            )
+        )
+    return points
+
+
+def session_points(session):
+    """All fixes for a session in time order, whether packed, raw, or both."""
+    from .models import SessionTrack
+
+    try:
+        points = decode_track(session.track.data)
+    except SessionTrack.DoesNotExist:
+        points = []
+    points += session.gps_logs.order_by("timestamp", "id").values_list(
+        "latitude", "longitude", "timestamp"
+    )
+    return points
+
+
+def compact_session(session):
+    """Move a stopped session's GPSLog rows into one SessionTrack. Returns point count."""
+    from .models import GPSLog, SessionTrack
+
+    with transaction.atomic():
+        points = session_points(session)
+        SessionTrack.objects.update_or_create(
+            session=session,
+            defaults={
+                "point_count": len(points),
+                "distance_m": track_length_m(points),
+                "data": encode_track(points),
+            },
+        )
+        GPSLog.objects.filter(session=session).delete()
+    return len(points)
@@ -0,0 +1,174 @@
+"""Time-decayed trail popularity, globally and per region.
+
+A trail's score at time t is sum(weight * exp(-(t - event) / TAU)) over its
+navigation events: every start, and every stop that made a hike. All scores
+decay by the same factor, so TrailTrend stores the log of the score as of a
+fixed EPOCH instead. Adding an event is then one log-add-exp in an upsert
+(record_start / record_finish), ordering by the stored value orders by the
+score at any moment, and the stored value grows only linearly with time, so it
+never overflows. score_at() turns it back into today's score.
+
+Regions are coarse web mercator tiles (REGION_ZOOM) around the trailhead. The
+top-N per region is an index range on (region, score), cached briefly:
+decay never reorders trails, only new events do.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+
+from user_profile.activity import is_hike
+
+from .models import NavigationSession, TrailTrend
+from .tiles import tile_for_point
+
+HALF_LIFE = timedelta(days=7)
+TAU_SECONDS = HALF_LIFE.total_seconds() / math.log(2)
+EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+START_WEIGHT = 1.0
+# on top of the start: a hike someone finished says more than a tap on "start"
+FINISH_WEIGHT = 2.0
+# ~600 km tiles at mid latitudes: a national park and its surroundings
+REGION_ZOOM = 6
+REBUILD_BATCH_SIZE = 2000
+
+UPSERT_SQL = """
+INSERT INTO {table} AS t (trail_id, region, score, updated_at)
+VALUES (%s, %s, %s, now())
+ON CONFLICT (trail_id) DO UPDATE SET
+    -- log(exp(a) + exp(b)); past a gap of 50 the smaller term is below float
+    -- precision anyway, and exp() of a very negative number raises underflow
+    score = GREATEST(t.score, EXCLUDED.score)
+        + LN(1 + EXP(-LEAST(ABS(t.score - EXCLUDED.score), 50))),
+    region = EXCLUDED.region,
+    updated_at = EXCLUDED.updated_at
+"""
+
+
+def region_for(lat, lng):
+    x, y = tile_for_point(REGION_ZOOM, lat, lng)
+    return f"{REGION_ZOOM}/{x}/{y}"
+
+
+def log_weight(weight, at):
+    """An event's weight as a stored score: log(weight) + (at - EPOCH) / TAU."""
+    return math.log(weight) + (at - EPOCH).total_seconds() / TAU_SECONDS
+
+
+def log_add(a, b):
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def score_at(stored, now=None):
+    """The decayed score at ``now`` of a stored TrailTrend.score."""
+    now = now or timezone.now()
+    return math.exp(stored - (now - EPOCH).total_seconds() / TAU_SECONDS)
+
+
+def record_event(trail, weight, at):
+    """Add one event to the trail's score: a single upsert, whatever its history."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_SQL.format(table=TrailTrend._meta.db_table),
+            [trail.id, region_for(trail.lat, trail.long), log_weight(weight, at)],
+        )
+
+
+def record_start(session):
+    record_event(session.trail, START_WEIGHT, session.started_at)
+
+
+def record_finish(session):
+    """Count a session that just stopped, if it made a hike."""
+    if is_hike(session):
+        record_event(
+            session.trail, FINISH_WEIGHT, session.ended_at or session.started_at
+        )
+
+
+def session_events(session):
+    """(weight, at) of every event the session has fed into its trail's score."""
+    yield START_WEIGHT, session.started_at
+    if is_hike(session):
+        yield FINISH_WEIGHT, session.ended_at or session.started_at
+
+
+def rebuild_trending():
+    """Recompute every trail's score from its sessions (backfill / repair).
+
+    Runs in one transaction, so readers keep the old scores until it commits.
+    Returns the number of trails with a score.
+    """
+    sessions = (
+        NavigationSession.objects.select_related("trail")
+        .only(
+            "trail",
+            "trail__lat",
+            "trail__long",
+            "started_at",
+            "ended_at",
+            "is_active",
+            "distance_m",
+        )
+        .order_by("trail_id")
+    )
+    written = 0
+    with transaction.atomic():
+        TrailTrend.objects.all().delete()
+        batch, trend = [], None
+        for session in sessions.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            if trend is None or trend.trail_id != session.trail_id:
+                trend = TrailTrend(
+                    trail_id=session.trail_id,
+                    region=region_for(session.trail.lat, session.trail.long),
+                    score=None,
+                )
+                batch.append(trend)
+                if len(batch) > REBUILD_BATCH_SIZE:
+                    TrailTrend.objects.bulk_create(batch[:-1])
+                    written += len(batch) - 1
+                    batch = batch[-1:]
+            for weight, at in session_events(session):
+                trend.score = log_add(trend.score, log_weight(weight, at))
+        TrailTrend.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def top_trending(region=None, limit=10, now=None):
+    """The top ``limit`` trails by decayed score, globally or in one region.
+
+    The ranking is cached for TRENDING_CACHE_TIMEOUT seconds; scores are
+    decayed to ``now`` on every call.
+    """
+    cache = caches[settings.TRAIL_CATALOG_CACHE]
+    key = f"trail-trending:{region or 'all'}:{limit}"
+    rows = cache.get(key)
+    if rows is None:
+        trends = TrailTrend.objects.filter(trail__removed_at__isnull=True)
+        if region is not None:
+            trends = trends.filter(region=region)
+        rows = list(
+            trends.order_by("-score", "trail_id").values_list(
+                "trail_id", "trail__name", "trail__lat", "trail__long", "score"
+            )[:limit]
+        )
+        cache.set(key, rows, settings.TRENDING_CACHE_TIMEOUT)
+    now = now or timezone.now()
+    return [
+        {
+            "id": trail_id,
+            "name": name,
+            "lat": lat,
+            "long": lng,
+            "score": score_at(stored, now),
+        }
+        for trail_id, name, lat, lng, stored in rows
+    ]
@@ -6,6 +6,10 @@ from .views import (
     PauseNavigationView,
     StopNavigationView,
     NavigationHistoryView,
+    SessionTrackView,
+    RouteView,
+    ElevationProfileView,
+    TrailTileView,
     TrailViewSet,
 )
 
@@ -20,4 +24,8 @@ urlpatterns = [
     path("nav/pause/", PauseNavigationView.as_view()),
     path("nav/stop/", StopNavigationView.as_view()),
     path("nav/history/", NavigationHistoryView.as_view()),
+    path("nav/sessions/<int:session_id>/track/", SessionTrackView.as_view()),
+    path("routes/", RouteView.as_view()),
+    path("elevation/profile/", ElevationProfileView.as_view()),
+    path("tiles/trails/<int:z>/<int:x>/<int:y>.pbf", TrailTileView.as_view()),
 ]
@@ -1,22 +1,405 @@
+import hashlib
+
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import (
+    Case,
+    Exists,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.measure import D
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAuthenticated, ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAuthenticated
 from .models import Trail
-from .serializers import TrailSerializer
+from .serializers import (
+    SimilarTrailSerializer,
+    TrailSerializer,
+    TrailSearchResultSerializer,
+    requested_fields,
+)
+from .pagination import SessionCursorPagination, TrailCursorPagination
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
 
-from .models import Trail, NavigationSession, GPSLog
-from .serializers import NavigationSessionSerializer, GPSLogSerializer
+from .models import Trail, NavigationSession, GPSLog, TrailSegment
+from .serializers import (
+    NavigationSessionSerializer,
+    GPSLogSerializer,
+    GPSPointSerializer,
+    NavigationSessionSummarySerializer,
+    NavigationStatsSerializer,
+)
+from .catalog import catalog_cached
+from .deviation import ROUTE_FIELDS, RouteTracker
+from .elevation import NoElevationData, elevation_profile, get_dem_store
+from .geo import parse_float_list, simplify_track
+from .prompts import PromptScheduler
+from .routing import get_graph, invalidate_graph
+from .similar import similar_trails
+from .stats import (
+    STATS_FIELDS,
+    apply_fix,
+    finalize_stats,
+    is_late,
+    recompute_session_stats,
+)
+from .tiles import get_tile, is_valid_tile
+from .tracks import session_points
+from .trending import REGION_ZOOM, record_finish, record_start, region_for, top_trending
+from user_profile.activity import record_session
+from user_profile.identity import identity_for
+from user_profile.models import Favorite
+
+MAX_RADIUS_KM = 500
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+# below this many characters trigrams are meaningless, so only prefix-match
+SEARCH_FUZZY_MIN_LENGTH = 3
+# matches ranked per search; a broad prefix ("Up") can match a tenth of the catalog
+SEARCH_MAX_CANDIDATES = 1000
+MAX_GPS_BATCH = 5000
+TRACK_DEFAULT_POINTS = 500
+TRACK_MAX_POINTS = 10000
+ELEVATION_DEFAULT_SAMPLES = 200
+ELEVATION_MAX_POINTS = 10000
+TILE_MAX_AGE_SECONDS = 300
+TRENDING_DEFAULT_LIMIT = 10
+SIMILAR_DEFAULT_LIMIT = 10
+SIMILAR_MAX_LIMIT = 50
+TRENDING_MAX_LIMIT = 50
+FAVORITE_FIELDS = {"favorite_count", "is_favorite"}
+
+
+def favorites_only(request):
+    return request.query_params.get("favorites") in ("1", "true")
+
+
+def hiker_profile_id(request):
+    """The authenticated hiker's Profile id, or None."""
+    if not request.user.is_authenticated:
+        return None
+    return identity_for(request.user).profile_id
+
+
+def search_trails(query):
+    """Live trails matching ``query``: prefix hits first, then fuzzy matches.
+
+    The prefix test is UPPER(name) LIKE UPPER('abc%'), served by the
+    trail_name_upper_trgm index, the fuzzy one name %> 'abc', served by
+    trail_name_trgm, so the OR of the two is a BitmapOr rather than a scan.
+    Only the first SEARCH_MAX_CANDIDATES matches the scan returns are ranked
+    (an unordered LIMIT in a subquery), so a short, broad prefix costs a
+    bounded sort instead of scoring every trail it matches.
+    """
+    match = Q(name__istartswith=query)
+    if len(query) >= SEARCH_FUZZY_MIN_LENGTH:
+        match |= Q(name__trigram_word_similar=query)
+    candidates = Trail.objects.filter(match, removed_at__isnull=True).values("id")
+    return (
+        Trail.objects.filter(id__in=candidates[:SEARCH_MAX_CANDIDATES])
+        .annotate(
+            similarity=TrigramWordSimilarity(query, "name"),
+            is_prefix=Case(
+                When(name__istartswith=query, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+        .order_by("-is_prefix", "-similarity", "name")
+    )
 
 
 class TrailViewSet(viewsets.ModelViewSet):
-    queryset = Trail.objects.all()
+    queryset = Trail.objects.filter(removed_at__isnull=True)
     serializer_class = TrailSerializer
+    pagination_class = TrailCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        fields = requested_fields(self.request)
+        if fields is None or "images" in fields:
+            # one extra query for all images on the page instead of one per trail
+            queryset = queryset.prefetch_related("images")
+        if favorites_only(self.request):
+            profile_id = hiker_profile_id(self.request)
+            if profile_id is None:
+                raise NotAuthenticated("favorites=1 needs a registered hiker")
+            # the unique (user_profile, trail) index finds them; at most one row
+            # per trail, so no duplicates
+            queryset = queryset.filter(favorites__user_profile_id=profile_id).annotate(
+                is_favorite=Value(True)
+            )
+        if params.get("dog_friendly") in ("1", "true"):
+            queryset = queryset.filter(is_dog_friendly=True)
+        if params.get("difficulty"):
+            queryset = queryset.filter(difficulty__iexact=params["difficulty"])
+        near = params.get("near")
+        bbox = params.get("bbox")
+        origin = None
+
+        if near:
+            try:
+                lat, lng = parse_float_list(near, 2)
+                radius = float(params.get("radius", 10))
+            except ValueError:
+                raise ValidationError(
+                    {"error": "near must be lat,lng and radius a number (km)"}
+                )
+            if not 0 < radius <= MAX_RADIUS_KM:
+                raise ValidationError(
+                    {"error": f"radius must be between 0 and {MAX_RADIUS_KM} km"}
+                )
+            origin = Point(lng, lat, srid=4326)
+            queryset = queryset.filter(location__dwithin=(origin, D(km=radius)))
+
+        if bbox:
+            try:
+                min_lng, min_lat, max_lng, max_lat = parse_float_list(bbox, 4)
+            except ValueError:
+                raise ValidationError(
+                    {"error": "bbox must be min_lng,min_lat,max_lng,max_lat"}
+                )
+            area = Polygon.from_bbox((min_lng, min_lat, max_lng, max_lat))
+            area.srid = 4326
+            queryset = queryset.filter(location__intersects=area)
+            if origin is None:
+                origin = area.centroid
+
+        if origin is not None:
+            # uses the GiST index on location for the filter, then sorts the hits only;
+            # plain metres (not a Distance measure) so it can act as a pagination cursor
+            queryset = queryset.annotate(
+                distance_from=Cast(Distance("location", origin), FloatField())
+            ).order_by("distance_from", "id")
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if favorites_only(request):
+            # one hiker's own list, so it bypasses the shared catalog cache
+            response = super().list(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return self.catalog_list(request, *args, **kwargs)
+
+    @catalog_cached(personalize="with_favorites")
+    def catalog_list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalog_cached(personalize="with_favorites")
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def with_favorites(self, request, data):
+        """Set the hiker's is_favorite flags and live favorite counts on a page.
+
+        One query whatever the page size. Anonymous responses keep the counts
+        cached with the catalog page.
+        """
+        trails = data["results"] if "results" in data else [data]
+        fields = requested_fields(request)
+        if fields is not None and not fields & FAVORITE_FIELDS:
+            return None
+        profile_id = hiker_profile_id(request)
+        if profile_id is None or not trails:
+            return None
+        if "id" not in trails[0]:
+            raise ValidationError({"error": "fields must include id for favorites"})
+
+        hiker_favorites = Favorite.objects.filter(
+            user_profile_id=profile_id, trail=OuterRef("pk")
+        )
+        live = {
+            pk: (count, is_favorite)
+            for pk, count, is_favorite in Trail.objects.filter(
+                id__in=[trail["id"] for trail in trails]
+            )
+            .annotate(is_favorite=Exists(hiker_favorites))
+            .values_list("id", "favorite_count", "is_favorite")
+        }
+        for trail in trails:
+            count, is_favorite = live.get(trail["id"], (0, False))
+            if "favorite_count" in trail:
+                trail["favorite_count"] = count
+            if "is_favorite" in trail:
+                trail["is_favorite"] = is_favorite
+        return hashlib.sha256(repr(sorted(live.items())).encode()).hexdigest()[:16]
+
+    @action(
+        detail=True,
+        methods=["post", "delete"],
+        permission_classes=[IsAuthenticated],
+        pagination_class=None,
+    )
+    def favorite(self, request, pk=None):
+        """POST saves the trail to the hiker's favorites, DELETE removes it."""
+        profile_id = hiker_profile_id(request)
+        if profile_id is None:
+            return Response(
+                {"error": "Register the hiker before saving favorites"}, status=403
+            )
+        trail = get_object_or_404(
+            Trail.objects.filter(removed_at__isnull=True).only("id"), pk=pk
+        )
+        # Trail.favorite_count follows through user_profile.signals
+        if request.method == "POST":
+            Favorite.objects.get_or_create(user_profile_id=profile_id, trail=trail)
+        else:
+            Favorite.objects.filter(user_profile_id=profile_id, trail=trail).delete()
+        trail.refresh_from_db(fields=["favorite_count"])
+        return Response(
+            {
+                "trail": trail.id,
+                "is_favorite": request.method == "POST",
+                "favorite_count": trail.favorite_count,
+            }
+        )
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    @catalog_cached
+    def search(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"error": "q is required"}, status=400)
+        try:
+            limit = min(
+                int(request.query_params.get("limit", SEARCH_DEFAULT_LIMIT)),
+                SEARCH_MAX_LIMIT,
+            )
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+
+        results = search_trails(query)[: max(limit, 1)]
+        return Response(TrailSearchResultSerializer(results, many=True).data)
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def trending(self, request):
+        """The most navigated trails lately, everywhere or in one region.
+
+        ?region=z/x/y names a region tile, ?near=lat,lng the region around a point.
+        """
+        params = request.query_params
+        try:
+            limit = min(
+                int(params.get("limit", TRENDING_DEFAULT_LIMIT)), TRENDING_MAX_LIMIT
+            )
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+
+        region = params.get("region")
+        if params.get("near"):
+            try:
+                lat, lng = parse_float_list(params["near"], 2)
+            except ValueError:
+                return Response({"error": "near must be lat,lng"}, status=400)
+            region = region_for(lat, lng)
+        elif region is not None:
+            try:
+                z, x, y = (int(part) for part in region.split("/"))
+            except ValueError:
+                z = x = y = None
+            if z != REGION_ZOOM or not is_valid_tile(z, x, y):
+                return Response(
+                    {"error": f"region must be a zoom {REGION_ZOOM} tile z/x/y"},
+                    status=400,
+                )
+        return Response(top_trending(region, max(limit, 1)))
+
+    @action(detail=True, methods=["get"], pagination_class=None)
+    def similar(self, request, pk=None):
+        """Trails most like this one; ?personalized=1 leans towards the hiker's
+        own navigation history and leaves out trails they have been on."""
+        if request.query_params.get("personalized") in ("1", "true"):
+            if not request.user.is_authenticated:
+                raise NotAuthenticated("personalized=1 needs a signed-in hiker")
+            # one hiker's own list, so it bypasses the shared catalog cache
+            response = self.similar_to(request, pk, user=request.user)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return self.catalog_similar(request, pk=pk)
+
+    @catalog_cached
+    def catalog_similar(self, request, pk=None):
+        return self.similar_to(request, pk)
+
+    def similar_to(self, request, pk, user=None):
+        try:
+            limit = min(
+                int(request.query_params.get("limit", SIMILAR_DEFAULT_LIMIT)),
+                SIMILAR_MAX_LIMIT,
+            )
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        trail = get_object_or_404(Trail.objects.filter(removed_at__isnull=True), pk=pk)
+        neighbours = similar_trails(trail, max(limit, 1), user=user)
+        # hard-deleted trails can linger in the index until its next rebuild
+        trails = Trail.objects.filter(removed_at__isnull=True).in_bulk(
+            [trail_id for trail_id, _ in neighbours]
+        )
+        results = []
+        for trail_id, distance in neighbours:
+            if trail_id in trails:
+                trails[trail_id].similarity_distance = distance
+                results.append(trails[trail_id])
+        return Response(SimilarTrailSerializer(results, many=True).data)
+
+
+def start_session(user, trail):
+    """End whatever the user left running, then start navigating ``trail``."""
+    end_active_sessions(user)
+    session = NavigationSession.objects.create(
+        trail=trail, user=user, status="started", is_active=True
+    )
+    record_start(session)
+    return session
+
+
+def end_session(session):
+    """Stop a session and roll it up (see session_stopped)."""
+    session.status = "stopped"
+    session.is_active = False
+    session.ended_at = timezone.now()
+    finalize_stats(session)
+    session.save()
+    session_stopped(session)
+
+
+def session_stopped(session):
+    """Feed a saved, stopped session to its hiker's rollup and its trail's trend."""
+    record_session(session)
+    record_finish(session)
+
+
+def end_active_sessions(user):
+    """End whatever the user left running; starting a new session does this."""
+    with transaction.atomic():
+        for session in (
+            NavigationSession.objects.select_for_update(of=("self",))
+            .select_related("trail")
+            .filter(user=user, is_active=True)
+        ):
+            end_session(session)
 
 
 class StartNavigationView(APIView):
+    permission_classes = [IsAuthenticated]
 
     def post(self, request):
         trail_id = request.data.get("trail")
@@ -24,43 +407,158 @@ class StartNavigationView(APIView):
             return Response({"error": "Trail ID is required"}, status=400)
 
         try:
-            trail = Trail.objects.get(id=trail_id)
-        except Trail.DoesNotExist:
+            # trails removed upstream cannot be started, like they cannot be found
+            trail = Trail.objects.get(id=trail_id, removed_at__isnull=True)
+        except (Trail.DoesNotExist, ValueError):
             return Response({"error": "Trail not found"}, status=404)
 
-        # End any active sessions first
-        NavigationSession.objects.filter(user=request.user, is_active=True).update(
-            is_active=False, status="stopped"
-        )
-
-        session = NavigationSession.objects.create(
-            trail=trail, user=request.user, status="started", is_active=True
-        )
+        session = start_session(request.user, trail)
         return Response(NavigationSessionSerializer(session).data, status=201)
 
 
 class UpdateGPSView(APIView):
+    """Accepts a single {latitude, longitude} fix or a batch {"points": [...]}."""
+
+    permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        latitude = request.data.get("latitude")
-        longitude = request.data.get("longitude")
+        if "points" in request.data:
+            return self.post_batch(request)
 
-        try:
-            session = NavigationSession.objects.get(user=request.user, is_active=True)
-        except NavigationSession.DoesNotExist:
-            return Response({"error": "No active navigation session"}, status=400)
+        point = GPSPointSerializer(data=request.data)
+        if not point.is_valid():
+            return Response({"error": point.errors}, status=400)
+        point = point.validated_data
+
+        with transaction.atomic():
+            try:
+                session = NavigationSession.objects.select_for_update().get(
+                    user=request.user, is_active=True
+                )
+            except NavigationSession.DoesNotExist:
+                return Response({"error": "No active navigation session"}, status=400)
+
+            gps_log = GPSLog.objects.create(
+                session=session,
+                latitude=point["latitude"],
+                longitude=point["longitude"],
+                timestamp=point.get("timestamp", timezone.now()),
+            )
+            if is_late(session, gps_log.timestamp):
+                recompute_session_stats(session)
+            else:
+                apply_fix(
+                    session, gps_log.latitude, gps_log.longitude, gps_log.timestamp
+                )
+            event = RouteTracker(session).update(
+                gps_log.latitude, gps_log.longitude, gps_log.timestamp
+            )
+            session.save(update_fields=STATS_FIELDS + ROUTE_FIELDS)
+            prompts = PromptScheduler(session)
+            triggered = prompts.check(
+                gps_log.latitude, gps_log.longitude, gps_log.timestamp
+            )
+            prompts.save()
+
+        data = GPSLogSerializer(gps_log).data
+        data["stats"] = NavigationStatsSerializer(session).data
+        data["prompts"] = triggered
+        data["route_events"] = [event] if event else []
+        return Response(data, status=201)
+
+    def post_batch(self, request):
+        # before any point is validated, so an oversized batch costs nothing
+        raw_points = request.data["points"]
+        if isinstance(raw_points, list) and len(raw_points) > MAX_GPS_BATCH:
+            return Response(
+                {"error": f"At most {MAX_GPS_BATCH} points per batch"}, status=400
+            )
+        points = GPSPointSerializer(data=raw_points, many=True)
+        if not points.is_valid():
+            return Response({"error": points.errors}, status=400)
+        points = points.validated_data
+        if not points:
+            return Response({"error": "points must not be empty"}, status=400)
+
+        with transaction.atomic():
+            try:
+                session = NavigationSession.objects.select_for_update().get(
+                    user=request.user, is_active=True
+                )
+            except NavigationSession.DoesNotExist:
+                return Response({"error": "No active navigation session"}, status=400)
 
-        gps_log = GPSLog.objects.create(
-            session=session, latitude=latitude, longitude=longitude
+            # a retried upload resends seqs we already stored; drop those (and
+            # repeats within the batch) up front. The row lock above serializes
+            # uploads per session, the unique constraint is a last line of defence
+            seqs = {point["seq"] for point in points if "seq" in point}
+            seen = set(
+                GPSLog.objects.filter(session=session, client_seq__in=seqs).values_list(
+                    "client_seq", flat=True
+                )
+            )
+            now = timezone.now()
+            logs = []
+            for point in points:
+                seq = point.get("seq")
+                if seq is not None:
+                    if seq in seen:
+                        continue
+                    seen.add(seq)
+                logs.append(
+                    GPSLog(
+                        session=session,
+                        latitude=point["latitude"],
+                        longitude=point["longitude"],
+                        timestamp=point.get("timestamp", now),
+                        client_seq=seq,
+                    )
+                )
+            GPSLog.objects.bulk_create(logs, ignore_conflicts=True)
+
+            # offline buffers can arrive out of order; fold them in time order
+            prompts = PromptScheduler(session)
+            route = RouteTracker(session)
+            triggered, events = [], []
+            late = False
+            for log in sorted(logs, key=lambda log: log.timestamp):
+                if is_late(session, log.timestamp):
+                    late = True
+                else:
+                    apply_fix(session, log.latitude, log.longitude, log.timestamp)
+                triggered += prompts.check(log.latitude, log.longitude, log.timestamp)
+                event = route.update(log.latitude, log.longitude, log.timestamp)
+                if event:
+                    events.append(event)
+            if late:
+                # part of an offline buffer predates fixes already folded in
+                recompute_session_stats(session)
+            session.save(update_fields=STATS_FIELDS + ROUTE_FIELDS)
+            prompts.save()
+
+        return Response(
+            {
+                "session": session.id,
+                "received": len(points),
+                "accepted": len(logs),
+                "duplicates": len(points) - len(logs),
+                "last_seq": max(seqs) if seqs else None,
+                "stats": NavigationStatsSerializer(session).data,
+                "prompts": triggered,
+                "route_events": events,
+            },
+            status=201,
         )
-        return Response(GPSLogSerializer(gps_log).data, status=201)
 
 
 class PauseNavigationView(APIView):
+    permission_classes = [IsAuthenticated]
 
     def post(self, request):
         try:
-            session = NavigationSession.objects.get(user=request.user, is_active=True)
+            session = NavigationSession.objects.select_related("track").get(
+                user=request.user, is_active=True
+            )
         except NavigationSession.DoesNotExist:
             return Response({"error": "No active session"}, status=400)
 
@@ -70,24 +568,229 @@ class PauseNavigationView(APIView):
 
 
 class StopNavigationView(APIView):
+    permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        with transaction.atomic():
+            try:
+                # locked, so a repeated stop cannot roll the session up twice
+                session = (
+                    NavigationSession.objects.select_for_update(of=("self",))
+                    .select_related("trail", "track")
+                    .get(user=request.user, is_active=True)
+                )
+            except NavigationSession.DoesNotExist:
+                return Response({"error": "No active session"}, status=400)
+            end_session(session)
+        return Response(NavigationSessionSerializer(session).data)
+
+
+class NavigationHistoryView(APIView):
+    """Paginated session summaries; tracks are fetched per session on demand."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        sessions = NavigationSession.objects.filter(user=request.user).select_related(
+            "trail"
+        )
+        paginator = SessionCursorPagination()
+        page = paginator.paginate_queryset(sessions, request, view=self)
+        serializer = NavigationSessionSummarySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class SessionTrackView(APIView):
+    """A session's track, Douglas-Peucker simplified to ?max_points= / ?tolerance=."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id):
         try:
-            session = NavigationSession.objects.get(user=request.user, is_active=True)
+            session = NavigationSession.objects.select_related("track").get(
+                id=session_id, user=request.user
+            )
         except NavigationSession.DoesNotExist:
-            return Response({"error": "No active session"}, status=400)
+            return Response({"error": "Session not found"}, status=404)
 
-        session.status = "stopped"
-        session.is_active = False
-        session.ended_at = timezone.now()
-        session.save()
-        return Response(NavigationSessionSerializer(session).data)
+        try:
+            max_points = int(
+                request.query_params.get("max_points", TRACK_DEFAULT_POINTS)
+            )
+            tolerance = float(request.query_params.get("tolerance", 0))
+        except ValueError:
+            return Response(
+                {"error": "max_points must be an integer and tolerance a number"},
+                status=400,
+            )
+        if not 2 <= max_points <= TRACK_MAX_POINTS or tolerance < 0:
+            return Response(
+                {
+                    "error": f"max_points must be between 2 and {TRACK_MAX_POINTS} "
+                    "and tolerance (metres) non-negative"
+                },
+                status=400,
+            )
 
+        points = session_points(session)
+        simplified = simplify_track(
+            points, tolerance_m=tolerance, max_points=max_points
+        )
+        return Response(
+            {
+                "session": session.id,
+                "point_count": len(points),
+                "returned": len(simplified),
+                "points": [
+                    {"latitude": lat, "longitude": lng, "timestamp": ts}
+                    for lat, lng, ts in simplified
+                ],
+            }
+        )
 
-class NavigationHistoryView(APIView):
+
+class RouteView(APIView):
+    """Shortest walking route between two trailheads: ?from=<trail id>&to=<trail id>."""
 
     def get(self, request):
-        sessions = NavigationSession.objects.filter(user=request.user).order_by(
-            "-started_at"
+        try:
+            start_id = int(request.query_params["from"])
+            goal_id = int(request.query_params["to"])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "from and to must be trail ids"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        for _ in range(2):
+            try:
+                route = get_graph().shortest_path(start_id, goal_id)
+            except KeyError:
+                return Response({"error": "Trail not found"}, status=404)
+            if route is None:
+                return Response({"error": "No route between these trails"}, status=404)
+
+            distance_m, trail_ids, segment_ids = route
+            trails = Trail.objects.filter(removed_at__isnull=True).in_bulk(trail_ids)
+            segments = TrailSegment.objects.in_bulk(segment_ids)
+            if len(trails) == len(trail_ids) and len(segments) == len(segment_ids):
+                break
+            # trails or segments went away after the graph was read
+            invalidate_graph()
+        else:
+            return Response(
+                {"error": "The trail network changed, try again"}, status=409
+            )
+
+        # stitch segment geometry in travel order, flipping reversed traversals
+        coordinates = [[trails[trail_ids[0]].lat, trails[trail_ids[0]].long]]
+        for from_id, segment_id, to_id in zip(trail_ids, segment_ids, trail_ids[1:]):
+            segment = segments[segment_id]
+            if segment.path is not None:
+                line = [[lat, lng] for lng, lat in segment.path.coords]
+                if segment.start_id != from_id:
+                    line.reverse()
+                coordinates.extend(line[1:])
+            else:
+                coordinates.append([trails[to_id].lat, trails[to_id].long])
+
+        return Response(
+            {
+                "from": start_id,
+                "to": goal_id,
+                "distance_m": round(distance_m, 1),
+                "distance_km": round(distance_m / 1000, 3),
+                "trails": [
+                    {"id": trail_id, "name": trails[trail_id].name}
+                    for trail_id in trail_ids
+                ],
+                "segments": segment_ids,
+                "coordinates": coordinates,
+            }
+        )
+
+
+class ElevationProfileView(APIView):
+    """Elevation profile, gain and loss from the local DEM.
+
+    POST {"points": [[lat, lng], ...]} or {"session": <id>} (own sessions only),
+    optionally with "samples": the route is resampled to that many evenly
+    spaced points (default ELEVATION_DEFAULT_SAMPLES, 0 keeps the originals).
+    """
+
+    def post(self, request):
+        try:
+            samples = int(request.data.get("samples", ELEVATION_DEFAULT_SAMPLES))
+        except (TypeError, ValueError):
+            samples = -1
+        if not 0 <= samples <= ELEVATION_MAX_POINTS:
+            return Response(
+                {"error": f"samples must be between 0 and {ELEVATION_MAX_POINTS}"},
+                status=400,
+            )
+
+        if "session" in request.data:
+            if not request.user.is_authenticated:
+                self.permission_denied(request)
+            try:
+                session = NavigationSession.objects.select_related("track").get(
+                    id=request.data["session"], user=request.user
+                )
+            except (NavigationSession.DoesNotExist, ValueError, TypeError):
+                return Response({"error": "Session not found"}, status=404)
+            points = [(lat, lng) for lat, lng, _ in session_points(session)]
+        else:
+            points = request.data.get("points")
+            try:
+                points = [(float(lat), float(lng)) for lat, lng in points]
+            except (TypeError, ValueError):
+                return Response(
+                    {"error": "points must be a list of [latitude, longitude] pairs"},
+                    status=400,
+                )
+        if not 2 <= len(points) <= ELEVATION_MAX_POINTS:
+            return Response(
+                {"error": f"between 2 and {ELEVATION_MAX_POINTS} points are required"},
+                status=400,
+            )
+
+        lats, lngs = zip(*points)
+        try:
+            profile = elevation_profile(get_dem_store(), lats, lngs, samples)
+        except NoElevationData as e:
+            return Response({"error": str(e)}, status=422)
+
+        return Response(
+            {
+                "distance_m": round(float(profile["distance_m"][-1]), 1),
+                "gain_m": round(profile["gain_m"], 1),
+                "loss_m": round(profile["loss_m"], 1),
+                "profile": [
+                    {
+                        "latitude": float(lat),
+                        "longitude": float(lng),
+                        "distance_m": round(float(distance), 1),
+                        "elevation_m": round(float(elevation), 1),
+                    }
+                    for lat, lng, distance, elevation in zip(
+                        profile["latitude"],
+                        profile["longitude"],
+                        profile["distance_m"],
+                        profile["elevation_m"],
+                    )
+                ],
+            }
+        )
+
+
+class TrailTileView(APIView):
+    """Mapbox vector tile of trailheads and segment lines (see trail_nav.tiles)."""
+
+    def get(self, request, z, x, y):
+        if not is_valid_tile(z, x, y):
+            return Response({"error": "Tile out of range"}, status=404)
+        response = HttpResponse(
+            get_tile(z, x, y), content_type="application/vnd.mapbox-vector-tile"
         )
-        return Response(NavigationSessionSerializer(sessions, many=True).data)
+        response["Cache-Control"] = f"public, max-age={TILE_MAX_AGE_SECONDS}"
+        return response
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import NavigationConsumer
+
+websocket_urlpatterns = [
+    path("ws/nav/", NavigationConsumer.as_asgi()),
+]
@@ -0,0 +1,225 @@
+"""Per-hiker activity rollups: totals, streaks, points and level.
+
+Every stopped NavigationSession is folded into its owner's ActivityRollup once,
+when it stops (record_session), so profile and leaderboard reads never touch
+the session history. rebuild_rollups() replays the same step function over
+every stopped session for backfills and repairs. The leaderboard is a LIMIT
+over the (points DESC, user) index and a hiker's rank a bounded count along
+it, so neither sorts the table.
+"""
+
+import bisect
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ActivityRollup, Profile, User
+
+# shorter than this is a start/stop tap, not a hike
+MIN_HIKE_DISTANCE_M = 200
+METERS_PER_MILE = 1609.344
+POINTS_PER_KM = 10
+POINTS_PER_HIKE = 25
+POINTS_PER_100_FT = 5
+POINTS_PER_STREAK_DAY = 10
+# (minimum points, level), ascending
+LEVELS = [
+    (0, "Trailhead"),
+    (250, "Day Hiker"),
+    (1000, "Backpacker"),
+    (5000, "Trailblazer"),
+    (20000, "Summit Seeker"),
+]
+REBUILD_BATCH_SIZE = 2000
+# ranks are exact within this many places of the top
+RANK_EXACT_LIMIT = 10_000
+
+
+def level_for(points):
+    thresholds = [minimum for minimum, _ in LEVELS]
+    return LEVELS[bisect.bisect_right(thresholds, points) - 1][1]
+
+
+def points_for(rollup):
+    # only ever grows: every term is a running total or a maximum
+    return int(
+        rollup.distance_m / 1000 * POINTS_PER_KM
+        + rollup.hikes * POINTS_PER_HIKE
+        + rollup.elevation_ft / 100 * POINTS_PER_100_FT
+        + rollup.longest_streak * POINTS_PER_STREAK_DAY
+    )
+
+
+def is_hike(session):
+    return not session.is_active and session.distance_m >= MIN_HIKE_DISTANCE_M
+
+
+def climbed_ft(session):
+    """The trail's elevation gain, pro rata to how much of it was walked."""
+    trail = session.trail
+    gain = max(trail.elevation, 0)
+    if trail.distance > 0:
+        return gain * min(1.0, session.distance_m / (trail.distance * METERS_PER_MILE))
+    return float(gain)
+
+
+def hike_day(session):
+    return timezone.localdate(session.ended_at or session.started_at)
+
+
+def apply_session(rollup, session):
+    """Fold one stopped session into the rollup (does not save).
+
+    Sessions must arrive in the order they ended, which is how they stop.
+    Returns False for sessions too short to count.
+    """
+    if not is_hike(session):
+        return False
+    rollup.hikes += 1
+    rollup.distance_m += session.distance_m
+    rollup.moving_seconds += session.moving_seconds
+    rollup.elevation_ft += climbed_ft(session)
+
+    day = hike_day(session)
+    last = rollup.last_hike_on
+    if last is None or day > last + datetime.timedelta(days=1):
+        rollup.current_streak = 1
+    elif day == last + datetime.timedelta(days=1):
+        rollup.current_streak += 1
+    rollup.last_hike_on = day if last is None else max(last, day)
+    rollup.longest_streak = max(rollup.longest_streak, rollup.current_streak)
+
+    rollup.points = points_for(rollup)
+    rollup.level = level_for(rollup.points)
+    return True
+
+
+def current_streak(rollup, today=None):
+    """The streak as of today: it lapses once a whole day passes without a hike."""
+    today = today or timezone.localdate()
+    if rollup.last_hike_on is None:
+        return 0
+    if rollup.last_hike_on < today - datetime.timedelta(days=1):
+        return 0
+    return rollup.current_streak
+
+
+def record_session(session):
+    """Fold a session that just stopped into its owner's rollup and profile.
+
+    A row lock, the rollup write and the profile mirror; sessions too short to
+    count touch nothing. Call it once per session, when it stops, with
+    ``session.trail`` loaded.
+    """
+    if not is_hike(session):
+        return None
+    with transaction.atomic():
+        rollup, _ = ActivityRollup.objects.select_for_update().get_or_create(
+            user_id=session.user_id
+        )
+        apply_session(rollup, session)
+        rollup.save()
+        Profile.objects.filter(user__account_id=session.user_id).update(
+            points=rollup.points, level=rollup.level
+        )
+    return rollup
+
+
+def rebuild_rollups(user_ids=None):
+    """Recompute rollups from every stopped session, then mirror them to profiles.
+
+    Runs in one transaction, so readers see the old totals until it commits.
+    Returns the number of rollups written.
+    """
+    from trail_nav.models import NavigationSession
+
+    sessions = (
+        NavigationSession.objects.filter(
+            is_active=False, distance_m__gte=MIN_HIKE_DISTANCE_M
+        )
+        .select_related("trail")
+        .only(
+            "user",
+            "is_active",
+            "distance_m",
+            "moving_seconds",
+            "started_at",
+            "ended_at",
+            "trail__distance",
+            "trail__elevation",
+        )
+        .annotate(ended=Coalesce("ended_at", "started_at"))
+        .order_by("user_id", "ended", "id")
+    )
+    rollups = ActivityRollup.objects.all()
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch, rollup = [], None
+        for session in sessions.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            if rollup is None or rollup.user_id != session.user_id:
+                rollup = ActivityRollup(user_id=session.user_id)
+                batch.append(rollup)
+                if len(batch) > REBUILD_BATCH_SIZE:
+                    # every rollup but the one still being filled is complete
+                    ActivityRollup.objects.bulk_create(batch[:-1])
+                    written += len(batch) - 1
+                    batch = batch[-1:]
+            apply_session(rollup, session)
+        ActivityRollup.objects.bulk_create(batch)
+        written += len(batch)
+        mirror_profiles(user_ids)
+    return written
+
+
+def mirror_profiles(user_ids=None):
+    """Copy points and level onto Profile for the given accounts (all by default).
+
+    Hikers without a rollup go back to a new profile's 0 points and no level.
+    """
+    where, params = "", []
+    if user_ids is not None:
+        where, params = "AND u.account_id = ANY(%s)", [list(user_ids)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {Profile._meta.db_table} AS p
+            SET points = COALESCE(r.points, 0), level = r.level
+            FROM {User._meta.db_table} AS u
+            LEFT JOIN {ActivityRollup._meta.db_table} AS r
+                ON r.user_id = u.account_id
+            WHERE p.user_id = u.id {where}
+            """,
+            params,
+        )
+
+
+def leaderboard(limit):
+    """The top ``limit`` rollups with their hikers, highest points first."""
+    return list(
+        ActivityRollup.objects.select_related("user__hiker").order_by(
+            "-points", "user_id"
+        )[:limit]
+    )
+
+
+def rank_of(rollup, limit=RANK_EXACT_LIMIT):
+    """1-based position on the leaderboard, or None below the first ``limit``.
+
+    Ties go to the older account. Counting the hikers ahead walks the index,
+    so the walk is capped: an exact rank deep in a million hikers would cost a
+    scan of most of the index on every request.
+    """
+    ahead = (
+        ActivityRollup.objects.filter(points__gte=rollup.points)
+        .filter(Q(points__gt=rollup.points) | Q(user_id__lt=rollup.user_id))[:limit]
+        .count()
+    )
+    return ahead + 1 if ahead < limit else None
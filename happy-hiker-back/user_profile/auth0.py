@@ -1,12 +1,8 @@
-import json
-import requests
 from jose import jwt
-from django.conf import settings
 from django.http import JsonResponse
 
-AUTH0_DOMAIN = settings.AUTH0_DOMAIN
-API_IDENTIFIER = settings.AUTH0_AUDIENCE
-ALGORITHMS = ["RS256"]
+from .jwks import UnknownKeyError, get_verifier
+
 
 def requires_auth(view_func):
     def wrapper(request, *args, **kwargs):
@@ -20,40 +16,16 @@ def requires_auth(view_func):
 
         token = parts[1]
 
-        jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-        jwks = requests.get(jwks_url).json()
-
-        unverified_header = jwt.get_unverified_header(token)
-
-        rsa_key = {}
-        for key in jwks["keys"]:
-            if key["kid"] == unverified_header["kid"]:
-                rsa_key = {
-                    "kty": key["kty"],
-                    "kid": key["kid"],
-                    "use": key["use"],
-                    "n": key["n"],
-                    "e": key["e"],
-                }
-
-        if rsa_key:
-            try:
-                payload = jwt.decode(
-                    token,
-                    rsa_key,
-                    algorithms=ALGORITHMS,
-                    audience=API_IDENTIFIER,
-                    issuer=f"https://{AUTH0_DOMAIN}/"
-                )
-                request.user_payload = payload
-            except jwt.ExpiredSignatureError:
-                return JsonResponse({"message": "Token expired"}, status=401)
-            except jwt.JWTClaimsError:
-                return JsonResponse({"message": "Incorrect claims"}, status=401)
-            except Exception as e:
-                return JsonResponse({"message": f"Token error: {str(e)}"}, status=401)
-        else:
+        try:
+            request.user_payload = get_verifier().verify(token)
+        except UnknownKeyError:
             return JsonResponse({"message": "Unable to find RSA key"}, status=401)
+        except jwt.ExpiredSignatureError:
+            return JsonResponse({"message": "Token expired"}, status=401)
+        except jwt.JWTClaimsError:
+            return JsonResponse({"message": "Incorrect claims"}, status=401)
+        except Exception as e:
+            return JsonResponse({"message": f"Token error: {str(e)}"}, status=401)
 
         return view_func(request, *args, **kwargs)
 
@@ -0,0 +1,188 @@
+"""Auth0 identities: the registration upsert and the sub -> ids cache.
+
+An Auth0 ``sub`` names three rows: the Django account (AUTH_USER_MODEL, whose
+username is the sub; navigation sessions belong to it), the hiker
+(user_profile.User, linked to the account by ``account``) and the hiker's
+Profile. Registration writes the hiker and its profile in one INSERT ... ON
+CONFLICT statement that leaves an unchanged row alone. Authentication then
+resolves a sub to all three ids once per process and serves them from an LRU,
+so an authenticated request needs no identity query at all.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+Identity = namedtuple("Identity", ["account_id", "hiker_id", "profile_id"])
+Hiker = namedtuple(
+    "Hiker", ["id", "auth0_id", "name", "email", "created", "profile_id", "account_id"]
+)
+
+UPSERT_SQL = """
+WITH upsert AS (
+    INSERT INTO user_profile_user AS u (auth0_id, name, email, account_id)
+    VALUES (
+        %(auth0_id)s, %(name)s, %(email)s,
+        (SELECT id FROM {account_table} WHERE {username_column} = %(auth0_id)s)
+    )
+    ON CONFLICT (auth0_id) DO UPDATE SET
+        name = COALESCE(NULLIF(u.name, ''), EXCLUDED.name),
+        email = CASE WHEN u.email = '' THEN EXCLUDED.email ELSE u.email END,
+        account_id = COALESCE(u.account_id, EXCLUDED.account_id)
+    -- a returning hiker's row is only written when this login fills a gap
+    WHERE (NULLIF(u.name, '') IS NULL AND EXCLUDED.name IS NOT NULL)
+       OR (u.email = '' AND EXCLUDED.email <> '')
+       OR (u.account_id IS NULL AND EXCLUDED.account_id IS NOT NULL)
+    RETURNING u.id, u.auth0_id, u.name, u.email, u.xmax = 0 AS created,
+              u.account_id
+),
+hiker AS (
+    SELECT * FROM upsert
+    UNION ALL
+    SELECT id, auth0_id, name, email, false, account_id FROM user_profile_user
+    WHERE auth0_id = %(auth0_id)s AND NOT EXISTS (SELECT 1 FROM upsert)
+),
+new_profile AS (
+    INSERT INTO user_profile_profile (user_id, points)
+    SELECT hiker.id, 0 FROM hiker
+    WHERE NOT EXISTS (
+        SELECT 1 FROM user_profile_profile p WHERE p.user_id = hiker.id
+    )
+    ON CONFLICT (user_id) DO NOTHING
+    RETURNING id, user_id
+)
+SELECT h.id, h.auth0_id, h.name, h.email, h.created, COALESCE(n.id, p.id),
+       h.account_id
+FROM hiker h
+LEFT JOIN new_profile n ON n.user_id = h.id
+LEFT JOIN user_profile_profile p ON p.user_id = h.id
+"""
+
+
+class IdentityCache:
+    """Bounded LRU of sub -> Identity; only complete identities are kept."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sub):
+        with self._lock:
+            identity = self._entries.get(sub)
+            if identity is not None:
+                self._entries.move_to_end(sub)
+            return identity
+
+    def set(self, sub, identity):
+        if None in identity or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[sub] = identity
+            self._entries.move_to_end(sub)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def forget(self, sub=None):
+        with self._lock:
+            if sub is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(sub, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_identity_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = IdentityCache(settings.AUTH0_IDENTITY_CACHE_SIZE)
+    return _cache
+
+
+def forget_identity(sub=None, **kwargs):
+    get_identity_cache().forget(sub)
+
+
+def register_hiker(auth0_id, name=None, email=None):
+    """Create or complete the hiker for an Auth0 sub; returns a Hiker."""
+    Account = get_user_model()
+    sql = UPSERT_SQL.format(
+        account_table=connection.ops.quote_name(Account._meta.db_table),
+        username_column=connection.ops.quote_name(
+            Account._meta.get_field(Account.USERNAME_FIELD).column
+        ),
+    )
+    params = {"auth0_id": auth0_id, "name": name or None, "email": email or ""}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+        if row is None:
+            # a concurrent first login committed after this statement's
+            # snapshot; the retry's snapshot sees it
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    hiker = Hiker(*row)
+    if hiker.account_id is not None:
+        get_identity_cache().set(
+            auth0_id, Identity(hiker.account_id, hiker.id, hiker.profile_id)
+        )
+    return hiker
+
+
+def resolve_identity(sub):
+    """The Identity for a sub, creating the account on first sight."""
+    from .models import User as HikerUser
+
+    cache = get_identity_cache()
+    identity = cache.get(sub)
+    if identity is not None:
+        return identity
+
+    account, _ = get_user_model().objects.get_or_create(
+        **{get_user_model().USERNAME_FIELD: sub}
+    )
+    hiker_id = profile_id = None
+    row = (
+        HikerUser.objects.filter(auth0_id=sub)
+        .values_list("id", "account_id", "profile__id")
+        .first()
+    )
+    if row is not None:
+        hiker_id, account_id, profile_id = row
+        if account_id is None:
+            HikerUser.objects.filter(id=hiker_id).update(account=account)
+    identity = Identity(account.id, hiker_id, profile_id)
+    # a sub that has not registered yet is resolved again next time
+    cache.set(sub, identity)
+    return identity
+
+
+def account_for(sub):
+    """The account for a sub as a deferred instance; no query on a cache hit.
+
+    Only the primary key and username are loaded, other fields are fetched on
+    first access. ``identity`` carries the hiker and profile ids.
+    """
+    identity = resolve_identity(sub)
+    Account = get_user_model()
+    account = Account.from_db(
+        None, ["id", Account.USERNAME_FIELD], [identity.account_id, sub]
+    )
+    account.identity = identity
+    return account
+
+
+def identity_for(account):
+    """The Identity of an authenticated account, however it was loaded."""
+    identity = getattr(account, "identity", None)
+    if identity is None:
+        identity = resolve_identity(account.get_username())
+    return identity
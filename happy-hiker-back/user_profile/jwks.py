@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from jose import jwt
+
+ALGORITHMS = ["RS256"]
+
+
+class UnknownKeyError(Exception):
+    pass
+
+
+class JWKSCache:
+    """Process-wide cache of an issuer's signing keys.
+
+    Keys are refetched when the TTL lapses or a token names a kid we have not
+    seen (key rotation). Refreshes are single-flight: concurrent requests wait
+    on one fetch instead of each calling Auth0, and fetches are rate limited
+    (min_refresh_interval since the last attempt, failed or not) so garbage
+    tokens or a JWKS outage cannot hammer the endpoint or stall requests.
+    """
+
+    def __init__(self, url, ttl=3600, min_refresh_interval=30, session=None):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.session = session or requests.Session()
+        self._keys = {}
+        self._fetched_at = None
+        self._last_attempt = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self):
+        return (
+            self._fetched_at is not None
+            and time.monotonic() - self._fetched_at < self.ttl
+        )
+
+    def _may_attempt(self):
+        return (
+            self._last_attempt is None
+            or time.monotonic() - self._last_attempt >= self.min_refresh_interval
+        )
+
+    def _refresh(self, started_waiting):
+        with self._lock:
+            # someone else tried while we waited for the lock; their outcome is ours
+            if self._last_attempt is not None and self._last_attempt >= started_waiting:
+                return
+            try:
+                response = self.session.get(self.url, timeout=5)
+                response.raise_for_status()
+                keys = response.json()["keys"]
+            except (requests.RequestException, ValueError, KeyError):
+                self._last_attempt = time.monotonic()
+                if not self._keys:
+                    raise UnknownKeyError("Unable to fetch signing keys")
+                # keep serving the keys we have; _may_attempt spaces out retries
+                return
+            self._keys = {
+                key["kid"]: {
+                    "kty": key["kty"],
+                    "kid": key["kid"],
+                    "use": key["use"],
+                    "n": key["n"],
+                    "e": key["e"],
+                }
+                for key in keys
+            }
+            self._fetched_at = self._last_attempt = time.monotonic()
+
+    def get_key(self, kid):
+        if not self._is_fresh() and self._may_attempt():
+            self._refresh(time.monotonic())
+        key = self._keys.get(kid)
+        if key is None and self._may_attempt():
+            self._refresh(time.monotonic())
+            key = self._keys.get(kid)
+        if key is None:
+            raise UnknownKeyError("Unable to find RSA key")
+        return key
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of already-verified token payloads, keyed by token hash.
+
+    Entries are only served until the token's own ``exp``, so caching never
+    extends a token's lifetime.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, token, payload):
+        expires_at = payload.get("exp")
+        if not expires_at or self.maxsize <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class TokenVerifier:
+    def __init__(self, jwks, audience, issuer, token_cache=None):
+        self.jwks = jwks
+        self.audience = audience
+        self.issuer = issuer
+        self.token_cache = token_cache
+
+    def verify(self, token):
+        """Return the token's claims; raises jose.JWTError or UnknownKeyError."""
+        if self.token_cache is not None:
+            payload = self.token_cache.get(token)
+            if payload is not None:
+                return payload
+
+        header = jwt.get_unverified_header(token)
+        key = self.jwks.get_key(header.get("kid"))
+        payload = jwt.decode(
+            token,
+            key,
+            algorithms=ALGORITHMS,
+            audience=self.audience,
+            issuer=self.issuer,
+        )
+        if self.token_cache is not None:
+            self.token_cache.set(token, payload)
+        return payload
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    """The process-wide verifier for the configured Auth0 tenant."""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = TokenVerifier(
+                    JWKSCache(
+                        f"https://{settings.AUTH0_DOMAIN}/.well-known/jwks.json",
+                        ttl=settings.AUTH0_JWKS_TTL,
+                    ),
+                    audience=settings.AUTH0_AUDIENCE,
+                    issuer=f"https://{settings.AUTH0_DOMAIN}/",
+                    token_cache=VerifiedTokenCache(settings.AUTH0_TOKEN_CACHE_SIZE),
+                )
+    return _verifier
@@ -0,0 +1,114 @@
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+import rsa
+from django.core.management.base import BaseCommand
+from jose import jwt
+
+from user_profile.jwks import JWKSCache, TokenVerifier, VerifiedTokenCache
+
+AUDIENCE = "http://happyhiker/api"
+ISSUER = "https://bench.local/"
+
+
+def b64_int(value):
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def make_signing_key(kid, bits=2048):
+    public, private = rsa.newkeys(bits)
+    jwk = {
+        "kty": "RSA",
+        "kid": kid,
+        "use": "sig",
+        "n": b64_int(public.n),
+        "e": b64_int(public.e),
+    }
+    return private.save_pkcs1().decode(), jwk
+
+
+def serve_jwks(jwks):
+    body = json.dumps(jwks).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark per-request Auth0 token verification against a local JWKS stand-in"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--users", type=int, default=50, help="distinct tokens in rotation"
+        )
+
+    def handle(self, *args, **options):
+        pem, jwk = make_signing_key("bench-key")
+        server = serve_jwks({"keys": [jwk]})
+        url = f"http://127.0.0.1:{server.server_port}/.well-known/jwks.json"
+        tokens = [
+            jwt.encode(
+                {
+                    "sub": f"auth0|bench{i}",
+                    "aud": AUDIENCE,
+                    "iss": ISSUER,
+                    "exp": int(time.time()) + 3600,
+                },
+                pem,
+                algorithm="RS256",
+                headers={"kid": "bench-key"},
+            )
+            for i in range(options["users"])
+        ]
+
+        scenarios = [
+            # the old behaviour: a fresh (unpooled) JWKS fetch on every request
+            (
+                "JWKS fetch + RSA verify",
+                TokenVerifier(
+                    JWKSCache(url, ttl=0, session=requests), AUDIENCE, ISSUER
+                ),
+            ),
+            (
+                "cached JWKS + RSA verify",
+                TokenVerifier(JWKSCache(url), AUDIENCE, ISSUER),
+            ),
+            (
+                "cached JWKS + verified-token LRU",
+                TokenVerifier(
+                    JWKSCache(url), AUDIENCE, ISSUER, token_cache=VerifiedTokenCache()
+                ),
+            ),
+        ]
+        try:
+            for label, verifier in scenarios:
+                count = options["requests"]
+                start = time.perf_counter()
+                for i in range(count):
+                    verifier.verify(tokens[i % len(tokens)])
+                per_request = (time.perf_counter() - start) / count * 1000
+                self.stdout.write(f"{label:<36} {per_request:9.3f} ms/request")
+        finally:
+            server.shutdown()
+
+        self.stdout.write(self.style.SUCCESS("🎉 Auth benchmark complete."))
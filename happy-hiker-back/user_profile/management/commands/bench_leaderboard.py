@@ -0,0 +1,199 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from trail_nav.management.commands._bench import Rollback, format_summary, time_call
+from trail_nav.models import NavigationSession, Trail
+from user_profile.activity import (
+    LEVELS,
+    RANK_EXACT_LIMIT,
+    leaderboard,
+    level_for,
+    rank_of,
+    rebuild_rollups,
+    record_session,
+)
+from user_profile.models import ActivityRollup, User
+
+PREFIX = "bench-leaderboard-"
+
+
+class Command(BaseCommand):
+    help = (
+        "Leaderboard top-K and rank lookups over synthetic rollups (1M hikers by "
+        "default), and a session stop rolled up incrementally vs from history"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument(
+            "--history", type=int, default=1_000, help="sessions of the rebuilt hiker"
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def seed(self, count, seed):
+        # generate_series keeps seeding 1M hikers to a few round trips
+        levels = " ".join(
+            f"WHEN points >= {minimum} THEN '{name}'"
+            for minimum, name in reversed(LEVELS)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(%s)", [(seed % 1000) / 1000])
+            cursor.execute(
+                f"""
+                INSERT INTO {get_user_model()._meta.db_table}
+                    (password, is_superuser, username, first_name, last_name,
+                     email, is_staff, is_active, date_joined)
+                SELECT '!', false, %s || n, '', '', '', false, true, now()
+                FROM generate_series(1, %s) AS n
+                """,
+                [PREFIX, count],
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {User._meta.db_table} (auth0_id, name, email, account_id)
+                SELECT username, 'Hiker ' || id, username || '@bench.example', id
+                FROM {get_user_model()._meta.db_table}
+                WHERE username LIKE %s
+                """,
+                [PREFIX + "%"],
+            )
+            # heavy-tailed points, so the low end is full of ties
+            cursor.execute(
+                f"""
+                INSERT INTO {ActivityRollup._meta.db_table}
+                    (user_id, hikes, distance_m, moving_seconds, elevation_ft,
+                     current_streak, longest_streak, last_hike_on, points, level,
+                     updated_at)
+                SELECT id, hikes, hikes * 8000.0, hikes * 7200.0, hikes * 900.0,
+                       0, least(hikes, 30), current_date, points,
+                       CASE {levels} END, now()
+                FROM (
+                    SELECT id, floor(exp(random() * 6))::int AS hikes,
+                           floor(exp(random() * 11))::int AS points
+                    FROM {get_user_model()._meta.db_table}
+                    WHERE username LIKE %s
+                ) AS seeded
+                """,
+                [PREFIX + "%"],
+            )
+            cursor.execute(f"ANALYZE {ActivityRollup._meta.db_table}")
+
+    def handle(self, *args, **options):
+        limit, repeat = options["limit"], options["repeat"]
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"🌱 Seeding {options['users']} hikers with activity rollups..."
+                )
+                self.seed(options["users"], options["seed"])
+                table = ActivityRollup._meta.db_table
+
+                plan = (
+                    ActivityRollup.objects.order_by("-points", "user_id")[:limit]
+                    .explain()
+                    .splitlines()
+                )
+                self.stdout.write(f"🔎 {' / '.join(line.strip() for line in plan[:2])}")
+                self.stdout.write(
+                    format_summary(
+                        f"top {limit}, indexed",
+                        time_call(lambda: leaderboard(limit), repeat),
+                    )
+                )
+
+                def full_sort():
+                    # points + 0 hides the index: a scan and a top-N sort
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            f"SELECT user_id, points FROM {table} "
+                            "ORDER BY points + 0 DESC, user_id LIMIT %s",
+                            [limit],
+                        )
+                        cursor.fetchall()
+
+                self.stdout.write(
+                    format_summary(
+                        f"top {limit}, full sort", time_call(full_sort, repeat)
+                    )
+                )
+
+                # fresh rows are not all-visible yet, so these counts also read
+                # the heap; on a vacuumed table they are index-only
+                ordered = ActivityRollup.objects.order_by("-points", "user_id")
+                count = ordered.count()
+                for label, position in [
+                    ("top", 0),
+                    ("#1000", min(999, count - 1)),
+                    (f"#{RANK_EXACT_LIMIT}", min(RANK_EXACT_LIMIT - 1, count - 1)),
+                    ("median", count // 2),
+                    ("last", count - 1),
+                ]:
+                    rollup = ordered[position]
+                    expected = position + 1 if position < RANK_EXACT_LIMIT else None
+                    assert rank_of(rollup) == expected
+                    samples = time_call(lambda: rank_of(rollup), repeat)
+                    self.stdout.write(
+                        format_summary(f"rank of the {label} hiker", samples)
+                    )
+                    unbounded = time_call(lambda: rank_of(rollup, limit=count), 5)
+                    self.stdout.write(format_summary("  ...uncapped count", unbounded))
+
+                self.bench_stop(options["history"], repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data rolled back).")
+        )
+
+    def bench_stop(self, history, repeat):
+        """Rolling one stopped session in vs recomputing a hiker from history."""
+        trail = Trail.objects.create(
+            name="Bench Ridge", lat=37.7, long=-119.5, distance=5, elevation=1200
+        )
+        account = get_user_model().objects.get(username=f"{PREFIX}1")
+        ended = timezone.now() - timedelta(days=history)
+        NavigationSession.objects.bulk_create(
+            NavigationSession(
+                trail=trail,
+                user=account,
+                is_active=False,
+                status="stopped",
+                distance_m=8000,
+                moving_seconds=7200,
+                ended_at=ended + timedelta(days=n),
+            )
+            for n in range(history)
+        )
+
+        stopped = NavigationSession(
+            trail=trail,
+            user=account,
+            is_active=False,
+            status="stopped",
+            distance_m=8000,
+            moving_seconds=7200,
+            started_at=timezone.now(),
+            ended_at=timezone.now(),
+        )
+        self.stdout.write(
+            format_summary(
+                "stop: incremental rollup",
+                time_call(lambda: record_session(stopped), repeat),
+            )
+        )
+        self.stdout.write(
+            format_summary(
+                f"stop: rebuild from {history} sessions",
+                time_call(lambda: rebuild_rollups([account.id]), repeat),
+            )
+        )
+        rollup = ActivityRollup.objects.get(user=account)
+        assert rollup.hikes == history and rollup.level == level_for(rollup.points)
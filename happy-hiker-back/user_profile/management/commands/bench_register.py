@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connection
+
+from trail_nav.management.commands._bench import summarize
+from user_profile.identity import (
+    forget_identity,
+    get_identity_cache,
+    register_hiker,
+    resolve_identity,
+)
+from user_profile.models import User
+
+PREFIX = "auth0|bench-register-"
+
+
+def legacy_register(auth0_id, name, email):
+    """The get_or_create + save() registration the upsert replaced."""
+    user, created = User.objects.get_or_create(auth0_id=auth0_id)
+    if created or not user.name or not user.email:
+        if name:
+            user.name = name
+        if email:
+            user.email = email
+        user.save()
+    return user
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent /user/register/ logins: get_or_create + save vs one upsert, "
+        "then identity resolution with and without the cache"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--logins", type=int, default=200, help="per thread")
+        parser.add_argument("--hikers", type=int, default=2_000)
+        parser.add_argument(
+            "--returning",
+            type=float,
+            default=0.9,
+            help="share of logins by hikers who already registered",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        # worker threads use their own connections, so rows are committed and
+        # deleted afterwards rather than rolled back
+        try:
+            for label, register in [
+                ("get_or_create + save", legacy_register),
+                ("INSERT ... ON CONFLICT", register_hiker),
+            ]:
+                self.cleanup()
+                self.run(label, register, options)
+            self.bench_identity(options)
+        finally:
+            self.cleanup()
+
+        self.stdout.write(
+            self.style.SUCCESS("🎉 Benchmark complete (seed data removed).")
+        )
+
+    def cleanup(self):
+        User.objects.filter(auth0_id__startswith=PREFIX).delete()
+        get_user_model().objects.filter(username__startswith=PREFIX).delete()
+        forget_identity()
+
+    def run(self, label, register, options):
+        hikers = options["hikers"]
+        # the returning share registers up front, as yesterday's logins
+        returning = int(hikers * options["returning"])
+        for n in range(returning):
+            register_hiker(f"{PREFIX}{n}", f"Hiker {n}", f"{n}@bench.example")
+
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            mine, failed = [], 0
+            try:
+                for _ in range(options["logins"]):
+                    n = rng.randrange(hikers)
+                    began = time.perf_counter()
+                    try:
+                        register(f"{PREFIX}{n}", f"Hiker {n}", f"{n}@bench.example")
+                    except IntegrityError:
+                        # two first logins raced past get_or_create's SELECT
+                        failed += 1
+                        continue
+                    mine.append((time.perf_counter() - began) * 1000)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(mine)
+                    errors.append(failed)
+
+        threads = [
+            threading.Thread(target=worker, args=(options["seed"] + i,))
+            for i in range(options["threads"])
+        ]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        stats = summarize(latencies)
+        self.stdout.write(
+            f"🔑 {label:<24} {len(latencies) / elapsed:>8.0f} logins/s"
+            f"  median {stats['median_ms']:>7.3f} ms  p95 {stats['p95_ms']:>7.3f} ms"
+            f"  ({sum(errors)} errors, {options['threads']} threads)"
+        )
+
+    def bench_identity(self, options):
+        # stay within the cache so the cached pass measures hits, not evictions
+        count = min(options["hikers"], 500, get_identity_cache().maxsize)
+        subs = [f"{PREFIX}{n}" for n in range(count)]
+        for sub in subs:
+            resolve_identity(sub)
+        for label, clear in [("identity, uncached", True), ("identity, cached", False)]:
+            began = time.perf_counter()
+            for sub in subs:
+                if clear:
+                    get_identity_cache().forget(sub)
+                resolve_identity(sub)
+            per_request = (time.perf_counter() - began) / len(subs) * 1000
+            self.stdout.write(f"🪪 {label:<24} {per_request:9.3f} ms/request")
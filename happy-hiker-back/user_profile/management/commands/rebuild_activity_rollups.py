@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from user_profile.activity import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild activity rollups and Profile points/levels from stopped "
+        "navigation sessions (backfill / repair)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="only this account id (repeatable); every account by default",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(options["user_ids"])
+        self.stdout.write(
+            self.style.SUCCESS(f"🏔️  Rebuilt activity rollups for {written} hikers.")
+        )
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def link_accounts(apps, schema_editor):
+    User = apps.get_model('user_profile', 'User')
+    Account = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    accounts = dict(
+        Account.objects.filter(
+            username__in=User.objects.exclude(auth0_id=None).values('auth0_id')
+        ).values_list('username', 'id')
+    )
+    for hiker in User.objects.filter(auth0_id__in=accounts):
+        hiker.account_id = accounts[hiker.auth0_id]
+        hiker.save(update_fields=['account'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='account',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hiker', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(link_accounts, migrations.RunPython.noop),
+    ]
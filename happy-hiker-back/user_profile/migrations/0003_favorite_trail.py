@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def drop_orphans_and_duplicates(apps, schema_editor):
+    Favorite = apps.get_model('user_profile', 'Favorite')
+    Trail = apps.get_model('trail_nav', 'Trail')
+    Favorite.objects.exclude(trail_id__in=Trail.objects.values('id')).delete()
+    keep = (
+        Favorite.objects.values('user_profile', 'trail_id')
+        .annotate(first=Min('id'))
+        .values('first')
+    )
+    Favorite.objects.exclude(id__in=keep).delete()
+
+
+def count_favorites(apps, schema_editor):
+    Favorite = apps.get_model('user_profile', 'Favorite')
+    Trail = apps.get_model('trail_nav', 'Trail')
+    counts = (
+        Favorite.objects.filter(trail=OuterRef('pk'))
+        .values('trail')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    Trail.objects.update(favorite_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trail_nav', '0015_trail_favorite_count'),
+        ('user_profile', '0002_user_account'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_orphans_and_duplicates, migrations.RunPython.noop),
+        # same trail_id column, now a foreign key with an index
+        migrations.RenameField(
+            model_name='favorite',
+            old_name='trail_id',
+            new_name='trail',
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='trail',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='trail_nav.trail'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user_profile', 'trail'), name='unique_favorite'),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+    ]
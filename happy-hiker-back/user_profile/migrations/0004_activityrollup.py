@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0003_favorite_trail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('hikes', models.PositiveIntegerField(default=0)),
+                ('distance_m', models.FloatField(default=0)),
+                ('moving_seconds', models.FloatField(default=0)),
+                ('elevation_ft', models.FloatField(default=0)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('last_hike_on', models.DateField(blank=True, null=True)),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('level', models.CharField(blank=True, max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-points', 'user'], name='rollup_leaderboard_idx')],
+            },
+        ),
+    ]
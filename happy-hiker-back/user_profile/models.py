@@ -1,9 +1,19 @@
+from django.conf import settings
 from django.db import models
 
 class User(models.Model):
     auth0_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     name = models.CharField(max_length=255, null=True)
     email = models.EmailField(unique=True)
+    # the Django account (username = auth0_id) that owns navigation sessions;
+    # see user_profile.identity
+    account = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="hiker",
+    )
 
     def __str__(self):
         return f"{self.name} {self.email}"
@@ -21,6 +31,54 @@ class Profile(models.Model):
 
 class Favorite(models.Model):
     user_profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
-    trail_id = models.IntegerField() 
+    trail = models.ForeignKey(
+        "trail_nav.Trail", on_delete=models.CASCADE, related_name="favorites"
+    )
     added_on = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # also the index behind a hiker's is_favorite lookups
+            models.UniqueConstraint(
+                fields=["user_profile", "trail"], name="unique_favorite"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_profile_id} -> {self.trail_id}"
+
+
+
+class ActivityRollup(models.Model):
+    """A hiker's lifetime totals, folded in per stopped session.
+
+    Maintained by user_profile.activity; Profile.points and level mirror
+    points and level here. Keyed by the Django account that owns the sessions.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="activity",
+    )
+    hikes = models.PositiveIntegerField(default=0)
+    distance_m = models.FloatField(default=0)
+    moving_seconds = models.FloatField(default=0)
+    elevation_ft = models.FloatField(default=0)
+    # consecutive days with a hike, ending on last_hike_on
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_hike_on = models.DateField(null=True, blank=True)
+    points = models.PositiveIntegerField(default=0)
+    level = models.CharField(max_length=50, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # the leaderboard is a LIMIT over this, and a rank a count along it
+            models.Index(fields=["-points", "user"], name="rollup_leaderboard_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.points} points"
@@ -0,0 +1,47 @@
+from rest_framework import serializers
+
+from .activity import current_streak
+from .models import ActivityRollup
+
+
+class ActivityRollupSerializer(serializers.ModelSerializer):
+    distance_km = serializers.SerializerMethodField()
+    current_streak = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ActivityRollup
+        fields = [
+            "hikes",
+            "distance_km",
+            "moving_seconds",
+            "elevation_ft",
+            "current_streak",
+            "longest_streak",
+            "last_hike_on",
+            "points",
+            "level",
+        ]
+
+    def get_distance_km(self, obj):
+        return round(obj.distance_m / 1000, 3)
+
+    def get_current_streak(self, obj):
+        return current_streak(obj)
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    rank = serializers.IntegerField(read_only=True)
+    name = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ActivityRollup
+        fields = ["rank", "name", "points", "level", "hikes", "distance_km"]
+
+    def get_name(self, obj):
+        # never the account username, which is the Auth0 sub
+        hiker = getattr(obj.user, "hiker", None)
+        return hiker.name if hiker is not None and hiker.name else "Anonymous hiker"
+
+    def get_distance_km(self, obj):
+        return round(obj.distance_m / 1000, 3)
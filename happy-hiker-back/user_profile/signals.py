@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from trail_nav.models import Trail
+
+from .identity import forget_identity
+from .models import Favorite, User
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def account_deleted(sender, instance, **kwargs):
+    forget_identity(instance.get_username())
+
+
+@receiver(post_delete, sender=User)
+def hiker_deleted(sender, instance, **kwargs):
+    if instance.auth0_id:
+        forget_identity(instance.auth0_id)
+
+
+# Trail.favorite_count moves with single saves and deletes, cascades included;
+# an UPDATE rather than a catalog write, so cached trail pages stay warm
+@receiver(post_save, sender=Favorite)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        Trail.objects.filter(pk=instance.trail_id).update(
+            favorite_count=F("favorite_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_removed(sender, instance, **kwargs):
+    Trail.objects.filter(pk=instance.trail_id, favorite_count__gt=0).update(
+        favorite_count=F("favorite_count") - 1
+    )
@@ -1,6 +1,387 @@
-from django.test import TestCase
+import datetime
+import json
+import random
+import threading
+import time
+from io import StringIO
 
-# Create your tests here.
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase
+from django.utils import timezone
+from jose import jwt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
 
+from trail_nav.models import NavigationSession, Trail
 
+from .activity import apply_session, current_streak, rank_of, record_session
+from .authentication import Auth0JWTAuthentication
+from .identity import IdentityCache, forget_identity, identity_for, register_hiker
+from .jwks import JWKSCache, TokenVerifier, UnknownKeyError, VerifiedTokenCache
+from .management.commands.bench_auth import make_signing_key
+from .models import ActivityRollup, Profile, User
 
+AUDIENCE = "http://happyhiker/api"
+ISSUER = "https://test.local/"
+
+
+class FakeJWKSEndpoint:
+    """Stands in for requests.Session, counting JWKS fetches."""
+
+    def __init__(self, keys, delay=0):
+        self.keys = keys
+        self.delay = delay
+        self.calls = 0
+        self.down = False
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.down:
+            raise requests.ConnectionError("JWKS endpoint unreachable")
+        endpoint = self
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return {"keys": list(endpoint.keys)}
+
+        return Response()
+
+
+class TokenCachingTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pem, cls.jwk = make_signing_key("key-1", bits=1024)
+
+    def token(self, sub="auth0|hiker", exp_in=3600, kid="key-1"):
+        claims = {
+            "sub": sub,
+            "aud": AUDIENCE,
+            "iss": ISSUER,
+            "exp": int(time.time()) + exp_in,
+        }
+        return jwt.encode(claims, self.pem, algorithm="RS256", headers={"kid": kid})
+
+    def test_jwks_is_fetched_once_within_ttl(self):
+        endpoint = FakeJWKSEndpoint([self.jwk])
+        verifier = TokenVerifier(JWKSCache("jwks", session=endpoint), AUDIENCE, ISSUER)
+        for i in range(5):
+            self.assertEqual(verifier.verify(self.token(f"user{i}"))["sub"], f"user{i}")
+        self.assertEqual(endpoint.calls, 1)
+
+    def test_concurrent_refresh_is_single_flight(self):
+        endpoint = FakeJWKSEndpoint([self.jwk], delay=0.05)
+        cache = JWKSCache("jwks", session=endpoint)
+        threads = [
+            threading.Thread(target=cache.get_key, args=("key-1",)) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(endpoint.calls, 1)
+
+    def test_unknown_kid_refreshes_once_then_is_rate_limited(self):
+        endpoint = FakeJWKSEndpoint([self.jwk])
+        cache = JWKSCache("jwks", session=endpoint, min_refresh_interval=0)
+        cache.get_key("key-1")
+        rotated = dict(self.jwk, kid="key-2")
+        endpoint.keys.append(rotated)
+        self.assertEqual(cache.get_key("key-2")["kid"], "key-2")
+        self.assertEqual(endpoint.calls, 2)
+
+        cache.min_refresh_interval = 60
+        with self.assertRaises(UnknownKeyError):
+            cache.get_key("not-a-key")
+        self.assertEqual(endpoint.calls, 2)
+
+    def test_outage_does_not_refetch_for_every_unknown_kid(self):
+        endpoint = FakeJWKSEndpoint([self.jwk])
+        cache = JWKSCache("jwks", session=endpoint)
+        cache.get_key("key-1")
+        # the TTL lapses during an outage
+        endpoint.down = True
+        cache._fetched_at -= cache.ttl + 1
+        cache._last_attempt -= cache.ttl + 1
+        self.assertEqual(cache.get_key("key-1")["kid"], "key-1")
+        self.assertEqual(endpoint.calls, 2)
+
+        for i in range(20):
+            with self.assertRaises(UnknownKeyError):
+                cache.get_key(f"unknown-{i}")
+            cache.get_key("key-1")
+        self.assertEqual(endpoint.calls, 2)
+
+    def test_token_without_subject_fails_authentication(self):
+        for payload in [{}, {"sub": None}, {"sub": ""}, {"sub": 7}]:
+            with self.subTest(payload=payload):
+                with self.assertRaises(AuthenticationFailed):
+                    Auth0JWTAuthentication().get_user(payload)
+
+    def test_verified_tokens_are_cached_until_exp(self):
+        token_cache = VerifiedTokenCache(maxsize=2)
+        token = self.token()
+        token_cache.set(token, {"sub": "a", "exp": time.time() + 60})
+        self.assertEqual(token_cache.get(token)["sub"], "a")
+        token_cache.set(token, {"sub": "a", "exp": time.time() - 1})
+        self.assertIsNone(token_cache.get(token))
+
+    def test_token_lru_is_bounded(self):
+        token_cache = VerifiedTokenCache(maxsize=2)
+        for name in ["a", "b", "c"]:
+            token_cache.set(name, {"sub": name, "exp": time.time() + 60})
+        self.assertIsNone(token_cache.get("a"))
+        self.assertEqual(token_cache.get("c")["sub"], "c")
+
+    def test_expired_token_is_rejected(self):
+        endpoint = FakeJWKSEndpoint([self.jwk])
+        verifier = TokenVerifier(
+            JWKSCache("jwks", session=endpoint),
+            AUDIENCE,
+            ISSUER,
+            token_cache=VerifiedTokenCache(),
+        )
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            verifier.verify(self.token(exp_in=-10))
+
+
+class RegistrationTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.addCleanup(forget_identity)
+
+    def register(self, **data):
+        return self.client.post(
+            "/user/register/", json.dumps(data), content_type="application/json"
+        )
+
+    def test_first_login_creates_hiker_and_profile(self):
+        body = self.register(auth0_id="auth0|new", name="Ada", email="ada@x.io").json()
+        self.assertTrue(body["created"])
+        hiker = User.objects.get(auth0_id="auth0|new")
+        self.assertEqual((hiker.name, hiker.email), ("Ada", "ada@x.io"))
+        self.assertTrue(Profile.objects.filter(user=hiker).exists())
+
+    def test_returning_login_is_one_statement_and_no_write(self):
+        self.register(auth0_id="auth0|back", name="Ada", email="ada@x.io")
+        with self.assertNumQueries(1):
+            body = self.register(
+                auth0_id="auth0|back", name="Someone Else", email="other@x.io"
+            ).json()
+        self.assertFalse(body["created"])
+        self.assertEqual((body["name"], body["email"]), ("Ada", "ada@x.io"))
+        self.assertEqual(Profile.objects.filter(user__auth0_id="auth0|back").count(), 1)
+
+    def test_missing_fields_are_filled_in(self):
+        self.register(auth0_id="auth0|gap", email="gap@x.io")
+        body = self.register(auth0_id="auth0|gap", name="Grace").json()
+        self.assertEqual((body["name"], body["email"]), ("Grace", "gap@x.io"))
+
+    def test_auth0_id_is_required(self):
+        self.assertEqual(self.register(name="Nobody").status_code, 400)
+
+
+class IdentityCacheTests(TestCase):
+    def setUp(self):
+        self.addCleanup(forget_identity)
+
+    def test_authenticated_requests_resolve_identity_once(self):
+        Client().post(
+            "/user/register/",
+            json.dumps({"auth0_id": "auth0|nav", "email": "nav@x.io"}),
+            content_type="application/json",
+        )
+        authentication = Auth0JWTAuthentication()
+        account = authentication.get_user({"sub": "auth0|nav"})
+        hiker = User.objects.get(auth0_id="auth0|nav")
+        self.assertEqual(hiker.account_id, account.id)
+        self.assertEqual(identity_for(account).profile_id, hiker.profile.id)
+
+        with self.assertNumQueries(0):
+            again = authentication.get_user({"sub": "auth0|nav"})
+        self.assertEqual(again.pk, account.pk)
+        self.assertEqual(again.get_username(), "auth0|nav")
+
+    def test_unregistered_subs_are_not_cached(self):
+        account = Auth0JWTAuthentication().get_user({"sub": "auth0|later"})
+        self.assertIsNone(identity_for(account).hiker_id)
+        Client().post(
+            "/user/register/",
+            json.dumps({"auth0_id": "auth0|later", "email": "later@x.io"}),
+            content_type="application/json",
+        )
+        # registration linked the existing account and cached the identity
+        self.assertEqual(
+            User.objects.get(auth0_id="auth0|later").account_id, account.id
+        )
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(
+                identity_for(
+                    Auth0JWTAuthentication().get_user({"sub": "auth0|later"})
+                ).hiker_id
+            )
+
+    def test_deleting_an_account_forgets_it(self):
+        Client().post(
+            "/user/register/",
+            json.dumps({"auth0_id": "auth0|gone", "email": "gone@x.io"}),
+            content_type="application/json",
+        )
+        account = Auth0JWTAuthentication().get_user({"sub": "auth0|gone"})
+        get_user_model().objects.filter(pk=account.pk).delete()
+        fresh = Auth0JWTAuthentication().get_user({"sub": "auth0|gone"})
+        self.assertNotEqual(fresh.pk, account.pk)
+
+    def test_lru_is_bounded(self):
+        cache = IdentityCache(maxsize=2)
+        for n in range(3):
+            cache.set(f"sub{n}", (n, n, n))
+        self.assertIsNone(cache.get("sub0"))
+        self.assertEqual(cache.get("sub2"), (2, 2, 2))
+
+
+class ActivityRollupTests(TestCase):
+    def setUp(self):
+        self.addCleanup(forget_identity)
+        self.trail = Trail.objects.create(
+            name="Ridge", lat=37.0, long=-119.0, distance=5, elevation=1000
+        )
+        self.account = self.make_hiker("auth0|walker")
+        self.client = APIClient()
+        self.client.force_authenticate(self.account)
+
+    def make_hiker(self, sub):
+        account = get_user_model().objects.create(username=sub)
+        register_hiker(sub, sub.split("|")[1].title(), f"{sub.split('|')[1]}@x.io")
+        return account
+
+    def stop(self, distance_m):
+        NavigationSession.objects.create(
+            trail=self.trail,
+            user=self.account,
+            distance_m=distance_m,
+            moving_seconds=distance_m,
+        )
+        return self.client.post("/api/nav/stop/")
+
+    def session_on(self, day, distance_m=5000, user=None):
+        at = datetime.datetime(2026, 5, day, 12, tzinfo=datetime.timezone.utc)
+        return NavigationSession(
+            trail=self.trail,
+            user=user or self.account,
+            is_active=False,
+            status="stopped",
+            distance_m=distance_m,
+            started_at=at,
+            ended_at=at,
+        )
+
+    def test_stopping_a_hike_updates_rollup_and_profile(self):
+        self.assertEqual(self.stop(8000).status_code, 200)
+        rollup = ActivityRollup.objects.get(user=self.account)
+        self.assertEqual((rollup.hikes, rollup.distance_m), (1, 8000))
+        # 8 km of a 5 mile trail climbs almost all of its 1000 ft
+        self.assertAlmostEqual(rollup.elevation_ft, 994.19, places=2)
+        # 80 for distance, 25 for the hike, 49.7 for the climb, 10 for the streak
+        self.assertEqual((rollup.points, rollup.level), (164, "Trailhead"))
+        profile = Profile.objects.get(user__account=self.account)
+        self.assertEqual((profile.points, profile.level), (164, "Trailhead"))
+
+        data = self.client.get("/user/activity/").json()
+        self.assertEqual((data["hikes"], data["distance_km"]), (1, 8.0))
+        self.assertEqual(data["current_streak"], 1)
+
+    def test_short_sessions_and_repeated_stops_count_nothing(self):
+        self.stop(50)
+        self.assertFalse(ActivityRollup.objects.exists())
+        data = self.client.get("/user/activity/").json()
+        self.assertEqual((data["hikes"], data["level"]), (0, "Trailhead"))
+
+        self.stop(5000)
+        self.assertEqual(self.client.post("/api/nav/stop/").status_code, 400)
+        self.assertEqual(ActivityRollup.objects.get(user=self.account).hikes, 1)
+
+    def test_starting_a_new_session_rolls_up_the_old_one(self):
+        NavigationSession.objects.create(
+            trail=self.trail, user=self.account, distance_m=5000
+        )
+        self.client.post("/api/nav/start/", {"trail": self.trail.id}, format="json")
+        self.assertEqual(ActivityRollup.objects.get(user=self.account).hikes, 1)
+
+    def test_streaks_follow_consecutive_days(self):
+        rollup = ActivityRollup(user=self.account)
+        for day in [1, 2, 2, 3, 5, 6]:
+            apply_session(rollup, self.session_on(day))
+        self.assertEqual((rollup.current_streak, rollup.longest_streak), (2, 3))
+        self.assertEqual(current_streak(rollup, datetime.date(2026, 5, 7)), 2)
+        self.assertEqual(current_streak(rollup, datetime.date(2026, 5, 8)), 0)
+
+    def test_rebuild_matches_incremental_updates(self):
+        rng = random.Random(3)
+        accounts = [self.account] + [
+            self.make_hiker(f"auth0|hiker{n}") for n in range(3)
+        ]
+        sessions = [
+            self.session_on(
+                rng.randint(1, 20), rng.choice([100, 900, 4000, 12000]), account
+            )
+            for account in accounts
+            for _ in range(12)
+        ]
+        sessions.sort(key=lambda session: session.ended_at)
+        for session in sessions:
+            session.save()
+            record_session(session)
+
+        fields = ["hikes", "current_streak", "longest_streak", "last_hike_on"]
+        fields += ["points", "level", "distance_m", "elevation_ft"]
+        incremental = list(ActivityRollup.objects.order_by("user").values(*fields))
+        profiles = list(Profile.objects.order_by("id").values("points", "level"))
+        ActivityRollup.objects.update(points=0, hikes=0)
+        Profile.objects.update(points=0, level=None)
+
+        call_command("rebuild_activity_rollups", stdout=StringIO())
+        rebuilt = list(ActivityRollup.objects.order_by("user").values(*fields))
+        self.assertEqual(len(rebuilt), len(incremental))
+        for before, after in zip(incremental, rebuilt):
+            for field in ["distance_m", "elevation_ft"]:
+                self.assertAlmostEqual(before.pop(field), after.pop(field), places=6)
+            self.assertEqual(before, after)
+        self.assertEqual(
+            list(Profile.objects.order_by("id").values("points", "level")), profiles
+        )
+
+    def test_leaderboard_is_one_indexed_query(self):
+        accounts = [self.account] + [
+            self.make_hiker(f"auth0|hiker{n}") for n in range(4)
+        ]
+        ActivityRollup.objects.bulk_create(
+            ActivityRollup(user=account, points=points)
+            for account, points in zip(accounts, [50, 300, 300, 10, 900])
+        )
+        with self.assertNumQueries(1):
+            data = APIClient().get("/user/leaderboard/", {"limit": 3}).json()
+        self.assertEqual(
+            [
+                (entry["rank"], entry["name"], entry["points"])
+                for entry in data["results"]
+            ],
+            [(1, "Hiker3", 900), (2, "Hiker0", 300), (3, "Hiker1", 300)],
+        )
+        self.assertNotIn("me", data)
+
+        # the page, the caller's rollup and the count of hikers ahead
+        with self.assertNumQueries(3):
+            data = self.client.get("/user/leaderboard/", {"limit": 10}).json()
+        self.assertEqual(len(data["results"]), 5)
+        self.assertEqual((data["me"]["rank"], data["me"]["name"]), (4, "Walker"))
+
+        last = ActivityRollup.objects.get(points=10)
+        self.assertEqual(rank_of(last), 5)
+        self.assertIsNone(rank_of(last, limit=4))
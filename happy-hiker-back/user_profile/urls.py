@@ -1,8 +1,10 @@
 # user_profile/urls.py
 
 from django.urls import path
-from .views import register_or_get_user
+from .views import ActivityView, LeaderboardView, register_or_get_user
 
 urlpatterns = [
     path("register/", register_or_get_user, name="register_user"),
+    path("activity/", ActivityView.as_view(), name="activity"),
+    path("leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
 ]
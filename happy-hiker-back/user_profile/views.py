@@ -1,8 +1,17 @@
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
-from .models import User
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .activity import leaderboard, level_for, rank_of
+from .identity import register_hiker
+from .models import ActivityRollup
+from .serializers import ActivityRollupSerializer, LeaderboardEntrySerializer
 import json
 
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
 @csrf_exempt
 def register_or_get_user(request):
     if request.method == "POST":
@@ -15,21 +24,15 @@ def register_or_get_user(request):
             if not auth0_id:
                 return JsonResponse({"error": "auth0_id is required"}, status=400)
 
-            user, created = User.objects.get_or_create(auth0_id=auth0_id)
-
-            if created or not user.name or not user.email:
-                if name:
-                    user.name = name
-                if email:
-                    user.email = email
-                user.save()
+            # one upsert statement; a returning login with nothing new is a no-op
+            user = register_hiker(auth0_id, name, email)
 
             return JsonResponse({
                 "message": "User retrieved or created successfully",
                 "auth0_id": user.auth0_id,
                 "name": user.name,
                 "email": user.email,
-                "created": created
+                "created": user.created
             })
 
         except Exception as e:
@@ -38,4 +41,42 @@ def register_or_get_user(request):
     return JsonResponse({"error": "Only POST allowed"}, status=405)
 
 
-    return JsonResponse({"error": "Only POST allowed"}, status=405)
+class ActivityView(APIView):
+    """The hiker's totals, read from their rollup rather than their sessions."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        rollup = ActivityRollup.objects.filter(user_id=request.user.pk).first()
+        if rollup is None:
+            rollup = ActivityRollup(user_id=request.user.pk, level=level_for(0))
+        return Response(ActivityRollupSerializer(rollup).data)
+
+
+class LeaderboardView(APIView):
+    """Top hikers by points; an indexed LIMIT, plus the caller's own rank."""
+
+    def get(self, request):
+        try:
+            limit = min(
+                int(request.query_params.get("limit", LEADERBOARD_DEFAULT_LIMIT)),
+                LEADERBOARD_MAX_LIMIT,
+            )
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+
+        entries = leaderboard(max(limit, 1))
+        for rank, rollup in enumerate(entries, start=1):
+            rollup.rank = rank
+        data = {"results": LeaderboardEntrySerializer(entries, many=True).data}
+
+        if request.user.is_authenticated:
+            mine = (
+                ActivityRollup.objects.select_related("user__hiker")
+                .filter(user_id=request.user.pk)
+                .first()
+            )
+            if mine is not None:
+                mine.rank = rank_of(mine)
+            data["me"] = mine and LeaderboardEntrySerializer(mine).data
+        return Response(data)
@@ -26,6 +26,35 @@ const Map = ({
 
     const currentMap = map.current
 
+    // Every trail in view, served as vector tiles by the backend
+    currentMap.on("load", () => {
+      if (currentMap.getSource("trails")) return
+      currentMap.addSource("trails", {
+        type: "vector",
+        tiles: ["http://localhost:8000/api/tiles/trails/{z}/{x}/{y}.pbf"],
+        maxzoom: 16,
+      })
+      currentMap.addLayer({
+        id: "trail-segments",
+        type: "line",
+        source: "trails",
+        "source-layer": "segments",
+        paint: { "line-color": "#2E7D32", "line-width": 2 },
+      })
+      currentMap.addLayer({
+        id: "trailheads",
+        type: "circle",
+        source: "trails",
+        "source-layer": "trailheads",
+        paint: {
+          "circle-color": "#2E7D32",
+          "circle-radius": 4,
+          "circle-stroke-color": "#FFFFFF",
+          "circle-stroke-width": 1,
+        },
+      })
+    })
+
     // Add route
     if (trailCoordinates && trailCoordinates.length > 0) {
       currentMap.on("load", () => {
@@ -89,7 +118,9 @@ const Map = ({
     }
 
     // Add info overlay
-    if (distance && elevationGain) {
+    if (distance) {
+      // null when the route is outside the elevation data
+      const gain = elevationGain != null ? `${elevationGain} ft` : "unknown"
       const infoDiv = document.createElement("div")
       infoDiv.style.position = "absolute"
       infoDiv.style.top = "10px"
@@ -99,7 +130,7 @@ const Map = ({
       infoDiv.style.borderRadius = "3px"
       infoDiv.innerHTML = `
                 <strong>Distance:</strong> ${distance.miles} mi (${distance.km} km)<br>
-                <strong>Elevation Gain:</strong> ${elevationGain} ft
+                <strong>Elevation Gain:</strong> ${gain}
             `
       mapContainer.current.appendChild(infoDiv)
     }
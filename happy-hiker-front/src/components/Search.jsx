@@ -1,5 +1,12 @@
-import { useState, useEffect, useRef } from "react"
+import { useState, useEffect, useRef, useCallback } from "react"
 import axios from "axios"
+import { useAuth0 } from "@auth0/auth0-react"
+
+const TRAILS_URL = "http://localhost:8000/api/trails/"
+const SEARCH_URL = `${TRAILS_URL}search/`
+const PAGE_SIZE = 24
+const SUGGESTION_LIMIT = 10
+const SUGGESTION_DELAY_MS = 250
 
 const Search = ({ onSearch }) => {
   const [destinationPoint, setDestinationPoint] = useState("")
@@ -8,27 +15,51 @@ const Search = ({ onSearch }) => {
   const [filteredTrails, setFilteredTrails] = useState([])
   const [startPointError, setStartPointError] = useState("")
   const [destinationPointError, setDestinationPointError] = useState("")
-  const [trails, setTrails] = useState([])
   const [isFirstSelection, setIsFirstSelection] = useState(true)
-  const [visibleResults, setVisibleResults] = useState(12)
+  const [nextPage, setNextPage] = useState(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
+  const [query, setQuery] = useState("")
+  const [suggestions, setSuggestions] = useState([])
   const startInputRef = useRef(null)
   const destInputRef = useRef(null)
+  const moreResultsRef = useRef(null)
+  // the filter a page request was made for, so a late response is dropped
+  const activeFilterRef = useRef(null)
+  const { getAccessTokenSilently, isAuthenticated } = useAuth0()
 
-  // Fetch trails from backend on component mount
+  // Suggest trail names as the hiker types, from the trigram search endpoint
   useEffect(() => {
-    const fetchTrails = async () => {
+    const q = query.trim()
+    if (!q) {
+      setSuggestions([])
+      return
+    }
+    let cancelled = false
+    const timer = setTimeout(async () => {
       try {
-        const response = await axios.get("http://localhost:8000/api/trails/")
-        console.log(response)
-        setTrails(
-          Array.isArray(response.data) ? response.data : [response.data],
-        )
+        const response = await axios.get(SEARCH_URL, {
+          params: { q, limit: SUGGESTION_LIMIT },
+        })
+        if (!cancelled) setSuggestions(response.data)
       } catch (error) {
-        console.error("Error fetching trails:", error)
+        console.error("Error searching trails:", error)
       }
+    }, SUGGESTION_DELAY_MS)
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
     }
-    fetchTrails()
-  }, [])
+  }, [query])
+
+  // Resolve a typed name to a trail through the search endpoint
+  const findTrail = async (name) => {
+    const response = await axios.get(SEARCH_URL, {
+      params: { q: name, limit: 50 },
+    })
+    return response.data.find(
+      (trail) => trail.name.toLowerCase() === name.toLowerCase(),
+    )
+  }
 
   const searchTrail = async () => {
     setStartPointError("")
@@ -48,9 +79,7 @@ const Search = ({ onSearch }) => {
     }
 
     try {
-      const startTrail = trails.find(
-        (trail) => trail.name.toLowerCase() === startPoint.toLowerCase(),
-      )
+      const startTrail = await findTrail(startPoint)
       if (!startTrail) {
         setStartPointError("Starting point trail not found in database")
         return
@@ -60,9 +89,7 @@ const Search = ({ onSearch }) => {
         longitude: startTrail.long,
       }
 
-      const destTrail = trails.find(
-        (trail) => trail.name.toLowerCase() === destinationPoint.toLowerCase(),
-      )
+      const destTrail = await findTrail(destinationPoint)
       if (!destTrail) {
         setDestinationPointError("Destination trail not found in database")
         return
@@ -115,25 +142,7 @@ const Search = ({ onSearch }) => {
       const distanceMiles = (distanceMeters * 0.000621371).toFixed(2)
       const distanceKm = (distanceMeters / 1000).toFixed(2)
 
-      const sampledPoints = path.filter(
-        (_, i) => i % Math.max(1, Math.floor(path.length / 100)) === 0,
-      )
-      const elevationResponse = await axios.get(
-        "/api/google/maps/api/elevation/json",
-        {
-          params: {
-            locations: sampledPoints.map((p) => `${p[1]},${p[0]}`).join("|"),
-            key: import.meta.env.VITE_GOOGLE_MAPS_API_KEY,
-          },
-        },
-      )
-      const elevations = elevationResponse.data.results.map((r) => r.elevation)
-      let elevationGain = 0
-      for (let i = 1; i < elevations.length; i++) {
-        const diff = elevations[i] - elevations[i - 1]
-        if (diff > 0) elevationGain += diff
-      }
-      const elevationGainFeet = (elevationGain * 3.28084).toFixed(2)
+      const elevationGainFeet = await fetchElevationGainFeet(path)
 
       onSearch({
         trailCoordinates: path,
@@ -143,15 +152,38 @@ const Search = ({ onSearch }) => {
         elevationGain: elevationGainFeet,
       })
 
+      activeFilterRef.current = null
       setActiveFilter(null)
       setFilteredTrails([])
-      setVisibleResults(12)
+      setNextPage(null)
     } catch (error) {
       console.error("API Error:", error.response?.data || error.message)
       setDestinationPointError("Could not route between the trails")
     }
   }
 
+  // Elevation comes from the backend's local DEM, resampled along the route.
+  // It is only shown, so a route the DEM does not cover (422) or any other
+  // failure leaves the gain unknown instead of failing the search
+  const fetchElevationGainFeet = async (path) => {
+    try {
+      const response = await axios.post(
+        "http://localhost:8000/api/elevation/profile/",
+        {
+          points: path.map((p) => [p[1], p[0]]),
+          samples: 200,
+        },
+      )
+      return (response.data.gain_m * 3.28084).toFixed(2)
+    } catch (error) {
+      console.error(
+        "Elevation unavailable:",
+        error.response?.data || error.message,
+      )
+      return null
+    }
+  }
+
   const handleKeyPress = (e) => {
     if (e.key === "Enter") {
       e.preventDefault()
@@ -159,31 +191,86 @@ const Search = ({ onSearch }) => {
     }
   }
 
-  const applyFilter = (filter) => {
+  // Filters run on the server, one cursor page at a time; the hiker's
+  // favorites (?favorites=1) need their token
+  const filterUrl = (filter) => {
+    const params = new URLSearchParams({ page_size: PAGE_SIZE })
+    if (filter === "dogFriendly") {
+      params.set("dog_friendly", "1")
+    } else if (filter === "difficulty") {
+      params.set("difficulty", "moderate")
+    } else if (filter === "favorites") {
+      params.set("favorites", "1")
+    }
+    return `${TRAILS_URL}?${params}`
+  }
+
+  const fetchPage = useCallback(
+    async (url, filter) => {
+      const config = {}
+      if (filter === "favorites") {
+        const token = await getAccessTokenSilently()
+        config.headers = { Authorization: `Bearer ${token}` }
+      }
+      const response = await axios.get(url, config)
+      return response.data
+    },
+    [getAccessTokenSilently],
+  )
+
+  const applyFilter = async (filter) => {
+    setFilteredTrails([])
+    setNextPage(null)
     if (activeFilter === filter) {
+      activeFilterRef.current = null
       setActiveFilter(null)
-      setFilteredTrails([])
-      setVisibleResults(12)
       return
     }
 
+    activeFilterRef.current = filter
     setActiveFilter(filter)
-    setVisibleResults(12)
+    if (filter === "favorites" && !isAuthenticated) return
 
-    let results = [...trails]
-    if (filter === "dogFriendly") {
-      results = results.filter((trail) => trail.is_dog_friendly)
-    } else if (filter === "difficulty") {
-      results = results.filter(
-        (trail) => trail.difficulty.toLowerCase() === "moderate",
-      )
-    } else if (filter === "favorites") {
-      results.sort((a, b) => b.id - a.id)
+    try {
+      const page = await fetchPage(filterUrl(filter), filter)
+      if (activeFilterRef.current !== filter) return
+      setFilteredTrails(page.results)
+      setNextPage(page.next)
+    } catch (error) {
+      console.error("Error fetching trails:", error)
     }
-
-    setFilteredTrails(results)
   }
 
+  // The next page loads only when the end of the results scrolls into view
+  const loadMore = useCallback(async () => {
+    if (!nextPage || isLoadingMore) return
+    const filter = activeFilterRef.current
+    setIsLoadingMore(true)
+    try {
+      const page = await fetchPage(nextPage, filter)
+      if (activeFilterRef.current !== filter) return
+      setFilteredTrails((prev) => [...prev, ...page.results])
+      setNextPage(page.next)
+    } catch (error) {
+      console.error("Error fetching more trails:", error)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }, [nextPage, isLoadingMore, fetchPage])
+
+  useEffect(() => {
+    const sentinel = moreResultsRef.current
+    if (!sentinel || !nextPage) return
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) loadMore()
+      },
+      { rootMargin: "200px" },
+    )
+    observer.observe(sentinel)
+    return () => observer.disconnect()
+  }, [nextPage, loadMore])
+
   const handleTrailClick = (trailName) => {
     if (!startPoint) {
       setStartPoint(trailName)
@@ -216,16 +303,6 @@ const Search = ({ onSearch }) => {
     }
   }
 
-  const handleShowMore = () => {
-    if (visibleResults >= filteredTrails.length) {
-      // If all results are shown, hide back to initial 12
-      setVisibleResults(12)
-    } else {
-      // Show 12 more results
-      setVisibleResults((prev) => prev + 12)
-    }
-  }
-
   const buttonStyle = (filter) => ({
     padding: "5px 10px",
     backgroundColor: activeFilter === filter ? "#4CAF50" : "#f0f0f0",
@@ -235,17 +312,9 @@ const Search = ({ onSearch }) => {
     cursor: "pointer",
   })
 
-  const showMoreButtonStyle = {
-    padding: "8px 16px",
-    backgroundColor: "#007BFF",
-    color: "white",
-    border: "none",
-    borderRadius: "5px",
-    cursor: "pointer",
+  const loadingMoreStyle = {
+    textAlign: "center",
     marginTop: "20px",
-    display: "block",
-    marginLeft: "auto",
-    marginRight: "auto",
   }
 
   const errorStyle = {
@@ -301,8 +370,10 @@ const Search = ({ onSearch }) => {
             onChange={(e) => {
               setStartPoint(e.target.value)
               setStartPointError("")
+              setQuery(e.target.value)
             }}
             onKeyPress={handleKeyPress}
+            list="trail-suggestions"
             placeholder="Enter starting trail (e.g., Lower Yosemite Fall Trailhead"
             style={{
               padding: "5px",
@@ -321,8 +392,10 @@ const Search = ({ onSearch }) => {
             onChange={(e) => {
               setDestinationPoint(e.target.value)
               setDestinationPointError("")
+              setQuery(e.target.value)
             }}
             onKeyPress={handleKeyPress}
+            list="trail-suggestions"
             placeholder="Enter destination trail (e.g., John Muir Trail)"
             style={{
               padding: "5px",
@@ -336,6 +409,11 @@ const Search = ({ onSearch }) => {
             <div style={errorStyle}>{destinationPointError}</div>
           )}
         </div>
+        <datalist id="trail-suggestions">
+          {suggestions.map((trail) => (
+            <option key={trail.id} value={trail.name} />
+          ))}
+        </datalist>
       </form>
 
       <div style={{ marginTop: "20px", display: "flex", gap: "10px" }}>
@@ -365,7 +443,7 @@ const Search = ({ onSearch }) => {
           {filteredTrails.length > 0 ? (
             <>
               <div style={trailContainerStyle}>
-                {filteredTrails.slice(0, visibleResults).map((trail) => (
+                {filteredTrails.map((trail) => (
                   <div
                     key={trail.id}
                     style={trailStyle}
@@ -392,12 +470,10 @@ const Search = ({ onSearch }) => {
                   </div>
                 ))}
               </div>
-              {filteredTrails.length > 12 && (
-                <button style={showMoreButtonStyle} onClick={handleShowMore}>
-                  {visibleResults >= filteredTrails.length
-                    ? "Hide Results"
-                    : "Show More Results"}
-                </button>
+              {nextPage && (
+                <div ref={moreResultsRef} style={loadingMoreStyle}>
+                  {isLoadingMore && "Loading more trails..."}
+                </div>
               )}
             </>
           ) : (